@@ -0,0 +1,49 @@
+"""
+Adaptador de Streamlit para AIRA
+================================
+Enlaza los puntos de extensión de entorno.py con Streamlit:
+st.cache_data / st.cache_resource para la caché, st.error + st.stop
+para los errores fatales, st.warning para los avisos y st.session_state
+para el tema de los gráficos.
+
+Es el único módulo fuera de las páginas que importa Streamlit.
+"""
+
+import streamlit as st
+
+from entorno import (
+    registrar_cache, registrar_reporte_errores, registrar_reporte_avisos, registrar_proveedor_tema
+)
+
+
+def _mostrar_error(mensaje):
+    """
+    Muestra un error en la interfaz y detiene el script.
+    """
+    st.error(f"❌ {mensaje}")
+    st.stop()
+
+
+def _mostrar_aviso(mensaje):
+    """
+    Muestra un aviso en la interfaz sin detener el script.
+    """
+    st.warning(f"⚠️ {mensaje}")
+
+
+def _tema_sesion():
+    """
+    Lee el tema de los gráficos elegido en la sidebar (por defecto oscuro).
+    """
+    return st.session_state.get('tema_graficos', 'dark')
+
+
+def instalar():
+    """
+    Registra los enlaces de Streamlit en el entorno de ejecución.
+    Debe llamarse al inicio de app.py.
+    """
+    registrar_cache(st.cache_data, st.cache_resource)
+    registrar_reporte_errores(_mostrar_error)
+    registrar_reporte_avisos(_mostrar_aviso)
+    registrar_proveedor_tema(_tema_sesion)
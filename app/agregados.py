@@ -0,0 +1,171 @@
+"""
+Agregados por Sección para AIRA
+===============================
+Almacén con los agregados de las 5 secciones temáticas, calculado una sola
+vez a partir del cubo de respuestas:
+
+- Conteos y porcentajes de cada respuesta (un np.bincount por sección).
+- Distribución ordenada lista para crear_grafico_distribucion().
+- Tabla pivotada (países x variables) con las etiquetas en español, igual
+  que crear_tabla_pivotada_seccion().
+
+Con el almacén en caché, cambiar de sección en la página EDA es una
+consulta a un diccionario; las figuras de cada sección se cachean también
+(por sección y tema) con figuras_seccion(), igual que el mapa animado con
+un fotograma por variable de mapa_animado_seccion().
+
+Uso:
+    agregados = construir_agregados_secciones(df)
+    agregados['seccion_2']['distribucion']
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import SECCIONES, CODIGOS_RESPUESTA, RESPONSE_LABELS, COUNTRY_NAMES, AIRA_TITULOS
+from cubo import construir_cubo
+from utils import ORDEN_RESPUESTAS
+from visualizations import crear_tabla_interactiva, crear_grafico_distribucion, crear_mapa_animado
+from instrumentacion import medir
+from entorno import cache_recurso
+
+
+# Etiqueta en español de cada código del cubo (la última posición = sin respuesta)
+ETIQUETAS_CUBO = np.array([RESPONSE_LABELS.get(c, c) for c in CODIGOS_RESPUESTA] + [np.nan], dtype=object)
+
+
+# ==================== CONSTRUCCIÓN DEL ALMACÉN ====================
+
+def _agregar_seccion(cubo, presentes, variables):
+    """
+    Agregados de una sección a partir de las columnas del cubo de sus variables.
+    """
+    columnas = [cubo['indice_variables'][v] for v in variables if v in cubo['indice_variables']]
+    codigos = cubo['codigos'][:, columnas]
+    presentes = presentes[:, columnas]
+
+    # Total = filas del formato largo (también las que no tienen respuesta)
+    total = int(presentes.sum())
+    conteos = np.bincount(codigos[codigos >= 0], minlength=len(CODIGOS_RESPUESTA))
+    porcentajes = conteos / total * 100 if total else np.zeros(len(conteos))
+
+    # Distribución en el orden lógico de las respuestas, sin categorías vacías
+    etiquetas = ETIQUETAS_CUBO[:len(CODIGOS_RESPUESTA)]
+    distribucion = pd.DataFrame({
+        'Respuesta': pd.Categorical(etiquetas, categories=ORDEN_RESPUESTAS, ordered=True),
+        'Cantidad': conteos
+    })
+    distribucion = distribucion[distribucion['Cantidad'] > 0].sort_values('Respuesta').reset_index(drop=True)
+
+    # Tabla pivotada: países con alguna fila en la sección, variables en orden del pivot
+    filas = np.flatnonzero(presentes.any(axis=1))
+    orden_columnas = np.argsort([cubo['variables'][j] for j in columnas], kind='stable')
+    pivot = pd.DataFrame(
+        ETIQUETAS_CUBO[codigos[np.ix_(filas, orden_columnas)]],
+        columns=pd.Index([cubo['variables'][columnas[j]] for j in orden_columnas], name='Measure_code')
+    )
+    pivot.insert(0, 'País', [COUNTRY_NAMES.get(cubo['paises'][i]) for i in filas])
+
+    return {
+        'total': total,
+        'conteos': dict(zip(CODIGOS_RESPUESTA, conteos.tolist())),
+        'porcentajes': dict(zip(CODIGOS_RESPUESTA, porcentajes.tolist())),
+        'n_paises': len(filas),
+        'n_variables': len(variables),
+        'distribucion': distribucion,
+        'pivot': pivot
+    }
+
+
+@medir
+@cache_recurso
+def construir_agregados_secciones(df):
+    """
+    Calcula los agregados de todas las secciones en una sola pasada sobre el cubo.
+
+    Args:
+        df (pd.DataFrame): DataFrame original en formato largo
+
+    Returns:
+        dict: seccion_key -> {'total', 'conteos', 'porcentajes' (por código de
+              respuesta), 'n_paises', 'n_variables', 'distribucion', 'pivot'}.
+              Con Streamlit se comparte entre sesiones: no debe modificarse
+    """
+    cubo = construir_cubo(df)
+
+    # Celdas con fila en el formato largo (el cubo no distingue "sin fila" de "sin respuesta")
+    presentes = np.zeros(cubo['codigos'].shape, dtype=bool)
+    presentes[
+        df['COUNTRY_REGION'].map(cubo['indice_paises']).to_numpy(dtype=np.int64),
+        df['Measure_code'].map(cubo['indice_variables']).to_numpy(dtype=np.int64)
+    ] = True
+
+    return {
+        seccion_key: _agregar_seccion(cubo, presentes, seccion_info['variables'])
+        for seccion_key, seccion_info in SECCIONES.items()
+    }
+
+
+# ==================== FIGURAS EN CACHÉ ====================
+
+@medir
+@cache_recurso
+def figuras_seccion(df, seccion_key, tema):
+    """
+    Figuras de la tabla resumen y de la distribución agregada de una sección.
+
+    Args:
+        df (pd.DataFrame): DataFrame original en formato largo
+        seccion_key (str): Clave de SECCIONES (ej: 'seccion_2')
+        tema (str): Tema de los gráficos ('dark' o 'light'); forma parte de la clave
+
+    Returns:
+        dict: {'tabla': Figure o None si la sección no tiene datos, 'distribucion': Figure}.
+              Con Streamlit se comparte entre sesiones: no debe modificarse
+    """
+    agregados = construir_agregados_secciones(df)[seccion_key]
+    nombre = SECCIONES[seccion_key]['nombre']
+
+    return {
+        'tabla': (crear_tabla_interactiva(agregados['pivot'], titulo=f"Tabla Resumen - {nombre}")
+                  if not agregados['pivot'].empty else None),
+        'distribucion': crear_grafico_distribucion(agregados['distribucion'])
+    }
+
+
+@medir
+@cache_recurso
+def mapa_animado_seccion(df, seccion_key, tema, variable_inicial=None):
+    """
+    Mapa de Europa con un fotograma por cada variable de una sección.
+
+    Los fotogramas se construyen columna a columna desde el cubo int8;
+    recorrerlos en la página no vuelve a ejecutar Python.
+
+    Args:
+        df (pd.DataFrame): DataFrame original en formato largo
+        seccion_key (str): Clave de SECCIONES (ej: 'seccion_2')
+        tema (str): Tema de los gráficos ('dark' o 'light'); forma parte de la clave
+        variable_inicial (str, optional): Variable cuyo fotograma se muestra al abrir
+                                          el mapa (por defecto, la primera de la sección)
+
+    Returns:
+        plotly.graph_objects.Figure: Figura con sus fotogramas, o None si la sección
+                                     no tiene variables en los datos.
+                                     Con Streamlit se comparte entre sesiones: no debe modificarse
+    """
+    cubo = construir_cubo(df)
+    variables = [v for v in SECCIONES[seccion_key]['variables'] if v in cubo['indice_variables']]
+
+    if not variables:
+        return None
+
+    return crear_mapa_animado(
+        cubo['paises'],
+        [COUNTRY_NAMES.get(p, p) for p in cubo['paises']],
+        variables,
+        [AIRA_TITULOS.get(v, 'Sin título') for v in variables],
+        cubo['codigos'][:, [cubo['indice_variables'][v] for v in variables]],
+        tema,
+        inicial=variables.index(variable_inicial) if variable_inicial in variables else 0
+    )
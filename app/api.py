@@ -0,0 +1,456 @@
+"""
+API HTTP/JSON local para AIRA
+=============================
+Servicio ASGI ligero (sin frameworks) que expone las respuestas y los
+resultados de AIRA a otras herramientas internas:
+
+    GET /salud                          Estado del servicio
+    GET /variables                      Catálogo de variables AIRA
+    GET /variables/{codigo}/distribucion Distribución de respuestas de una variable
+    GET /paises                         Catálogo de países
+    GET /paises/{codigo}                Perfil de un país (respuestas, scores, cluster)
+    GET /paises/{codigo}/vecinos?n=5    Países más similares (vecinos más cercanos)
+    GET /secciones                      Catálogo de secciones
+    GET /secciones/{numero}             Tabla de respuestas de una sección
+    GET /scores                         Scores por área de todos los países
+    GET /clusters                       Asignación y perfiles de clusters (K óptimo)
+    GET /clusters?k=3                   Asignación y perfiles con un K concreto
+    GET /simulacion?paises=ESP,FRA&variables=AIRA_8,AIRA_9&respuesta=YES[&desde=NO]
+                                        Escenario what-if (cluster y tipología simulados)
+
+Todas las respuestas se calculan una vez al arrancar, a partir de las mismas
+funciones que usa la aplicación, y se guardan ya serializadas junto con su
+ETag. Cada petición es una búsqueda en un diccionario; las peticiones con
+If-None-Match reciben 304 sin cuerpo. Las simulaciones se calculan en cada
+petición con el estado del simulador preparado al arrancar.
+
+Los cálculos bloqueantes (el precálculo, las simulaciones y los K que aún
+no están en caché) se ejecutan en el pool de hilos del bucle de eventos,
+de modo que no detienen las demás peticiones.
+
+Uso:
+    uvicorn api:app --port 8000
+    python api.py --puerto 8000
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import threading
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import numpy as np
+
+# Permitir ejecutar el script desde cualquier directorio
+sys.path.append(str(Path(__file__).parent))
+
+from config import COUNTRY_NAMES, AIRA_TITULOS, SECCIONES, RESPONSE_LABELS
+from utils import (
+    cargar_datos, enriquecer_dataframe, preparar_datos_ml,
+    calcular_distribuciones_por_variable, crear_tabla_pivotada_seccion
+)
+from clustering import ejecutar_analisis_clustering, K_RANGE
+from simulador import crear_estado_simulacion, crear_cambios, simular
+from vecinos import construir_indice_vecinos, tabla_vecinos, N_VECINOS
+from instrumentacion import medir
+from metadatos import instalar_metadatos
+
+
+# Cabecera Cache-Control de las respuestas correctas (segundos)
+MAX_AGE = 300
+
+# Número máximo de respuestas de /clusters?k=N guardadas
+MAX_RESPUESTAS_K = len(K_RANGE)
+
+
+# ==================== SERIALIZACIÓN ====================
+
+def _valor_json(valor):
+    """
+    Convierte tipos de NumPy/pandas a tipos JSON (NaN -> null).
+    """
+    if isinstance(valor, np.integer):
+        return int(valor)
+    if isinstance(valor, (float, np.floating)):
+        return None if np.isnan(valor) else round(float(valor), 4)
+    if isinstance(valor, np.ndarray):
+        return [_valor_json(v) for v in valor.tolist()]
+    if isinstance(valor, dict):
+        return {str(k): _valor_json(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_valor_json(v) for v in valor]
+    if valor is None or isinstance(valor, (str, int, bool)):
+        return valor
+    # Valores ausentes de pandas (pd.NA, NaT) y otros escalares
+    return None if valor != valor else str(valor)
+
+
+def _registros(df):
+    """
+    Convierte un DataFrame en una lista de diccionarios serializables.
+    """
+    return [_valor_json(registro) for registro in df.to_dict('records')]
+
+
+def _serializar(contenido, estado=200):
+    """
+    Serializa una respuesta y calcula su ETag.
+
+    Returns:
+        dict: 'estado', 'cuerpo' (bytes) y 'etag'
+    """
+    cuerpo = json.dumps(_valor_json(contenido), ensure_ascii=False,
+                        allow_nan=False, separators=(',', ':')).encode('utf-8')
+    etag = '"' + hashlib.sha1(cuerpo).hexdigest()[:20] + '"'
+    return {'estado': estado, 'cuerpo': cuerpo, 'etag': etag}
+
+
+# ==================== PRECÁLCULO DE RESPUESTAS ====================
+
+def _contenido_clusters(analisis):
+    """
+    Prepara el contenido de /clusters a partir de un análisis de clustering.
+    """
+    return {
+        'k': analisis['k'],
+        'k_optimo': analisis['barrido']['k_optimo'],
+        'asignaciones': _registros(analisis['df_resultado']),
+        'perfiles': [
+            dict(perfil, tipologia=analisis['tipologias'][perfil['cluster_id']][1])
+            for perfil in analisis['perfiles']
+        ]
+    }
+
+
+@medir
+def precalcular_respuestas():
+    """
+    Calcula y serializa todas las respuestas de la API.
+
+    Returns:
+        dict: Estado de la API con 'rutas' (ruta -> respuesta serializada),
+              'df_filled' y la caché de respuestas por K (con su lock)
+    """
+    instalar_metadatos()
+    df = cargar_datos()
+    df_enriquecido = enriquecer_dataframe(df)
+    distribuciones = calcular_distribuciones_por_variable(df_enriquecido)
+    _, _, df_filled = preparar_datos_ml(df)
+    analisis = ejecutar_analisis_clustering(df_filled)
+
+    df_scores = analisis['df_scores']
+    cluster_por_pais = dict(zip(analisis['df_clusters']['COUNTRY_REGION'],
+                                analisis['df_clusters']['Cluster']))
+
+    seccion_por_variable = {
+        variable: seccion_key
+        for seccion_key, seccion_info in SECCIONES.items()
+        for variable in seccion_info['variables']
+    }
+
+    contenidos = {
+        '/salud': {'estado': 'ok'},
+        '/variables': [
+            {'codigo': variable, 'titulo': AIRA_TITULOS.get(variable),
+             'seccion': seccion_por_variable.get(variable)}
+            for variable in sorted(df['Measure_code'].unique(),
+                                   key=lambda v: int(v.split('_')[1]))
+        ],
+        '/paises': [
+            {'codigo': codigo, 'nombre': COUNTRY_NAMES.get(codigo, codigo)}
+            for codigo in sorted(df['COUNTRY_REGION'].unique())
+        ],
+        '/secciones': [
+            {'numero': int(seccion_key.split('_')[1]), 'nombre': info['nombre'],
+             'descripcion': info['descripcion'], 'variables': info['variables']}
+            for seccion_key, info in SECCIONES.items()
+        ],
+        '/scores': _registros(df_scores.rename_axis('codigo').reset_index()),
+        '/clusters': _contenido_clusters(analisis)
+    }
+
+    # Distribución por variable (una sola agrupación para todas)
+    for variable, grupo in distribuciones.groupby('Measure_code'):
+        contenidos[f'/variables/{variable}/distribucion'] = {
+            'codigo': variable,
+            'titulo': AIRA_TITULOS.get(variable),
+            'distribucion': _registros(grupo[['Respuesta', 'Cantidad', 'Porcentaje']])
+        }
+
+    # Perfil por país
+    for codigo, grupo in df_enriquecido.groupby('COUNTRY_REGION'):
+        cluster = cluster_por_pais.get(codigo)
+        contenidos[f'/paises/{codigo}'] = {
+            'codigo': codigo,
+            'nombre': COUNTRY_NAMES.get(codigo, codigo),
+            'cluster': cluster,
+            'tipologia': analisis['tipologias'][cluster][1] if cluster is not None else None,
+            'scores': df_scores.loc[codigo].drop('Pais').to_dict() if codigo in df_scores.index else None,
+            'respuestas': _registros(
+                grupo[['Measure_code', 'Variable_Titulo', 'AIRA_SIMPLE', 'Respuesta']]
+                .rename(columns={'Measure_code': 'variable', 'Variable_Titulo': 'titulo',
+                                 'AIRA_SIMPLE': 'codigo_respuesta', 'Respuesta': 'respuesta'})
+            )
+        }
+
+    # Tabla por sección
+    for seccion_key, info in SECCIONES.items():
+        numero = int(seccion_key.split('_')[1])
+        contenidos[f'/secciones/{numero}'] = {
+            'numero': numero,
+            'nombre': info['nombre'],
+            'etiquetas': RESPONSE_LABELS,
+            'filas': _registros(crear_tabla_pivotada_seccion(df, numero))
+        }
+
+    return {
+        'rutas': {ruta: _serializar(contenido) for ruta, contenido in contenidos.items()},
+        'df_filled': df_filled,
+        'clusters_por_k': {analisis['k']: _serializar(contenidos['/clusters'])},
+        'lock_clusters': threading.Lock(),
+        'simulacion': crear_estado_simulacion(df, k=analisis['k']),
+        'vecinos': construir_indice_vecinos(df_filled)
+    }
+
+
+def _respuesta_clusters_k(estado, k):
+    """
+    Devuelve la respuesta de /clusters para un K concreto, calculándola
+    la primera vez y guardándola en la caché de respuestas.
+    """
+    if k not in K_RANGE:
+        return _serializar({'error': f"k debe estar entre {K_RANGE.start} y {K_RANGE.stop - 1}"}, 400)
+
+    cache = estado['clusters_por_k']
+    respuesta = cache.get(k)
+    if respuesta is None:
+        # Se calcula fuera del lock (en un hilo del pool); solo la escritura se protege
+        analisis = ejecutar_analisis_clustering(estado['df_filled'], k=k)
+        respuesta = _serializar(_contenido_clusters(analisis))
+        with estado['lock_clusters']:
+            if k not in cache and len(cache) >= MAX_RESPUESTAS_K:
+                cache.pop(next(iter(cache)))
+            cache[k] = respuesta
+
+    return respuesta
+
+
+def _respuesta_simulacion(estado, parametros):
+    """
+    Simula el escenario descrito en la query string de /simulacion.
+    """
+    faltan = [p for p in ('paises', 'variables', 'respuesta') if p not in parametros]
+    if faltan:
+        return _serializar({'error': f"Faltan parámetros: {', '.join(faltan)}"}, 400)
+
+    try:
+        cambios = crear_cambios(
+            parametros['paises'][0].split(','),
+            parametros['variables'][0].split(','),
+            parametros['respuesta'][0],
+            desde=parametros.get('desde', [None])[0],
+            estado=estado['simulacion']
+        )
+        if cambios.empty:
+            return _serializar({'error': "Ninguna celda coincide con 'desde': no hay cambios que simular"}, 400)
+        resultado = simular(estado['simulacion'], cambios)
+    except ValueError as e:
+        return _serializar({'error': str(e)}, 400)
+
+    return _serializar({'escenarios': _registros(resultado)})
+
+
+def _respuesta_vecinos(estado, pais, parametros):
+    """
+    Devuelve los países más similares a uno dado (consulta al índice de vecinos).
+    """
+    try:
+        n = int(parametros.get('n', [N_VECINOS])[0])
+    except ValueError:
+        return _serializar({'error': 'n debe ser un número entero'}, 400)
+    if n < 1:
+        return _serializar({'error': 'n debe ser mayor que 0'}, 400)
+
+    try:
+        vecinos = tabla_vecinos(estado['vecinos'], pais, n)
+    except KeyError:
+        return RESPUESTA_NO_ENCONTRADA
+
+    return _serializar({'codigo': pais, 'vecinos': _registros(vecinos)})
+
+
+# ==================== APLICACIÓN ASGI ====================
+
+RESPUESTA_NO_ENCONTRADA = _serializar({'error': 'Ruta no encontrada'}, 404)
+RESPUESTA_METODO_NO_PERMITIDO = _serializar({'error': 'Método no permitido'}, 405)
+
+
+def resolver(estado, ruta, consulta=''):
+    """
+    Resuelve una ruta de la API a su respuesta serializada.
+
+    Args:
+        estado (dict): Estado devuelto por precalcular_respuestas()
+        ruta (str): Ruta solicitada (ej: '/paises/ESP')
+        consulta (str): Query string sin '?'
+
+    Returns:
+        dict: Respuesta serializada ('estado', 'cuerpo', 'etag')
+    """
+    ruta = ruta.rstrip('/') or '/'
+
+    if ruta == '/simulacion':
+        return _respuesta_simulacion(estado, parse_qs(consulta))
+
+    if ruta.startswith('/paises/') and ruta.endswith('/vecinos'):
+        return _respuesta_vecinos(estado, ruta[len('/paises/'):-len('/vecinos')], parse_qs(consulta))
+
+    if ruta == '/clusters' and consulta:
+        parametros = parse_qs(consulta)
+        if 'k' in parametros:
+            try:
+                return _respuesta_clusters_k(estado, int(parametros['k'][0]))
+            except ValueError:
+                return _serializar({'error': 'k debe ser un número entero'}, 400)
+
+    return estado['rutas'].get(ruta, RESPUESTA_NO_ENCONTRADA)
+
+
+def requiere_calculo(estado, ruta, consulta=''):
+    """
+    Indica si resolver una ruta ejecuta cálculos bloqueantes (una simulación
+    o un K de /clusters que aún no está en caché).
+
+    Args:
+        estado (dict): Estado devuelto por precalcular_respuestas()
+        ruta (str): Ruta solicitada
+        consulta (str): Query string sin '?'
+
+    Returns:
+        bool: True si la petición debe resolverse fuera del bucle de eventos
+    """
+    ruta = ruta.rstrip('/') or '/'
+
+    if ruta == '/simulacion':
+        return True
+
+    if ruta == '/clusters' and consulta:
+        try:
+            return int(parse_qs(consulta).get('k', [''])[0]) not in estado['clusters_por_k']
+        except ValueError:
+            return False
+
+    return False
+
+
+async def _en_hilo(funcion, *args):
+    """
+    Ejecuta una función bloqueante en el pool de hilos del bucle de eventos.
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, funcion, *args)
+
+
+def crear_app():
+    """
+    Crea la aplicación ASGI. Las respuestas se precalculan en el evento
+    de arranque (lifespan) o, si el servidor no lo envía, en la primera petición.
+
+    Returns:
+        callable: Aplicación ASGI
+    """
+    contenedor = {'estado': None}
+    lock = threading.Lock()
+
+    def obtener_estado():
+        if contenedor['estado'] is None:
+            with lock:
+                if contenedor['estado'] is None:
+                    contenedor['estado'] = precalcular_respuestas()
+        return contenedor['estado']
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                mensaje = await receive()
+                if mensaje['type'] == 'lifespan.startup':
+                    try:
+                        await _en_hilo(obtener_estado)
+                    except Exception as e:
+                        await send({'type': 'lifespan.startup.failed', 'message': f"{type(e).__name__}: {e}"})
+                        return
+                    await send({'type': 'lifespan.startup.complete'})
+                elif mensaje['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        if scope['type'] != 'http':
+            return
+
+        metodo = scope['method']
+        if metodo in ('GET', 'HEAD'):
+            consulta = scope.get('query_string', b'').decode('latin-1')
+            estado = contenedor['estado'] or await _en_hilo(obtener_estado)
+            if requiere_calculo(estado, scope['path'], consulta):
+                respuesta = await _en_hilo(resolver, estado, scope['path'], consulta)
+            else:
+                respuesta = resolver(estado, scope['path'], consulta)
+        else:
+            respuesta = RESPUESTA_METODO_NO_PERMITIDO
+
+        cabeceras = [
+            (b'content-type', b'application/json; charset=utf-8'),
+            (b'etag', respuesta['etag'].encode('latin-1'))
+        ]
+
+        estado_http = respuesta['estado']
+        cuerpo = respuesta['cuerpo']
+
+        if estado_http == 200:
+            cabeceras.append((b'cache-control', f'public, max-age={MAX_AGE}'.encode('latin-1')))
+
+            # Petición condicional: el cliente ya tiene esta versión
+            for nombre, valor in scope.get('headers', []):
+                if nombre == b'if-none-match':
+                    etags_cliente = [e.strip() for e in valor.decode('latin-1').split(',')]
+                    if respuesta['etag'] in etags_cliente or '*' in etags_cliente:
+                        estado_http, cuerpo = 304, b''
+                    break
+
+        if metodo == 'HEAD' or estado_http == 304:
+            cuerpo_enviado = b''
+        else:
+            cuerpo_enviado = cuerpo
+
+        cabeceras.append((b'content-length', str(len(cuerpo) if estado_http != 304 else 0).encode('latin-1')))
+
+        await send({'type': 'http.response.start', 'status': estado_http, 'headers': cabeceras})
+        await send({'type': 'http.response.body', 'body': cuerpo_enviado})
+
+    return app
+
+
+app = crear_app()
+
+
+def main(argv=None):
+    """
+    Arranca la API con uvicorn (dependencia opcional).
+    """
+    parser = argparse.ArgumentParser(description="API HTTP/JSON local de AIRA.")
+    parser.add_argument('--host', default='127.0.0.1', help="Host (por defecto: 127.0.0.1)")
+    parser.add_argument('--puerto', type=int, default=8000, help="Puerto (por defecto: 8000)")
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("❌ Se necesita uvicorn para servir la API: pip install uvicorn")
+
+    uvicorn.run(app, host=args.host, port=args.puerto, log_level='warning')
+
+
+if __name__ == "__main__":
+    main()
@@ -12,19 +12,33 @@ Tecnologías: Streamlit, Plotly, Pandas, Scikit-learn
 """
 
 import streamlit as st
+import pandas as pd
 import sys
 from pathlib import Path
 
 # Agregar directorio de páginas al path
 sys.path.append(str(Path(__file__).parent))
 
+# Enlazar caché, errores y tema del núcleo de cálculo con Streamlit
+import adaptador_streamlit
+adaptador_streamlit.instalar()
+
+# Sustituir los títulos estáticos por los del libro de metadatos (si existe)
+from metadatos import instalar_metadatos
+instalar_metadatos()
+
 # Importar configuración y páginas
 from config import CUSTOM_CSS
 from components.inicio import render_inicio
 from components.origen_datos import render_origen_datos
 from components.eda import render_eda
 from components.ml_clustering import render_ml_clustering
+from components.perfil_pais import render_perfil_pais
+from components.simulador import render_simulador
 from components.conclusiones import render_conclusiones
+from instrumentacion import (
+    medir, iniciar_rerun, finalizar_rerun
+)
 
 
 # ==================== CONFIGURACIÓN DE LA PÁGINA ====================
@@ -65,6 +79,7 @@ st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 # ==================== SIDEBAR - NAVEGACIÓN ====================
 
+@medir
 def render_sidebar():
     """
     Renderiza el sidebar con navegación y opciones adicionales.
@@ -87,6 +102,8 @@ def render_sidebar():
             "📖 Origen y Datos": "origen",
             "🔬 Análisis Exploratorio (EDA)": "eda",
             "🤖 Machine Learning - Clustering": "ml",
+            "🌍 Perfil de País": "perfil",
+            "🧪 Simulador de Escenarios": "simulador",
             "💡 Conclusiones": "conclusiones"
         }
         
@@ -125,12 +142,75 @@ def render_sidebar():
         st.session_state['tema_graficos'] = 'dark' if '🌙' in tema_graficos else 'light'
 
 
+# ==================== PANEL DE PERFILADO (DESARROLLADORES) ====================
+
+def render_panel_perfilado(resumen):
+    """
+    Muestra en el sidebar los tiempos y la memoria del rerun actual.
+    Solo se renderiza cuando la instrumentación está activada (AIRA_PERFILADO=1).
+    
+    Args:
+        resumen (dict): Resumen devuelto por finalizar_rerun()
+    """
+    if not resumen:
+        return
+    
+    with st.sidebar:
+        st.divider()
+        st.markdown("### 🛠️ Perfilado")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Rerun (reloj)", f"{resumen['tiempo_reloj_ms']:.0f} ms")
+        with col2:
+            st.metric("Rerun (CPU)", f"{resumen['tiempo_cpu_ms']:.0f} ms")
+        st.caption(f"Memoria pico: {resumen['memoria_pico_kb'] / 1024:.1f} MB · "
+                   f"{resumen['n_llamadas']} llamadas medidas")
+        if not resumen['memoria_fiable']:
+            st.caption("⚠️ Otra sesión midió a la vez: el pico de memoria es aproximado.")
+        
+        with st.expander("🔍 Detalle por función"):
+            if resumen['registros']:
+                df_perfil = pd.DataFrame(resumen['registros'])
+                df_perfil = df_perfil.groupby('nombre').agg(
+                    llamadas=('nombre', 'size'),
+                    reloj_ms=('tiempo_reloj_ms', 'sum'),
+                    cpu_ms=('tiempo_cpu_ms', 'sum'),
+                    pico_kb=('memoria_pico_kb', 'max')
+                ).sort_values('reloj_ms', ascending=False)
+                
+                st.dataframe(df_perfil.round(1), width='stretch')
+            else:
+                st.write("No hay llamadas medidas en este rerun.")
+
+
 # ==================== FUNCIÓN PRINCIPAL ====================
 
 def main():
     """
     Función principal que coordina la aplicación.
     """
+    # Iniciar medición del rerun (solo si AIRA_PERFILADO=1)
+    iniciar_rerun()
+    pagina = None
+    
+    try:
+        pagina = render_aplicacion()
+    finally:
+        # El rerun se cierra aunque la página lance una excepción o llame a st.stop()
+        resumen = finalizar_rerun(pagina or '')
+    
+    # Mostrar el panel de perfilado (solo si AIRA_PERFILADO=1)
+    render_panel_perfilado(resumen)
+
+
+def render_aplicacion():
+    """
+    Renderiza el sidebar, la página actual y el footer.
+    
+    Returns:
+        str: Clave de la página renderizada
+    """
     # Renderizar sidebar
     render_sidebar()
     
@@ -151,6 +231,12 @@ def main():
         elif pagina == 'ml':
             render_ml_clustering()
         
+        elif pagina == 'perfil':
+            render_perfil_pais()
+        
+        elif pagina == 'simulador':
+            render_simulador()
+        
         elif pagina == 'conclusiones':
             render_conclusiones()
         
@@ -192,6 +278,8 @@ def main():
         </p>
     </div>
     """, unsafe_allow_html=True)
+    
+    return pagina
 
 
 # ==================== PUNTO DE ENTRADA ====================
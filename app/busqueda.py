@@ -0,0 +1,273 @@
+"""
+Búsqueda de Texto para AIRA
+===========================
+Índice invertido sobre los títulos de las variables AIRA y los nombres de
+los países, para buscadores "mientras se escribe".
+
+- Los textos se normalizan (minúsculas, sin tildes: 'Regulación' ->
+  'regulacion') y se parten en palabras, sin palabras vacías ('de', 'la'...).
+- Cada palabra del vocabulario apunta a los documentos que la contienen,
+  con un peso por campo (código y título pesan más que el área) y por
+  rareza (idf).
+- Cada palabra de la consulta coincide de forma exacta, por prefijo
+  (búsqueda binaria en el vocabulario ordenado) o aproximada (candidatos
+  por trigramas y distancia de edición acotada), con pesos decrecientes.
+  Un documento debe coincidir con todas las palabras de la consulta.
+
+Una consulta no recorre los documentos: solo las listas de las palabras
+que coinciden, así que sigue por debajo del milisegundo con catálogos de
+miles de indicadores.
+
+Uso:
+    indice = construir_indice_busqueda()
+    buscar(indice, 'regulasion datos', limite=5)
+"""
+
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+from config import AIRA_TITULOS, AIRA_GRUPOS, COUNTRY_NAMES
+from instrumentacion import medir
+from entorno import cache_recurso
+
+
+# Peso de cada campo de un documento
+PESOS_CAMPOS = {'codigo': 1.0, 'texto': 1.0, 'extra': 0.5}
+
+# Peso de cada tipo de coincidencia (la exacta vale 1)
+PESO_PREFIJO = 0.8
+PESO_DIFUSO = 0.6
+
+# Longitud mínima de una palabra para buscarla de forma aproximada
+LONGITUD_MIN_DIFUSA = 4
+
+# Máximo de palabras del vocabulario que se expanden por prefijo o de forma aproximada
+MAX_EXPANSIONES = 64
+
+PALABRAS_VACIAS = {
+    'a', 'al', 'con', 'de', 'del', 'e', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'o', 'para', 'por', 'que', 'se', 'sin', 'su', 'sus', 'u', 'un', 'una', 'y'
+}
+
+
+# ==================== TEXTO ====================
+
+def normalizar_texto(texto):
+    """
+    Pasa un texto a minúsculas y le quita las tildes (ej: 'Regulación' -> 'regulacion').
+
+    Args:
+        texto (str): Texto a normalizar
+
+    Returns:
+        str: Texto normalizado
+    """
+    descompuesto = unicodedata.normalize('NFKD', str(texto).casefold())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def _tokenizar(texto):
+    """
+    Palabras normalizadas de un texto, sin palabras vacías.
+    """
+    return [p for p in re.findall(r'[a-z0-9]+', normalizar_texto(texto)) if p not in PALABRAS_VACIAS]
+
+
+def _trigramas(palabra):
+    """
+    Trigramas de una palabra, con bordes marcados (ej: 'ia' -> {'$ia', 'ia$'}).
+    """
+    marcada = f"${palabra}$"
+    return {marcada[i:i + 3] for i in range(len(marcada) - 2)}
+
+
+def _distancia_edicion(a, b, maximo):
+    """
+    Distancia de Levenshtein entre a y b, o maximo + 1 si la supera.
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        actual = [i]
+        for j, cb in enumerate(b, start=1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior = actual
+    return anterior[-1]
+
+
+# ==================== CONSTRUCCIÓN DEL ÍNDICE ====================
+
+def documentos_aira(variables=None, paises=None):
+    """
+    Documentos por defecto: una entrada por variable AIRA (con su área como
+    texto extra) y una por país.
+
+    Args:
+        variables (list, optional): Códigos AIRA a incluir (por defecto, los de AIRA_TITULOS)
+        paises (list, optional): Códigos ISO a incluir (por defecto, los de COUNTRY_NAMES)
+
+    Returns:
+        list: Diccionarios con 'tipo', 'codigo', 'texto' y 'extra'
+    """
+    area_por_variable = {v: area for area, variables in AIRA_GRUPOS.items() for v in variables}
+
+    return (
+        [{'tipo': 'variable', 'codigo': codigo, 'texto': AIRA_TITULOS.get(codigo, codigo),
+          'extra': area_por_variable.get(codigo, '')}
+         for codigo in (AIRA_TITULOS if variables is None else variables)] +
+        [{'tipo': 'pais', 'codigo': codigo, 'texto': COUNTRY_NAMES.get(codigo, codigo), 'extra': ''}
+         for codigo in (COUNTRY_NAMES if paises is None else paises)]
+    )
+
+
+@medir
+@cache_recurso
+def construir_indice_busqueda(documentos=None):
+    """
+    Construye el índice invertido de búsqueda.
+
+    Args:
+        documentos (list, optional): Diccionarios con 'tipo', 'codigo', 'texto'
+                                     y opcionalmente 'extra'. Por defecto, documentos_aira()
+
+    Returns:
+        dict: Índice con 'documentos', 'vocabulario' (ordenado), 'postings'
+              (por palabra: ids de documento y pesos), 'trigramas' y 'tipos'.
+              Con Streamlit se comparte entre sesiones: no debe modificarse
+    """
+    documentos = documentos_aira() if documentos is None else list(documentos)
+
+    # Peso de cada palabra en cada documento: el del mejor campo en que aparece
+    pesos = {}
+    for id_doc, documento in enumerate(documentos):
+        for campo, peso in PESOS_CAMPOS.items():
+            for palabra in _tokenizar(documento.get(campo, '')):
+                por_doc = pesos.setdefault(palabra, {})
+                por_doc[id_doc] = max(por_doc.get(id_doc, 0.0), peso)
+
+    vocabulario = sorted(pesos)
+    n_docs = max(len(documentos), 1)
+
+    postings = []
+    for palabra in vocabulario:
+        ids = np.fromiter(pesos[palabra].keys(), dtype=np.int64)
+        idf = math.log(1 + n_docs / len(ids))
+        postings.append((ids, np.fromiter(pesos[palabra].values(), dtype=float) * idf))
+
+    trigramas = {}
+    for id_palabra, palabra in enumerate(vocabulario):
+        for trigrama in _trigramas(palabra):
+            trigramas.setdefault(trigrama, []).append(id_palabra)
+
+    tipos = np.array([d['tipo'] for d in documentos], dtype=object)
+
+    return {
+        'documentos': documentos,
+        'vocabulario': vocabulario,
+        'postings': postings,
+        'trigramas': {t: np.array(ids, dtype=np.int64) for t, ids in trigramas.items()},
+        'n_trigramas': np.array([len(_trigramas(p)) for p in vocabulario], dtype=np.int64),
+        'tipos': {tipo: tipos == tipo for tipo in dict.fromkeys(tipos)},
+        'longitudes': np.array([len(d['texto']) for d in documentos], dtype=np.int64)
+    }
+
+
+# ==================== CONSULTAS ====================
+
+def _coincidencias(indice, palabra):
+    """
+    Palabras del vocabulario que coinciden con una de la consulta, con su factor.
+
+    Returns:
+        dict: id de palabra -> factor (1 exacta, PESO_PREFIJO prefijo, PESO_DIFUSO difusa)
+    """
+    vocabulario = indice['vocabulario']
+    coincidencias = {}
+
+    # Exacta y por prefijo: rango contiguo del vocabulario ordenado
+    inicio = bisect_left(vocabulario, palabra)
+    fin = bisect_left(vocabulario, palabra + '\x7f', lo=inicio)
+    for id_palabra in range(inicio, min(fin, inicio + MAX_EXPANSIONES)):
+        termino = vocabulario[id_palabra]
+        coincidencias[id_palabra] = 1.0 if termino == palabra else PESO_PREFIJO * len(palabra) / len(termino)
+
+    # Aproximada: candidatos que comparten trigramas, verificados con la distancia de edición
+    if len(palabra) >= LONGITUD_MIN_DIFUSA:
+        maximo = 1 if len(palabra) < 8 else 2
+        propios = _trigramas(palabra)
+        listas = [indice['trigramas'][t] for t in propios if t in indice['trigramas']]
+        if listas:
+            compartidos = np.bincount(np.concatenate(listas), minlength=len(vocabulario))
+            # Cada edición cambia como mucho 3 trigramas de cada palabra
+            necesarios = np.maximum(len(propios), indice['n_trigramas']) - 3 * maximo
+            candidatos = np.flatnonzero((compartidos >= np.maximum(necesarios, 1)))
+            for id_palabra in candidatos[:MAX_EXPANSIONES * 4]:
+                if id_palabra in coincidencias:
+                    continue
+                distancia = _distancia_edicion(palabra, vocabulario[id_palabra], maximo)
+                if distancia <= maximo:
+                    coincidencias[id_palabra] = PESO_DIFUSO / distancia
+
+    return coincidencias
+
+
+@medir
+def buscar(indice, consulta, tipos=None, limite=10):
+    """
+    Busca variables y países por texto libre.
+
+    Args:
+        indice (dict): Índice de construir_indice_busqueda()
+        consulta (str): Texto de búsqueda (ej: 'regulacion ia', 'espa')
+        tipos (list, optional): Tipos de documento a devolver (ej: ['variable'])
+        limite (int, optional): Número máximo de resultados (None = todos)
+
+    Returns:
+        list: Diccionarios con 'tipo', 'codigo', 'texto' y 'puntuacion',
+              de más a menos relevante
+    """
+    palabras = _tokenizar(consulta)
+    if not palabras:
+        return []
+
+    n_docs = len(indice['documentos'])
+    total = np.zeros(n_docs)
+    validos = np.ones(n_docs, dtype=bool)
+
+    for palabra in palabras:
+        puntos = np.zeros(n_docs)
+        for id_palabra, factor in _coincidencias(indice, palabra).items():
+            ids, pesos = indice['postings'][id_palabra]
+            puntos[ids] = np.maximum(puntos[ids], pesos * factor)
+        # Todas las palabras de la consulta deben coincidir
+        validos &= puntos > 0
+        total += puntos
+
+    if tipos is not None:
+        validos &= np.logical_or.reduce(
+            [indice['tipos'].get(tipo, np.zeros(n_docs, dtype=bool)) for tipo in tipos] + [np.zeros(n_docs, dtype=bool)]
+        )
+
+    candidatos = np.flatnonzero(validos)
+    # Más puntuación primero; a igualdad, textos más cortos y orden original
+    orden = candidatos[np.lexsort((candidatos, indice['longitudes'][candidatos], -total[candidatos]))]
+    if limite is not None:
+        orden = orden[:limite]
+
+    return [
+        {
+            'tipo': indice['documentos'][i]['tipo'],
+            'codigo': indice['documentos'][i]['codigo'],
+            'texto': indice['documentos'][i]['texto'],
+            'puntuacion': float(total[i])
+        }
+        for i in orden
+    ]
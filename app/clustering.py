@@ -0,0 +1,236 @@
+"""
+Clustering para AIRA
+====================
+Este módulo contiene los cálculos de Machine Learning (barrido de K,
+K-means final y PCA) separados de la interfaz, para que puedan
+reutilizarse desde la página de clustering, la API y scripts por lotes.
+Los resultados se cachean para no repetir el barrido en cada rerun.
+"""
+
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA
+from sklearn.metrics import silhouette_score
+
+from utils import calcular_scores_por_area, preparar_perfiles_clusters, asignar_tipologia
+from config import COUNTRY_NAMES
+from instrumentacion import medir
+from entorno import cache_datos
+
+
+# Rango de K evaluado por defecto
+K_RANGE = range(2, 11)
+
+
+# ==================== DETERMINACIÓN DEL K ÓPTIMO ====================
+
+@medir(nombre='barrido_k')
+@cache_datos
+def calcular_barrido_k(df_filled, k_range=K_RANGE):
+    """
+    Ajusta K-means para cada K del rango y calcula inercia y silueta.
+
+    Args:
+        df_filled (pd.DataFrame): Datos codificados sin valores faltantes
+        k_range (range): Rango de valores K a evaluar
+
+    Returns:
+        dict: Diccionario con 'k_range', 'inertias', 'silhouette_scores', 'k_optimo'
+              y 'etiquetas' (asignación de clusters para cada K)
+    """
+    inertias = []
+    silhouette_scores = []
+    etiquetas = {}
+
+    for k in k_range:
+        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+        kmeans.fit(df_filled)
+        inertias.append(kmeans.inertia_)
+        silhouette_scores.append(silhouette_score(df_filled, kmeans.labels_))
+        etiquetas[k] = kmeans.labels_
+
+    # El K óptimo es el de mayor coeficiente de silueta
+    k_optimo = list(k_range)[silhouette_scores.index(max(silhouette_scores))]
+
+    return {
+        'k_range': k_range,
+        'inertias': inertias,
+        'silhouette_scores': silhouette_scores,
+        'k_optimo': k_optimo,
+        'etiquetas': etiquetas
+    }
+
+
+# ==================== CLUSTERING FINAL ====================
+
+@medir
+@cache_datos
+def aplicar_clustering(df_filled, k):
+    """
+    Aplica K-means final con K clusters.
+
+    Args:
+        df_filled (pd.DataFrame): Datos codificados sin valores faltantes
+        k (int): Número de clusters
+
+    Returns:
+        tuple: (clusters, df_clusters, modelo)
+            - clusters: np.ndarray con la asignación de cada país
+            - df_clusters: DataFrame con columnas 'COUNTRY_REGION' y 'Cluster'
+            - modelo: KMeans ajustado
+    """
+    modelo = KMeans(n_clusters=k, random_state=42, n_init=10)
+    clusters = modelo.fit_predict(df_filled)
+
+    df_clusters = pd.DataFrame({
+        'COUNTRY_REGION': df_filled.index,
+        'Cluster': clusters
+    })
+
+    return clusters, df_clusters, modelo
+
+
+def crear_tabla_resultados(df_clusters, df_scores):
+    """
+    Une la asignación de clusters con los scores por área.
+
+    Args:
+        df_clusters (pd.DataFrame): DataFrame con asignación de clusters
+        df_scores (pd.DataFrame): DataFrame con scores por área
+
+    Returns:
+        pd.DataFrame: Tabla ordenada por cluster y score general
+    """
+    df_resultado = df_clusters.merge(df_scores, left_on='COUNTRY_REGION', right_index=True)
+    df_resultado = df_resultado[['Pais', 'Cluster', 'Score_General', 'Estrategia',
+                                 'Regulación', 'Gobernanza de Datos', 'Aplicaciones', 'Capacidades']]
+    return df_resultado.sort_values(['Cluster', 'Score_General'], ascending=[True, False])
+
+
+def obtener_tipologia_perfil(perfil):
+    """
+    Prepara el diccionario de scores que espera asignar_tipologia()
+    y devuelve la tipología del perfil.
+
+    Args:
+        perfil (dict): Perfil de cluster de preparar_perfiles_clusters()
+
+    Returns:
+        tuple: (emoji, nombre, color)
+    """
+    perfil_completo = dict(perfil['scores'])
+    perfil_completo['score_general'] = perfil['score_general']
+    return asignar_tipologia(perfil_completo)
+
+
+# ==================== PCA ====================
+
+@medir(nombre='pca')
+@cache_datos
+def calcular_pca(df_filled):
+    """
+    Calcula las proyecciones PCA en 2D y 3D.
+
+    Args:
+        df_filled (pd.DataFrame): Datos codificados sin valores faltantes
+
+    Returns:
+        dict: Coordenadas ('coords_2d', 'coords_3d'), varianza explicada en %
+              ('varianza_2d', 'varianza_3d') y etiquetas de países ('labels')
+    """
+    pca_2d = PCA(n_components=2, random_state=42)
+    pca_3d = PCA(n_components=3, random_state=42)
+
+    coords_2d = pca_2d.fit_transform(df_filled)
+    coords_3d = pca_3d.fit_transform(df_filled)
+
+    return {
+        'coords_2d': coords_2d,
+        'coords_3d': coords_3d,
+        'varianza_2d': pca_2d.explained_variance_ratio_.sum() * 100,
+        'varianza_3d': pca_3d.explained_variance_ratio_.sum() * 100,
+        'labels': [COUNTRY_NAMES.get(code, code) for code in df_filled.index]
+    }
+
+
+# ==================== RESULTADOS POR K ====================
+
+@medir
+@cache_datos
+def precalcular_resultados_k(df_filled, etiquetas_por_k):
+    """
+    Precalcula todo lo que depende de K a partir de las asignaciones del barrido,
+    para que cambiar K en la interfaz sea una consulta sin reajustar modelos.
+
+    Los scores por área y la proyección PCA no dependen de K: se calculan una
+    sola vez y las asignaciones de cada K solo cambian los colores del PCA.
+
+    Args:
+        df_filled (pd.DataFrame): Datos codificados sin valores faltantes
+        etiquetas_por_k (dict): K -> asignación de clusters (clave 'etiquetas' de
+                                cualquiera de los barridos de K)
+
+    Returns:
+        dict: Diccionario con:
+            - 'df_scores': scores por área (comunes a todos los K)
+            - 'pca': resultado de calcular_pca() (un único ajuste)
+            - 'por_k': K -> {'clusters', 'df_clusters', 'df_resultado', 'perfiles', 'tipologias'}
+    """
+    df_scores = calcular_scores_por_area(df_filled)
+
+    por_k = {}
+    for k, clusters in etiquetas_por_k.items():
+        df_clusters = pd.DataFrame({
+            'COUNTRY_REGION': df_filled.index,
+            'Cluster': clusters
+        })
+        perfiles = preparar_perfiles_clusters(df_clusters, df_scores)
+        por_k[k] = {
+            'clusters': clusters,
+            'df_clusters': df_clusters,
+            'df_resultado': crear_tabla_resultados(df_clusters, df_scores),
+            'perfiles': perfiles,
+            'tipologias': {p['cluster_id']: obtener_tipologia_perfil(p) for p in perfiles}
+        }
+
+    return {
+        'df_scores': df_scores,
+        'pca': calcular_pca(df_filled),
+        'por_k': por_k
+    }
+
+
+# ==================== ANÁLISIS COMPLETO ====================
+
+def ejecutar_analisis_clustering(df_filled, k=None, k_range=K_RANGE):
+    """
+    Ejecuta el análisis de clustering completo en una sola pasada:
+    barrido de K, clustering final, scores por área, perfiles y PCA.
+
+    Args:
+        df_filled (pd.DataFrame): Datos codificados sin valores faltantes
+        k (int, optional): Número de clusters. Si es None se usa el K óptimo
+        k_range (range): Rango de valores K a evaluar
+
+    Returns:
+        dict: Resultados del análisis
+    """
+    barrido = calcular_barrido_k(df_filled, k_range)
+    k_final = k or barrido['k_optimo']
+
+    clusters, df_clusters, modelo = aplicar_clustering(df_filled, k_final)
+    df_scores = calcular_scores_por_area(df_filled)
+    perfiles = preparar_perfiles_clusters(df_clusters, df_scores)
+
+    return {
+        'barrido': barrido,
+        'k': k_final,
+        'clusters': clusters,
+        'df_clusters': df_clusters,
+        'modelo': modelo,
+        'df_scores': df_scores,
+        'df_resultado': crear_tabla_resultados(df_clusters, df_scores),
+        'perfiles': perfiles,
+        'tipologias': {p['cluster_id']: obtener_tipologia_perfil(p) for p in perfiles},
+        'pca': calcular_pca(df_filled)
+    }
@@ -0,0 +1,301 @@
+"""
+Re-clustering incremental para AIRA
+===================================
+Este módulo permite actualizar el clustering cuando un subconjunto de países
+revisa sus respuestas, sin repetir el pivot, la imputación completa ni el
+barrido de K:
+
+1. Las celdas cambiadas se escriben directamente en el cubo int8.
+2. Solo se recalculan las medianas de imputación de las variables afectadas.
+3. K-means se reinicia desde los centroides anteriores (warm start, n_init=1).
+4. La silueta se actualiza a partir de una matriz de sumas de distancias
+   (países x clusters): solo se recalculan las distancias de los países
+   cuyos datos o cluster han cambiado.
+
+Uso:
+    estado = crear_estado_incremental(df)
+    resumen = actualizar_respuestas(estado, [('ESP', 'AIRA_8', 'YES')])
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+
+from config import CODIGOS_RESPUESTA, COUNTRY_NAMES
+from cubo import construir_cubo, codificar_ml, codificar_respuestas, crear_cubo, SIN_RESPUESTA
+from clustering import calcular_barrido_k, aplicar_clustering
+from utils import preparar_datos_ml
+from vecinos import construir_indice_vecinos, copiar_indice, actualizar_vecinos
+from instrumentacion import medir
+
+
+# ==================== FUNCIONES AUXILIARES ====================
+
+def _medianas(codificado):
+    """
+    Calcula la mediana de cada columna ignorando NaN (0 si la columna está vacía),
+    igual que preparar_datos_ml().
+    """
+    medianas = np.zeros(codificado.shape[1])
+    con_datos = ~np.isnan(codificado).all(axis=0)
+    medianas[con_datos] = np.nanmedian(codificado[:, con_datos], axis=0)
+    return medianas
+
+
+def _imputar(codificado, medianas):
+    """
+    Rellena los NaN de cada columna con su mediana.
+    """
+    return np.where(np.isnan(codificado), medianas, codificado)
+
+
+def _distancias(X, filas):
+    """
+    Distancias euclídeas entre todos los países y los países indicados.
+
+    Returns:
+        np.ndarray: Matriz (n_paises, len(filas))
+    """
+    diferencias = X[:, None, :] - X[filas][None, :, :]
+    return np.sqrt((diferencias ** 2).sum(axis=2))
+
+
+def _sumas_por_cluster(distancias, etiquetas, k):
+    """
+    Suma de distancias de cada país a los miembros de cada cluster.
+
+    Args:
+        distancias (np.ndarray): Matriz (n_filas, n_paises)
+        etiquetas (np.ndarray): Cluster de cada país (columnas)
+        k (int): Número de clusters
+
+    Returns:
+        np.ndarray: Matriz (n_filas, k)
+    """
+    pertenencia = np.zeros((len(etiquetas), k))
+    pertenencia[np.arange(len(etiquetas)), etiquetas] = 1
+    return distancias @ pertenencia
+
+
+def _silueta_desde_sumas(sumas, etiquetas, k):
+    """
+    Calcula la silueta de cada país a partir de la matriz de sumas de distancias,
+    con la misma convención que sklearn (silueta 0 en clusters de un elemento).
+    """
+    tamanos = np.bincount(etiquetas, minlength=k).astype(float)
+    n = len(etiquetas)
+    filas = np.arange(n)
+
+    propio = tamanos[etiquetas]
+    a = np.divide(sumas[filas, etiquetas], propio - 1,
+                  out=np.zeros(n), where=propio > 1)
+
+    medias = np.divide(sumas, tamanos, out=np.full_like(sumas, np.inf), where=tamanos > 0)
+    medias[filas, etiquetas] = np.inf
+    b = medias.min(axis=1)
+
+    maximo = np.maximum(a, b)
+    silueta = np.divide(b - a, maximo, out=np.zeros(n), where=(maximo > 0) & np.isfinite(b))
+    silueta[propio <= 1] = 0
+    return silueta
+
+
+# ==================== ESTADO INCREMENTAL ====================
+
+@medir
+def crear_estado_incremental(df, k=None):
+    """
+    Construye el estado inicial del clustering incremental (ajuste completo).
+
+    Args:
+        df (pd.DataFrame): DataFrame AIRA en formato largo
+        k (int, optional): Número de clusters. Si es None se usa el K óptimo del barrido
+
+    Returns:
+        dict: Estado con el cubo, la matriz imputada, medianas, modelo,
+              etiquetas, sumas de distancias, silueta por país e índice de vecinos
+    """
+    cubo = construir_cubo(df)
+    codificado = codificar_ml(cubo['codigos'])
+    medianas = _medianas(codificado)
+    X = _imputar(codificado, medianas)
+
+    _, _, df_filled = preparar_datos_ml(df)
+    if k is None:
+        k = calcular_barrido_k(df_filled)['k_optimo']
+    etiquetas, _, modelo = aplicar_clustering(df_filled, k)
+
+    sumas = _sumas_por_cluster(_distancias(X, np.arange(len(X))), etiquetas, k)
+    silueta = _silueta_desde_sumas(sumas, etiquetas, k)
+
+    return {
+        'cubo': cubo,
+        'codificado': codificado,
+        'medianas': medianas,
+        'X': X,
+        'k': k,
+        'modelo': modelo,
+        'etiquetas': np.asarray(etiquetas),
+        'sumas': sumas,
+        'silueta': silueta,
+        'silueta_media': silueta.mean(),
+        'vecinos': copiar_indice(construir_indice_vecinos(df_filled))
+    }
+
+
+def _agregar_paises(estado, nuevos):
+    """
+    Añade filas vacías al estado para países que no existían.
+    """
+    cubo = estado['cubo']
+    n_vars = len(cubo['variables'])
+    n_nuevos = len(nuevos)
+
+    codigos = np.vstack([cubo['codigos'], np.full((n_nuevos, n_vars), SIN_RESPUESTA, dtype=np.int8)])
+    estado['cubo'] = crear_cubo(cubo['paises'] + nuevos, cubo['variables'], codigos)
+    estado['codificado'] = np.vstack([estado['codificado'], np.full((n_nuevos, n_vars), np.nan)])
+    estado['X'] = np.vstack([estado['X'], np.tile(estado['medianas'], (n_nuevos, 1))])
+
+    # Los países nuevos se asignan provisionalmente al centroide más cercano
+    nuevas_etiquetas = estado['modelo'].predict(estado['X'][-n_nuevos:])
+    estado['etiquetas'] = np.concatenate([estado['etiquetas'], nuevas_etiquetas])
+
+    # Sus sumas se calculan completas más abajo (son filas afectadas)
+    estado['sumas'] = np.vstack([estado['sumas'], np.zeros((n_nuevos, estado['k']))])
+    return np.arange(len(codigos) - n_nuevos, len(codigos))
+
+
+@medir
+def actualizar_respuestas(estado, cambios):
+    """
+    Aplica cambios de respuestas y actualiza el clustering de forma incremental.
+    El estado se modifica en el sitio.
+
+    Args:
+        estado (dict): Estado creado con crear_estado_incremental()
+        cambios (list | pd.DataFrame): Tuplas (país, variable, respuesta) o DataFrame
+                                       con columnas 'COUNTRY_REGION', 'Measure_code', 'AIRA_SIMPLE'
+
+    Returns:
+        dict: Resumen con 'paises_modificados', 'paises_reasignados',
+              'variables_afectadas' y 'silueta_media'
+
+    Raises:
+        ValueError: Si hay variables, países o respuestas desconocidos
+                    (el estado no se modifica)
+    """
+    if not isinstance(cambios, pd.DataFrame):
+        cambios = pd.DataFrame(cambios, columns=['COUNTRY_REGION', 'Measure_code', 'AIRA_SIMPLE'])
+
+    if cambios.empty:
+        return {'paises_modificados': [], 'paises_reasignados': [],
+                'variables_afectadas': [], 'silueta_media': estado['silueta_media']}
+
+    cubo = estado['cubo']
+    desconocidas = set(cambios['Measure_code']) - set(cubo['indice_variables'])
+    if desconocidas:
+        raise ValueError(f"Variables AIRA desconocidas: {sorted(desconocidas)}")
+
+    # Solo se admiten países del catálogo (pueden no estar aún en el cubo)
+    paises_desconocidos = set(cambios['COUNTRY_REGION']) - set(cubo['indice_paises']) - set(COUNTRY_NAMES)
+    if paises_desconocidos:
+        raise ValueError(f"Países desconocidos: {sorted(map(str, paises_desconocidos))}")
+
+    # Respuestas: códigos AIRA o NaN (sin respuesta); el resto se convertiría en silencio en NaN
+    invalidas = {r for r in cambios['AIRA_SIMPLE'] if not pd.isna(r) and r not in CODIGOS_RESPUESTA}
+    if invalidas:
+        raise ValueError(
+            f"Respuestas desconocidas: {sorted(map(str, invalidas))}. Opciones: {CODIGOS_RESPUESTA}"
+        )
+
+    # Países nuevos: se añaden filas vacías
+    nuevos = sorted(set(cambios['COUNTRY_REGION']) - set(cubo['indice_paises']))
+    filas_nuevas = _agregar_paises(estado, nuevos) if nuevos else np.array([], dtype=int)
+    cubo = estado['cubo']
+
+    X_anterior = estado['X'].copy()
+    etiquetas_anteriores = estado['etiquetas'].copy()
+
+    # 1. Escribir las celdas cambiadas en el cubo y en la matriz codificada
+    filas = cambios['COUNTRY_REGION'].map(cubo['indice_paises']).to_numpy()
+    columnas = cambios['Measure_code'].map(cubo['indice_variables']).to_numpy()
+    nuevos_codigos = codificar_respuestas(cambios['AIRA_SIMPLE'])
+
+    cubo['codigos'][filas, columnas] = nuevos_codigos
+    estado['codificado'][filas, columnas] = codificar_ml(nuevos_codigos)
+
+    # 2. Recalcular solo las medianas de las columnas afectadas
+    columnas_afectadas = np.unique(columnas)
+    estado['medianas'][columnas_afectadas] = _medianas(estado['codificado'][:, columnas_afectadas])
+
+    # Reimputar solo las columnas afectadas (cambia las filas editadas y los NaN de esas columnas)
+    bloque = estado['codificado'][:, columnas_afectadas]
+    estado['X'][:, columnas_afectadas] = _imputar(bloque, estado['medianas'][columnas_afectadas])
+    if len(filas_nuevas):
+        estado['X'][filas_nuevas] = _imputar(estado['codificado'][filas_nuevas], estado['medianas'])
+
+    X = estado['X']
+    filas_modificadas = np.flatnonzero((X != X_anterior).any(axis=1))
+    filas_modificadas = np.union1d(filas_modificadas, filas_nuevas)
+
+    # Índice de países similares: solo se recolocan los países modificados
+    # (con países nuevos cambia el número de filas y se reconstruye)
+    if len(filas_nuevas):
+        estado['vecinos'] = copiar_indice(construir_indice_vecinos(estado_a_dataframe(estado)))
+    else:
+        actualizar_vecinos(estado['vecinos'], pd.DataFrame(
+            X[filas_modificadas], index=[cubo['paises'][i] for i in filas_modificadas], columns=cubo['variables']
+        ))
+
+    # 3. K-means con warm start desde los centroides anteriores
+    modelo = KMeans(n_clusters=estado['k'], init=estado['modelo'].cluster_centers_, n_init=1)
+    etiquetas = modelo.fit_predict(X)
+
+    # 4. Actualizar sumas de distancias solo para los países afectados
+    afectadas = np.union1d(filas_modificadas, np.flatnonzero(etiquetas != etiquetas_anteriores))
+    afectadas = np.setdiff1d(afectadas, filas_nuevas)
+    sumas = estado['sumas']
+    k = estado['k']
+
+    if len(afectadas) or len(filas_nuevas):
+        # Filas no afectadas: quitar la contribución anterior de los afectados y añadir la nueva
+        distancias_antes = np.sqrt(((X_anterior[:, None, :] - X_anterior[afectadas][None, :, :]) ** 2).sum(axis=2))
+        sumas[:len(X_anterior)] -= _sumas_por_cluster(distancias_antes, etiquetas_anteriores[afectadas], k)
+
+        incorporadas = np.union1d(afectadas, filas_nuevas)
+        distancias_despues = _distancias(X, incorporadas)
+        sumas += _sumas_por_cluster(distancias_despues, etiquetas[incorporadas], k)
+
+        # Filas afectadas: sus distancias a todos los países cambian, se recalculan completas
+        sumas[incorporadas] = _sumas_por_cluster(distancias_despues.T, etiquetas, k)
+
+    estado['modelo'] = modelo
+    estado['etiquetas'] = etiquetas
+    estado['silueta'] = _silueta_desde_sumas(sumas, etiquetas, k)
+    estado['silueta_media'] = estado['silueta'].mean()
+
+    paises = cubo['paises']
+    return {
+        'paises_modificados': [paises[i] for i in filas_modificadas],
+        'paises_reasignados': [paises[i] for i in np.flatnonzero(etiquetas[:len(etiquetas_anteriores)] != etiquetas_anteriores)],
+        'variables_afectadas': [cubo['variables'][j] for j in columnas_afectadas],
+        'silueta_media': estado['silueta_media']
+    }
+
+
+def estado_a_dataframe(estado):
+    """
+    Devuelve la matriz imputada del estado como DataFrame (equivalente a df_filled).
+
+    Args:
+        estado (dict): Estado incremental
+
+    Returns:
+        pd.DataFrame: Países x variables
+    """
+    cubo = estado['cubo']
+    return pd.DataFrame(
+        estado['X'],
+        index=pd.Index(cubo['paises'], name='COUNTRY_REGION'),
+        columns=pd.Index(cubo['variables'], name='Measure_code')
+    )
@@ -0,0 +1,362 @@
+"""
+Clustering por Mini-lotes para AIRA
+===================================
+Modo de K-means para muchas unidades (regiones, centros sanitarios) en el
+que la matriz codificada no se materializa nunca completa: los códigos int8
+del cubo se leen por bloques de filas (normalmente como memmap de la caché
+columnar escrita por ingesta.py) y cada bloque se codifica, se imputa y se
+pasa a MiniBatchKMeans.partial_fit().
+
+1. Medianas de imputación exactas a partir de histogramas por variable
+   (los valores codificados son pocos: 0, 1 y 2), en una sola pasada.
+2. Ajuste por mini-lotes de todos los K del barrido a la vez: cada bloque
+   leído alimenta a todos los modelos, durante EPOCAS pasadas.
+3. Asignación e inercia por bloques en una pasada final.
+4. Silueta estimada sobre una muestra aleatoria de TAM_MUESTRA_SILUETA unidades.
+
+La memoria depende del tamaño de bloque y de la muestra, no del número de
+unidades (salvo el vector de etiquetas), y el tiempo es lineal en n.
+
+Uso:
+    python clustering_minibatch.py --cache ../Data/cache --k 4 --salida clusters.csv
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+# Permitir ejecutar el script desde cualquier directorio
+sys.path.append(str(Path(__file__).parent))
+
+from config import CACHE_DIR, CODIGOS_RESPUESTA
+from cubo import TABLA_ML, codificar_ml, cargar_cubo
+from clustering import K_RANGE
+from instrumentacion import medir
+from entorno import cache_datos
+
+
+# Filas por bloque de lectura (y por mini-lote)
+TAM_BLOQUE = 4096
+
+# Pasadas completas sobre los datos durante el ajuste
+EPOCAS = 3
+
+# Unidades usadas para estimar la silueta
+TAM_MUESTRA_SILUETA = 2000
+
+
+# ==================== LECTURA POR BLOQUES ====================
+
+def _bloques(n, tam_bloque, orden=None):
+    """
+    Genera los rangos (inicio, fin) de los bloques de filas, en el orden indicado.
+    """
+    inicios = np.arange(0, n, tam_bloque)
+    if orden is not None:
+        inicios = inicios[orden]
+    for inicio in inicios:
+        yield int(inicio), int(min(inicio + tam_bloque, n))
+
+
+def _codificar_bloque(bloque, medianas):
+    """
+    Codifica un bloque de códigos int8 con ML_ENCODING e imputa las medianas.
+    """
+    X = codificar_ml(np.asarray(bloque)).astype(np.float32)
+    faltantes = np.isnan(X)
+    if faltantes.any():
+        X[faltantes] = np.broadcast_to(medianas, X.shape)[faltantes]
+    return X
+
+
+@medir
+def calcular_medianas(codigos, tam_bloque=TAM_BLOQUE):
+    """
+    Medianas de imputación de cada variable a partir de histogramas acumulados
+    por bloques. Coinciden con las de preparar_datos_ml() (media de los dos
+    valores centrales si el número de respuestas es par; 0 si no hay ninguna).
+
+    Args:
+        codigos (np.ndarray): Códigos int8 del cubo (unidades x variables); puede ser un memmap
+        tam_bloque (int): Filas por bloque
+
+    Returns:
+        np.ndarray: Mediana de cada variable (float32)
+    """
+    n, n_variables = codigos.shape
+    n_categorias = len(CODIGOS_RESPUESTA) + 1
+    desplazamiento = np.arange(n_variables, dtype=np.int64) * n_categorias
+
+    # Conteo de cada código por variable; la categoría 0 es "sin respuesta"
+    conteos = np.zeros(n_variables * n_categorias, dtype=np.int64)
+    for inicio, fin in _bloques(n, tam_bloque):
+        plano = np.asarray(codigos[inicio:fin], dtype=np.int64) + 1 + desplazamiento
+        conteos += np.bincount(plano.ravel(), minlength=len(conteos))
+    conteos = conteos.reshape(n_variables, n_categorias)[:, 1:]
+
+    # Histograma por valor codificado (varios códigos pueden compartir valor, p. ej. UD y DNK)
+    valores = np.unique(TABLA_ML[:-1])
+    pertenencia = (TABLA_ML[:-1, None] == valores[None, :]).astype(np.int64)
+    histograma = conteos @ pertenencia
+
+    total = histograma.sum(axis=1)
+    acumulado = np.cumsum(histograma, axis=1)
+    inferior = valores[np.argmax(acumulado > ((total - 1) // 2)[:, None], axis=1)]
+    superior = valores[np.argmax(acumulado > (total // 2)[:, None], axis=1)]
+
+    return np.where(total > 0, (inferior + superior) / 2, 0.0).astype(np.float32)
+
+
+# ==================== AJUSTE POR MINI-LOTES ====================
+
+@medir
+def ajustar_minibatch(codigos, k_range, medianas=None, tam_bloque=TAM_BLOQUE,
+                      epocas=EPOCAS, random_state=42):
+    """
+    Ajusta un MiniBatchKMeans por cada K leyendo los datos por bloques.
+
+    Args:
+        codigos (np.ndarray): Códigos int8 del cubo (unidades x variables); puede ser un memmap
+        k_range (iterable): Valores de K a ajustar
+        medianas (np.ndarray, optional): Medianas de calcular_medianas()
+        tam_bloque (int): Filas por bloque (tamaño del mini-lote)
+        epocas (int): Pasadas completas sobre los datos
+        random_state (int): Semilla
+
+    Returns:
+        dict: K -> MiniBatchKMeans ajustado
+    """
+    if medianas is None:
+        medianas = calcular_medianas(codigos, tam_bloque)
+
+    n = codigos.shape[0]
+    modelos = {
+        k: MiniBatchKMeans(n_clusters=k, batch_size=tam_bloque, random_state=random_state, n_init=3)
+        for k in k_range
+    }
+
+    # El primer mini-lote inicializa los centroides: debe tener al menos K filas
+    if n < max(modelos):
+        raise ValueError(f"Hay {n} unidades, menos que el mayor K ({max(modelos)})")
+
+    rng = np.random.default_rng(random_state)
+    n_bloques = -(-n // tam_bloque)
+    for _ in range(epocas):
+        # Orden aleatorio de bloques en cada pasada; cada bloque se lee una vez para todos los K
+        for inicio, fin in _bloques(n, tam_bloque, rng.permutation(n_bloques)):
+            X = _codificar_bloque(codigos[inicio:fin], medianas)
+            for k, modelo in modelos.items():
+                if fin - inicio >= k or hasattr(modelo, 'cluster_centers_'):
+                    modelo.partial_fit(X)
+
+    return modelos
+
+
+def asignar_bloques(codigos, modelos, medianas, tam_bloque=TAM_BLOQUE):
+    """
+    Asigna cada unidad al centroide más cercano y acumula la inercia, por bloques.
+
+    Args:
+        codigos (np.ndarray): Códigos int8 del cubo; puede ser un memmap
+        modelos (dict): K -> MiniBatchKMeans ajustado
+        medianas (np.ndarray): Medianas de imputación
+        tam_bloque (int): Filas por bloque
+
+    Returns:
+        tuple: (etiquetas, inercias), ambos diccionarios K -> valor
+    """
+    n = codigos.shape[0]
+    etiquetas = {k: np.empty(n, dtype=np.int32) for k in modelos}
+    inercias = dict.fromkeys(modelos, 0.0)
+
+    for inicio, fin in _bloques(n, tam_bloque):
+        X = _codificar_bloque(codigos[inicio:fin], medianas)
+        for k, modelo in modelos.items():
+            distancias = modelo.transform(X)
+            etiquetas[k][inicio:fin] = distancias.argmin(axis=1)
+            inercias[k] += float((distancias.min(axis=1) ** 2).sum())
+
+    return etiquetas, inercias
+
+
+def estimar_silueta(codigos, etiquetas, medianas, tam_muestra=TAM_MUESTRA_SILUETA, random_state=42):
+    """
+    Silueta media estimada sobre una muestra aleatoria de unidades.
+
+    Args:
+        codigos (np.ndarray): Códigos int8 del cubo; puede ser un memmap
+        etiquetas (np.ndarray): Asignación de cluster de todas las unidades
+        medianas (np.ndarray): Medianas de imputación
+        tam_muestra (int): Unidades de la muestra (todas si hay menos)
+        random_state (int): Semilla
+
+    Returns:
+        float: Silueta estimada (NaN si la muestra tiene un único cluster)
+    """
+    n = codigos.shape[0]
+    if n > tam_muestra:
+        # Índices ordenados para leer el memmap de forma secuencial
+        muestra = np.sort(np.random.default_rng(random_state).choice(n, tam_muestra, replace=False))
+    else:
+        muestra = np.arange(n)
+
+    etiquetas_muestra = etiquetas[muestra]
+    if len(np.unique(etiquetas_muestra)) < 2:
+        return np.nan
+    X = _codificar_bloque(codigos[muestra], medianas)
+    return float(silhouette_score(X, etiquetas_muestra))
+
+
+# ==================== CLUSTERING DE UNIDADES ====================
+
+def clave_codigos(codigos):
+    """
+    Identifica una matriz de códigos para la caché sin leerla entera.
+
+    Un memmap se identifica por su archivo (ruta, fecha de modificación y
+    tamaño); una matriz en memoria, por su contenido.
+
+    Args:
+        codigos (np.ndarray): Códigos int8 del cubo; puede ser un memmap
+
+    Returns:
+        tuple: Clave hashable
+    """
+    if isinstance(codigos, np.memmap) and codigos.filename:
+        estado = os.stat(codigos.filename)
+        return ('memmap', str(codigos.filename), estado.st_mtime_ns, estado.st_size,
+                codigos.offset, codigos.shape)
+
+    codigos = np.asarray(codigos)
+    return ('numpy', codigos.shape, str(codigos.dtype),
+            hashlib.sha1(np.ascontiguousarray(codigos).tobytes()).hexdigest())
+
+
+def calcular_barrido_k_minibatch(codigos, k_range=K_RANGE, tam_bloque=TAM_BLOQUE,
+                                 epocas=EPOCAS, tam_muestra=TAM_MUESTRA_SILUETA):
+    """
+    Barrido de K con MiniBatchKMeans por bloques y silueta muestreada.
+
+    El resultado se cachea por clave_codigos(): con un memmap la caché no
+    lee la matriz, de modo que la memoria sigue acotada por el tamaño de bloque.
+
+    Args:
+        codigos (np.ndarray): Códigos int8 del cubo (unidades x variables); puede ser un memmap
+        k_range (range): Rango de valores K a evaluar
+        tam_bloque (int): Filas por bloque
+        epocas (int): Pasadas completas sobre los datos
+        tam_muestra (int): Unidades usadas para estimar la silueta
+
+    Returns:
+        dict: Mismas claves que calcular_barrido_k(), más 'modelos' (K -> MiniBatchKMeans)
+              y 'medianas'
+    """
+    return _barrido_k_minibatch(clave_codigos(codigos), k_range, tam_bloque, epocas, tam_muestra, codigos)
+
+
+@medir(nombre='barrido_k_minibatch')
+@cache_datos
+def _barrido_k_minibatch(clave, k_range, tam_bloque, epocas, tam_muestra, _codigos):
+    """
+    Barrido de K en caché. La matriz (_codigos) no forma parte de la clave:
+    la identifica clave (ver clave_codigos()).
+    """
+    codigos = _codigos
+    medianas = calcular_medianas(codigos, tam_bloque)
+    modelos = ajustar_minibatch(codigos, k_range, medianas, tam_bloque, epocas)
+    etiquetas, inercias = asignar_bloques(codigos, modelos, medianas, tam_bloque)
+
+    silhouette_scores = [estimar_silueta(codigos, etiquetas[k], medianas, tam_muestra) for k in k_range]
+    k_optimo = list(k_range)[int(np.nanargmax(silhouette_scores))]
+
+    return {
+        'k_range': k_range,
+        'inertias': [inercias[k] for k in k_range],
+        'silhouette_scores': silhouette_scores,
+        'k_optimo': k_optimo,
+        'etiquetas': etiquetas,
+        'modelos': modelos,
+        'medianas': medianas
+    }
+
+
+@medir
+def aplicar_minibatch(codigos, paises, k, tam_bloque=TAM_BLOQUE, epocas=EPOCAS):
+    """
+    Clustering final por mini-lotes con K clusters (equivalente a aplicar_clustering()).
+
+    Args:
+        codigos (np.ndarray): Códigos int8 del cubo; puede ser un memmap
+        paises (list): Códigos de las unidades (filas del cubo)
+        k (int): Número de clusters
+        tam_bloque (int): Filas por bloque
+        epocas (int): Pasadas completas sobre los datos
+
+    Returns:
+        tuple: (clusters, df_clusters, modelo)
+            - clusters: np.ndarray con la asignación de cada unidad
+            - df_clusters: DataFrame con columnas 'COUNTRY_REGION' y 'Cluster'
+            - modelo: MiniBatchKMeans ajustado
+    """
+    medianas = calcular_medianas(codigos, tam_bloque)
+    modelos = ajustar_minibatch(codigos, [k], medianas, tam_bloque, epocas)
+    etiquetas, _ = asignar_bloques(codigos, modelos, medianas, tam_bloque)
+
+    df_clusters = pd.DataFrame({
+        'COUNTRY_REGION': list(paises),
+        'Cluster': etiquetas[k]
+    })
+
+    return etiquetas[k], df_clusters, modelos[k]
+
+
+# ==================== LÍNEA DE COMANDOS ====================
+
+def main(argv=None):
+    """
+    Ejecuta el clustering por mini-lotes sobre la caché columnar del cubo.
+    """
+    parser = argparse.ArgumentParser(
+        description="K-means por mini-lotes leyendo por bloques la caché del cubo (ver ingesta.py)."
+    )
+    parser.add_argument('--cache', default=CACHE_DIR,
+                        help="Directorio de la caché del cubo (por defecto: Data/cache)")
+    parser.add_argument('--k', type=int, default=None,
+                        help="Número de clusters (por defecto, el de mayor silueta estimada)")
+    parser.add_argument('--tamano-bloque', type=int, default=TAM_BLOQUE,
+                        help=f"Filas por bloque (por defecto: {TAM_BLOQUE})")
+    parser.add_argument('--salida', default=None,
+                        help="CSV donde guardar la asignación de clusters")
+    args = parser.parse_args(argv)
+
+    cubo = cargar_cubo(args.cache, mmap=True)
+    codigos = cubo['codigos']
+
+    inicio = time.perf_counter()
+    if args.k is None:
+        barrido = calcular_barrido_k_minibatch(codigos, tam_bloque=args.tamano_bloque)
+        for k, inercia, silueta in zip(barrido['k_range'], barrido['inertias'], barrido['silhouette_scores']):
+            print(f"K = {k:2d}  inercia = {inercia:12.1f}  silueta ≈ {silueta:.3f}")
+        k = barrido['k_optimo']
+        df_clusters = pd.DataFrame({'COUNTRY_REGION': cubo['paises'], 'Cluster': barrido['etiquetas'][k]})
+    else:
+        k = args.k
+        _, df_clusters, _ = aplicar_minibatch(codigos, cubo['paises'], k, tam_bloque=args.tamano_bloque)
+    duracion = time.perf_counter() - inicio
+
+    print(f"✅ {len(df_clusters)} unidades agrupadas en {k} clusters en {duracion:.1f} s")
+    if args.salida:
+        df_clusters.to_csv(args.salida, index=False)
+        print(f"💾 Asignación guardada en '{args.salida}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,10 @@ y recomendaciones para políticas públicas.
 """
 
 import streamlit as st
+from instrumentacion import medir
 
 
+@medir
 def render_conclusiones():
     """
     Renderiza la página de conclusiones y recomendaciones.
@@ -0,0 +1,99 @@
+"""
+Botones de Descarga para las Páginas de AIRA
+============================================
+Botones de descarga con selector de formato (CSV, Parquet, Excel) que
+generan el archivo al pulsarlos, a través de la caché de exportacion.py.
+
+Con versiones de Streamlit que aceptan una función como contenido de
+st.download_button, la serialización se hace solo cuando el usuario pulsa
+el botón; con versiones anteriores se genera al renderizar, pero también
+pasa por la caché y solo se serializa una vez por versión de los datos.
+"""
+
+import streamlit as st
+from packaging.version import Version, parse
+
+from exportacion import (
+    FORMATOS_EXPORTACION, formatos_disponibles, version_datos, generar_artefacto, paquete_secciones
+)
+
+
+# st.download_button acepta una función que genera el archivo al pulsar desde
+# Streamlit 1.50 (la firma no lo refleja: el tipo de 'data' es el mismo alias)
+ADMITE_DESCARGA_DIFERIDA = parse(st.__version__) >= Version('1.50.0')
+
+ETIQUETAS_FORMATOS = {'csv': 'CSV', 'parquet': 'Parquet', 'xlsx': 'Excel'}
+
+
+def _contenido(generar):
+    """
+    Función generadora (descarga diferida) o su resultado (versiones antiguas).
+    """
+    return generar if ADMITE_DESCARGA_DIFERIDA else generar()
+
+
+def _selector_formato(key):
+    """
+    Selector compacto del formato de descarga.
+    """
+    return st.selectbox(
+        "Formato:",
+        options=formatos_disponibles(),
+        format_func=ETIQUETAS_FORMATOS.get,
+        key=f"{key}_formato",
+        label_visibility='collapsed'
+    )
+
+
+def boton_descarga(etiqueta, clave, obtener_df, nombre_archivo, key):
+    """
+    Botón de descarga de un DataFrame, generado y cacheado al pulsarlo.
+
+    Args:
+        etiqueta (str): Texto del botón
+        clave (tuple): Identifica el filtro o la vista exportada (clave de caché)
+        obtener_df (callable): Función sin argumentos que devuelve el DataFrame
+        nombre_archivo (str): Nombre del archivo sin extensión
+        key (str): Clave única de los widgets
+    """
+    col1, col2 = st.columns([1, 4])
+
+    with col1:
+        formato = _selector_formato(key)
+
+    extension, mime, _ = FORMATOS_EXPORTACION[formato]
+    version = version_datos()
+
+    with col2:
+        st.download_button(
+            label=etiqueta,
+            data=_contenido(lambda: generar_artefacto(version, clave, formato, obtener_df)),
+            file_name=f"{nombre_archivo}.{extension}",
+            mime=mime,
+            key=key
+        )
+
+
+def boton_paquete_secciones(df, key):
+    """
+    Botón de descarga del zip con las tablas resumen de todas las secciones.
+
+    Args:
+        df (pd.DataFrame): Datos originales en formato largo
+        key (str): Clave única de los widgets
+    """
+    col1, col2 = st.columns([1, 4])
+
+    with col1:
+        formato = _selector_formato(key)
+
+    version = version_datos()
+
+    with col2:
+        st.download_button(
+            label="📦 Descargar todas las secciones (zip)",
+            data=_contenido(lambda: paquete_secciones(version, formato, df)),
+            file_name=f"aira_secciones_{formato}.zip",
+            mime="application/zip",
+            key=key
+        )
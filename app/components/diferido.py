@@ -0,0 +1,98 @@
+"""
+Secciones Diferidas para las Páginas de AIRA
+============================================
+Pestañas y desplegables que solo ejecutan el contenido visible, y
+fragmentos que se vuelven a ejecutar por separado.
+
+st.tabs y st.expander ejecutan siempre todo su contenido, aunque la
+pestaña no esté seleccionada o el desplegable esté cerrado: cada figura se
+calcula y se envía al navegador en cada rerun. Estas funciones devuelven,
+junto al contenedor, si está visible, para que la página solo calcule y
+envíe lo que se ve.
+
+Con versiones de Streamlit que exponen el estado de pestañas y desplegables
+(`on_change` + `.open`) se usan los elementos nativos; con versiones
+anteriores se sustituyen por un selector horizontal y un interruptor.
+
+Los paneles decorados con @fragmento son fragmentos de Streamlit: un widget
+dentro del panel solo vuelve a ejecutar ese panel, no la página entera
+(barra lateral, carga de datos y resto de secciones).
+
+Uso:
+    for pestana, visible in pestanas_diferidas(["2D", "3D"], key="pca"):
+        if visible:
+            with pestana:
+                ...
+"""
+
+import inspect
+
+import streamlit as st
+
+
+# Streamlit puede informar de qué pestaña o desplegable está abierto
+ADMITE_ESTADO_ABIERTO = 'on_change' in inspect.signature(st.tabs).parameters
+
+
+def pestanas_diferidas(etiquetas, key):
+    """
+    Crea pestañas en las que solo se renderiza la seleccionada.
+
+    Args:
+        etiquetas (list): Títulos de las pestañas
+        key (str): Clave única del widget (guarda la pestaña seleccionada)
+
+    Returns:
+        list: Pares (contenedor, visible), uno por pestaña
+    """
+    if ADMITE_ESTADO_ABIERTO:
+        pestanas = st.tabs(etiquetas, key=key, on_change='rerun')
+        return [(pestana, bool(pestana.open)) for pestana in pestanas]
+
+    seleccionada = st.radio(
+        "Vista:", etiquetas, horizontal=True, key=key, label_visibility='collapsed'
+    )
+    contenedor = st.container()
+    return [(contenedor, etiqueta == seleccionada) for etiqueta in etiquetas]
+
+
+def expander_diferido(etiqueta, key, expanded=False):
+    """
+    Crea un desplegable cuyo contenido solo se renderiza cuando está abierto.
+
+    Args:
+        etiqueta (str): Título del desplegable
+        key (str): Clave única del widget (guarda si está abierto)
+        expanded (bool): Si empieza abierto
+
+    Returns:
+        tuple: (contenedor, abierto)
+    """
+    if ADMITE_ESTADO_ABIERTO:
+        desplegable = st.expander(etiqueta, expanded=expanded, key=key, on_change='rerun')
+        return desplegable, bool(desplegable.open)
+
+    desplegable = st.expander(etiqueta, expanded=expanded)
+    with desplegable:
+        abierto = st.toggle("Mostrar contenido", value=expanded, key=key)
+    return desplegable, abierto
+
+
+# ==================== FRAGMENTOS ====================
+
+def fragmento(funcion):
+    """
+    Convierte una función de renderizado en un fragmento de Streamlit.
+
+    Usa st.fragment (o st.experimental_fragment en versiones que solo tienen
+    ese nombre); sin soporte de fragmentos, devuelve la función sin cambios
+    y sus widgets vuelven a ejecutar la página completa.
+
+    Args:
+        funcion (callable): Función que renderiza un panel
+
+    Returns:
+        callable: La función como fragmento
+    """
+    decorador = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+    return decorador(funcion) if decorador is not None else funcion
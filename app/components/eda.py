@@ -8,14 +8,19 @@ organizados por las 5 secciones temáticas del cuestionario AIRA.
 import streamlit as st
 from utils import (
     cargar_datos, filtrar_por_variable, calcular_distribucion_respuestas,
-    obtener_paises_por_respuesta, crear_tabla_pivotada_seccion
-)
-from visualizations import (
-    crear_mapa_europa, crear_grafico_distribucion, crear_tabla_interactiva
+    obtener_paises_por_respuesta
 )
+from visualizations import crear_mapa_europa, crear_grafico_distribucion
+from agregados import construir_agregados_secciones, figuras_seccion, mapa_animado_seccion
+from busqueda import construir_indice_busqueda, buscar
+from components.diferido import pestanas_diferidas, fragmento
+from components.descargas import boton_descarga, boton_paquete_secciones
 from config import SECCIONES, AIRA_TITULOS
+from instrumentacion import medir
+from entorno import obtener_tema
 
 
+@medir
 def render_eda():
     """
     Renderiza la página de análisis exploratorio de datos (EDA).
@@ -62,24 +67,48 @@ def render_eda():
     st.info(f"**{seccion_info['nombre']}**: {seccion_info['descripcion']}")
     
     # ==================== PESTAÑAS: ANÁLISIS POR VARIABLE vs TABLA RESUMEN ====================
-    tab1, tab2 = st.tabs(["📊 Análisis por Variable", "📋 Tabla Resumen de Sección"])
+    # Solo se calcula la pestaña visible
+    (tab1, ver_tab1), (tab2, ver_tab2) = pestanas_diferidas(
+        ["📊 Análisis por Variable", "📋 Tabla Resumen de Sección"], key="eda_pestanas"
+    )
     
-    with tab1:
-        render_analisis_por_variable(df, seccion_info)
+    if ver_tab1:
+        with tab1:
+            render_analisis_por_variable(df, seccion_key, seccion_info)
     
-    with tab2:
-        render_tabla_resumen_seccion(df, seccion_key, seccion_info)
+    if ver_tab2:
+        with tab2:
+            render_tabla_resumen_seccion(df, seccion_key, seccion_info)
 
 
-def render_analisis_por_variable(df, seccion_info):
+@fragmento
+@medir
+def render_analisis_por_variable(df, seccion_key, seccion_info):
     """
     Renderiza análisis detallado para una variable específica.
+    
+    Es un fragmento: buscar o cambiar de variable solo vuelve a ejecutar
+    este panel, no la carga de datos, el selector de sección ni la tabla resumen.
     """
     st.subheader("📊 Análisis Detallado por Variable")
     
-    # Selector de variable
+    # Selector de variable (el buscador busca en todas las secciones)
     variables_disponibles = seccion_info['variables']
     
+    texto_busqueda = st.text_input(
+        "🔎 Buscar variable:",
+        placeholder="ej: regulación, datos de salud, AIRA_42"
+    )
+    
+    if texto_busqueda.strip():
+        encontradas = [
+            r['codigo'] for r in buscar(construir_indice_busqueda(), texto_busqueda, tipos=['variable'], limite=None)
+        ]
+        if encontradas:
+            variables_disponibles = encontradas
+        else:
+            st.info("Ninguna variable coincide con la búsqueda; se muestran las de la sección.")
+    
     # Crear opciones con títulos descriptivos
     opciones_variables = {
         f"{var} - {AIRA_TITULOS.get(var, 'Sin título')}": var 
@@ -105,11 +134,31 @@ def render_analisis_por_variable(df, seccion_info):
     # ==================== MAPA DE EUROPA ====================
     st.subheader("🗺️ Mapa de Europa")
     
-    fig_mapa = crear_mapa_europa(
-        df_filtrado,
-        variable_aira=variable_aira
+    # Modo reproducción: un solo mapa (cacheado por sección y tema) con un fotograma
+    # por variable; recorrerlas no vuelve a ejecutar la página
+    recorrer_seccion = st.toggle(
+        "▶️ Recorrer todas las variables de la sección en el mapa",
+        key="eda_mapa_animado"
     )
     
+    fig_mapa = None
+    if recorrer_seccion:
+        # La sección de la variable elegida (el buscador puede elegir una de otra sección),
+        # abriendo el mapa en su fotograma
+        seccion_mapa = next(
+            (clave for clave, info in SECCIONES.items() if variable_aira in info['variables']), seccion_key
+        )
+        fig_mapa = mapa_animado_seccion(df, seccion_mapa, obtener_tema(), variable_aira)
+        if fig_mapa is not None and seccion_mapa != seccion_key:
+            st.caption(f"Se recorren las variables de {SECCIONES[seccion_mapa]['nombre']}, "
+                       f"la sección de {variable_aira}.")
+    
+    if fig_mapa is None:
+        fig_mapa = crear_mapa_europa(
+            df_filtrado,
+            variable_aira=variable_aira
+        )
+    
     st.plotly_chart(fig_mapa, width='stretch')
     
     # ==================== DISTRIBUCIÓN DE RESPUESTAS ====================
@@ -189,6 +238,7 @@ def render_analisis_por_variable(df, seccion_info):
         st.info("📊 **Distribución equilibrada**: Las respuestas muestran una distribución variada entre países.")
 
 
+@medir
 def render_tabla_resumen_seccion(df, seccion_key, seccion_info):
     """
     Renderiza tabla resumen con todas las variables de una sección.
@@ -206,85 +256,64 @@ def render_tabla_resumen_seccion(df, seccion_key, seccion_info):
     - ⚫ Gris: No aplicable
     """)
     
-    with st.spinner("Generando tabla..."):
-        # Extraer número de sección
-        numero_seccion = int(seccion_key.split('_')[1])
-        
-        # Crear tabla pivotada
-        df_pivot = crear_tabla_pivotada_seccion(df, numero_seccion)
-        
-        if df_pivot.empty:
-            st.warning("No hay datos disponibles para esta sección.")
-            return
-        
-        # Crear tabla interactiva
-        fig_tabla = crear_tabla_interactiva(
-            df_pivot,
-            titulo=f"Tabla Resumen - {seccion_info['nombre']}"
-        )
-        
-        st.plotly_chart(fig_tabla, width='stretch')
-        
-        # Opción de descarga
-        csv = df_pivot.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📥 Descargar tabla como CSV",
-            data=csv,
-            file_name=f"aira_{seccion_key}_resumen.csv",
-            mime="text/csv"
-        )
+    # Agregados de las 5 secciones (calculados una vez) y figuras cacheadas por sección y tema
+    agregados = construir_agregados_secciones(df)[seccion_key]
+    
+    if agregados['pivot'].empty:
+        st.warning("No hay datos disponibles para esta sección.")
+        return
+    
+    figuras = figuras_seccion(df, seccion_key, obtener_tema())
+    
+    st.plotly_chart(figuras['tabla'], width='stretch')
+    
+    # Opción de descarga (el archivo se genera al pulsar y se cachea por sección)
+    boton_descarga(
+        "📥 Descargar tabla",
+        clave=('seccion', seccion_key),
+        obtener_df=lambda: agregados['pivot'],
+        nombre_archivo=f"aira_{seccion_key}_resumen",
+        key="descarga_seccion"
+    )
+    
+    boton_paquete_secciones(df, key="descarga_secciones")
     
     st.divider()
     
     # ==================== ANÁLISIS AGREGADO DE LA SECCIÓN ====================
     st.subheader("📊 Análisis Agregado de la Sección")
     
-    # Filtrar datos de la sección
-    df_seccion = df[df['Measure_code'].isin(seccion_info['variables'])].copy()
-    
-    # Calcular estadísticas agregadas
-    total_respuestas = len(df_seccion)
-    distribucion_seccion = df_seccion['AIRA_SIMPLE'].value_counts()
+    total_respuestas = agregados['total']
+    conteos = agregados['conteos']
+    porcentajes = agregados['porcentajes']
     
     st.markdown(f"""
     **Resumen general de la sección:**
     
     - Total de respuestas: **{total_respuestas:,}**
-    - Variables analizadas: **{len(seccion_info['variables'])}**
-    - Países evaluados: **{df_seccion['COUNTRY_REGION'].nunique()}**
+    - Variables analizadas: **{agregados['n_variables']}**
+    - Países evaluados: **{agregados['n_paises']}**
     """)
     
     # Gráfico de distribución agregada
-    from utils import enriquecer_dataframe
-    df_seccion_enriq = enriquecer_dataframe(df_seccion)
-    distribucion_seccion_df = calcular_distribucion_respuestas(df_seccion_enriq)
-    
-    fig_seccion = crear_grafico_distribucion(distribucion_seccion_df)
-    
-    st.plotly_chart(fig_seccion, width='stretch')
+    st.plotly_chart(figuras['distribucion'], width='stretch')
     
     # Métricas clave
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        si_total = distribucion_seccion.get('YES', 0)
-        si_pct = (si_total / total_respuestas * 100) if total_respuestas > 0 else 0
-        st.metric("Sí", f"{si_total}", delta=f"{si_pct:.1f}%")
+        si_pct = porcentajes['YES']
+        st.metric("Sí", f"{conteos['YES']}", delta=f"{si_pct:.1f}%")
     
     with col2:
-        ud_total = distribucion_seccion.get('UD', 0)
-        ud_pct = (ud_total / total_respuestas * 100) if total_respuestas > 0 else 0
-        st.metric("En desarrollo", f"{ud_total}", delta=f"{ud_pct:.1f}%")
+        ud_pct = porcentajes['UD']
+        st.metric("En desarrollo", f"{conteos['UD']}", delta=f"{ud_pct:.1f}%")
     
     with col3:
-        no_total = distribucion_seccion.get('NO', 0)
-        no_pct = (no_total / total_respuestas * 100) if total_respuestas > 0 else 0
-        st.metric("No", f"{no_total}", delta=f"{no_pct:.1f}%")
+        st.metric("No", f"{conteos['NO']}", delta=f"{porcentajes['NO']:.1f}%")
     
     with col4:
-        dnk_total = distribucion_seccion.get('DNK', 0)
-        dnk_pct = (dnk_total / total_respuestas * 100) if total_respuestas > 0 else 0
-        st.metric("No sabe", f"{dnk_total}", delta=f"{dnk_pct:.1f}%")
+        st.metric("No sabe", f"{conteos['DNK']}", delta=f"{porcentajes['DNK']:.1f}%")
     
     # Mensaje interpretativo final
     st.info(f"""
@@ -7,8 +7,10 @@ y proporciona información general sobre el proyecto.
 
 import streamlit as st
 from config import TEXTO_BIENVENIDA, DESCRIPCION_PROYECTO
+from instrumentacion import medir
 
 
+@medir
 def render_inicio():
     """
     Renderiza la página de inicio con información general del proyecto.
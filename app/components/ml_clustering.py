@@ -6,24 +6,40 @@ tipologías de países según su preparación en IA para la salud.
 """
 
 import streamlit as st
-import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
-from sklearn.metrics import silhouette_score
 
-from utils import (
-    cargar_datos, preparar_datos_ml, calcular_scores_por_area,
-    preparar_perfiles_clusters, asignar_tipologia
-)
+from utils import cargar_datos, preparar_datos_ml
+from clustering import calcular_barrido_k, precalcular_resultados_k
 from visualizations import (
     crear_grafico_metodo_codo, crear_grafico_silhouette,
     crear_grafico_pca_2d, crear_grafico_pca_3d,
-    crear_grafico_radar_perfil, crear_grafico_comparacion_clusters
+    crear_grafico_radar_perfil, crear_grafico_comparacion_clusters,
+    crear_heatmap_coasignacion, crear_dendrograma
 )
-from config import COUNTRY_NAMES, AIRA_GRUPOS
+from estabilidad import calcular_estabilidad, N_REMUESTREOS, METODOS_REMUESTREO, FRACCION_SUBMUESTREO
+from distancias import calcular_barrido_k_medoides
+from clustering_minibatch import calcular_barrido_k_minibatch
+from jerarquico import calcular_barrido_k_jerarquico, construir_arbol
+from cubo import construir_cubo
+from vecinos import construir_indice_vecinos, tabla_vecinos, N_VECINOS
+from components.diferido import pestanas_diferidas, expander_diferido, fragmento
+from components.descargas import boton_descarga
+from config import AIRA_GRUPOS, COUNTRY_NAMES
+from instrumentacion import medir
+
+
+# Métodos de clustering disponibles: etiqueta -> (algoritmo, métrica de distancia)
+METODOS_CLUSTERING = {
+    'K-means (codificación ordinal)': ('kmeans', None),
+    'K-means por mini-lotes (lectura por bloques)': ('minibatch', None),
+    'K-medoides (distancia de Gower)': ('kmedoides', 'gower'),
+    'K-medoides (distancia de Hamming)': ('kmedoides', 'hamming'),
+    'Jerárquico (Ward, codificación ordinal)': ('jerarquico', 'euclidea'),
+    'Jerárquico (distancia de Gower, enlace medio)': ('jerarquico', 'gower')
+}
 
 
+@medir
 def render_ml_clustering():
     """
     Renderiza la página de análisis de Machine Learning (Clustering).
@@ -105,20 +121,51 @@ def render_ml_clustering():
     - **Coeficiente de Silueta**: Mide qué tan bien está asignado cada país a su cluster
     """)
     
-    # Calcular K-means para diferentes valores de K
-    k_range = range(2, 11)
-    inertias = []
-    silhouette_scores = []
-    
-    with st.spinner("Calculando K-means para diferentes valores de K..."):
-        for k in k_range:
-            kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-            kmeans.fit(df_filled)
-            inertias.append(kmeans.inertia_)
-            silhouette_scores.append(silhouette_score(df_filled, kmeans.labels_))
+    metodo_clustering = st.radio(
+        "Método de clustering",
+        list(METODOS_CLUSTERING),
+        horizontal=True,
+        help="K-medoides agrupa sobre las respuestas originales (sin fusionar DNK con UD ni N/A con NO)"
+    )
+    algoritmo, metrica = METODOS_CLUSTERING[metodo_clustering]
+    
+    if algoritmo == 'minibatch' or metrica in ('gower', 'hamming'):
+        # Códigos de respuesta originales (países x variables, mismo orden que df_filled)
+        cubo = construir_cubo(df)
+    datos = cubo['codigos'] if metrica in ('gower', 'hamming') else df_filled
+    
+    if algoritmo == 'kmedoides':
+        st.caption(
+            "En K-medoides, el gráfico del codo muestra el coste (suma de distancias de cada país a su medoide)."
+        )
+    elif algoritmo == 'minibatch':
+        st.caption(
+            "El modo por mini-lotes está pensado para miles de unidades subnacionales: lee los datos "
+            "por bloques y estima la silueta sobre una muestra. Con 53 países es una aproximación del K-means completo."
+        )
+    elif algoritmo == 'jerarquico':
+        st.caption(
+            "En el clustering jerárquico, el gráfico del codo muestra la distancia de la fusión "
+            "que reduciría K clusters a K - 1: un salto grande indica una separación natural."
+        )
+    
+    # Calcular el clustering para diferentes valores de K
+    with st.spinner(f"Calculando {metodo_clustering.split(' (')[0]} para diferentes valores de K..."):
+        if algoritmo == 'kmedoides':
+            barrido = calcular_barrido_k_medoides(datos, metrica)
+        elif algoritmo == 'jerarquico':
+            barrido = calcular_barrido_k_jerarquico(datos, metrica)
+        elif algoritmo == 'minibatch':
+            barrido = calcular_barrido_k_minibatch(cubo['codigos'])
+        else:
+            barrido = calcular_barrido_k(df_filled)
+    
+    k_range = barrido['k_range']
+    inertias = barrido['inertias']
+    silhouette_scores = barrido['silhouette_scores']
     
     # Determinar K óptimo
-    k_optimo = list(k_range)[silhouette_scores.index(max(silhouette_scores))]
+    k_optimo = barrido['k_optimo']
     
     st.success(f"✅ **K óptimo determinado: {k_optimo} clusters**")
     
@@ -148,33 +195,42 @@ def render_ml_clustering():
         **Conclusión**: Los datos muestran una separación natural en **{k_optimo} grupos**.
         """)
     
-    st.divider()
+    # Asignaciones, perfiles, tipologías y PCA de todos los K del barrido:
+    # mover el selector solo cambia qué resultados precalculados se muestran
+    with st.spinner("Preparando resultados para todos los valores de K..."):
+        resultados_k = precalcular_resultados_k(df_filled, barrido['etiquetas'])
     
-    # ==================== APLICACIÓN DEL CLUSTERING FINAL ====================
-    st.header(f"3️⃣ Clustering Final con K = {k_optimo}")
+    k_final = st.slider(
+        "Número de clusters (K)",
+        min(k_range), max(k_range), k_optimo,
+        key=f"k_{algoritmo}_{metrica}",
+        help="Por defecto, el K de mayor silueta. Cambiarlo no reajusta ningún modelo"
+    )
     
-    with st.spinner("Aplicando K-means final..."):
-        kmeans_final = KMeans(n_clusters=k_optimo, random_state=42, n_init=10)
-        clusters = kmeans_final.fit_predict(df_filled)
-        
-        # Crear DataFrame con clusters
-        df_clusters = pd.DataFrame({
-            'COUNTRY_REGION': df_filled.index,
-            'Cluster': clusters
-        })
+    artefactos = resultados_k['por_k'][k_final]
+    clusters = artefactos['clusters']
+    df_scores = resultados_k['df_scores']
+    
+    if algoritmo == 'jerarquico':
+        # El árbol está cacheado: el dendrograma solo se colorea con el corte elegido
+        st.subheader("🌳 Dendrograma")
         
-        # Calcular scores por área (incluye columna 'Pais')
-        df_scores = calcular_scores_por_area(df_filled)
+        fig_dendrograma = crear_dendrograma(
+            construir_arbol(datos, metrica), clusters, [COUNTRY_NAMES.get(p, p) for p in df_filled.index]
+        )
+        st.plotly_chart(fig_dendrograma, width='stretch')
     
-    st.success(f"✅ Países agrupados en {k_optimo} clusters")
+    st.divider()
+    
+    # ==================== APLICACIÓN DEL CLUSTERING FINAL ====================
+    st.header(f"3️⃣ Clustering Final con K = {k_final}")
+    
+    st.success(f"✅ Países agrupados en {k_final} clusters")
     
     # Tabla de asignación de clusters
     st.subheader("📋 Asignación de Países a Clusters")
     
-    df_resultado = df_clusters.merge(df_scores, left_on='COUNTRY_REGION', right_index=True)
-    df_resultado = df_resultado[['Pais', 'Cluster', 'Score_General', 'Estrategia', 
-                                  'Regulación', 'Gobernanza de Datos', 'Aplicaciones', 'Capacidades']]
-    df_resultado = df_resultado.sort_values(['Cluster', 'Score_General'], ascending=[True, False])
+    df_resultado = artefactos['df_resultado']
     
     st.dataframe(
         df_resultado.style.format({
@@ -189,15 +245,26 @@ def render_ml_clustering():
         hide_index=True
     )
     
-    # Opción de descarga
-    csv = df_resultado.to_csv(index=False).encode('utf-8')
-    st.download_button(
-        label="📥 Descargar resultados de clustering como CSV",
-        data=csv,
-        file_name="aira_clustering_resultados.csv",
-        mime="text/csv"
+    # Opción de descarga (el archivo se genera al pulsar y se cachea por método y K)
+    boton_descarga(
+        "📥 Descargar resultados de clustering",
+        clave=('clustering', algoritmo, metrica, k_final),
+        obtener_df=lambda: df_resultado,
+        nombre_archivo="aira_clustering_resultados",
+        key="descarga_clustering"
     )
     
+    # Países más similares (índice de vecinos construido una vez sobre df_filled)
+    render_vecinos(df_filled, clusters)
+    
+    # Estabilidad de los clusters (bajo demanda: son cientos de ajustes de K-means)
+    st.subheader("🔁 Estabilidad de los Clusters")
+    
+    if algoritmo != 'kmeans':
+        st.info("El análisis de estabilidad por remuestreo está disponible para K-means.")
+    else:
+        render_estabilidad(df_filled, k_final, clusters, df_scores)
+    
     st.divider()
     
     # ==================== VISUALIZACIÓN CON PCA ====================
@@ -208,18 +275,14 @@ def render_ml_clustering():
     que reduce las 75 dimensiones a 2D/3D conservando la mayor información posible.
     """)
     
-    # Aplicar PCA
-    with st.spinner("Aplicando PCA..."):
-        pca_2d = PCA(n_components=2, random_state=42)
-        pca_3d = PCA(n_components=3, random_state=42)
-        
-        pca_coords_2d = pca_2d.fit_transform(df_filled)
-        pca_coords_3d = pca_3d.fit_transform(df_filled)
-        
-        labels = [COUNTRY_NAMES.get(code, code) for code in df_filled.index]
+    # Un único ajuste de PCA; el K elegido solo cambia los colores
+    pca = resultados_k['pca']
     
-    varianza_2d = pca_2d.explained_variance_ratio_.sum() * 100
-    varianza_3d = pca_3d.explained_variance_ratio_.sum() * 100
+    pca_coords_2d = pca['coords_2d']
+    pca_coords_3d = pca['coords_3d']
+    labels = pca['labels']
+    varianza_2d = pca['varianza_2d']
+    varianza_3d = pca['varianza_3d']
     
     col1, col2 = st.columns(2)
     
@@ -229,16 +292,8 @@ def render_ml_clustering():
     with col2:
         st.metric("Varianza explicada (3D)", f"{varianza_3d:.1f}%")
     
-    # Pestañas para visualización 2D y 3D
-    tab1, tab2 = st.tabs(["📊 Visualización 2D", "🎲 Visualización 3D"])
-    
-    with tab1:
-        fig_2d = crear_grafico_pca_2d(pca_coords_2d, clusters, labels)
-        st.plotly_chart(fig_2d, width='stretch')
-    
-    with tab2:
-        fig_3d = crear_grafico_pca_3d(pca_coords_3d, clusters, labels)
-        st.plotly_chart(fig_3d, width='stretch')
+    # Pestañas para visualización 2D y 3D (solo se construye la figura visible)
+    render_graficos_pca(pca_coords_2d, pca_coords_3d, clusters, labels)
     
     st.info(f"""
     **Interpretación de los gráficos:**
@@ -260,8 +315,7 @@ def render_ml_clustering():
     en cada una de las 5 áreas temáticas del cuestionario AIRA.
     """)
     
-    # Preparar perfiles primero
-    perfiles = preparar_perfiles_clusters(df_clusters, df_scores)
+    perfiles = artefactos['perfiles']
     
     # Definición de tipologías posibles
     st.subheader("📚 Tipologías de Clusters Posibles")
@@ -335,69 +389,12 @@ def render_ml_clustering():
     """)
     
     # Mostrar perfil de cada cluster
-    for perfil in perfiles:
-        cluster_id = perfil['cluster_id']
-        n_paises = perfil['n_paises']
-        score_general = perfil['score_general']
-        
-        # Preparar datos para asignar tipología
-        perfil_completo = {
-            'Estrategia': perfil['scores']['Estrategia'],
-            'Regulación': perfil['scores']['Regulación'],
-            'Gobernanza de Datos': perfil['scores']['Gobernanza de Datos'],
-            'Aplicaciones': perfil['scores']['Aplicaciones'],
-            'Capacidades': perfil['scores']['Capacidades'],
-            'score_general': score_general
-        }
-        
-        # Asignar tipología
-        emoji, tipologia, color = asignar_tipologia(perfil_completo)
-        
-        st.markdown(f"### {emoji} Cluster {cluster_id}: {tipologia}")
-        
-        col1, col2, col3 = st.columns([1, 1, 2])
-        
-        with col1:
-            st.metric("Países", n_paises)
-            st.metric("Score General", f"{score_general:.1f}/100")
-        
-        with col2:
-            # Encontrar área más fuerte y más débil
-            scores_dict = perfil['scores']
-            area_fuerte = max(scores_dict, key=scores_dict.get)
-            area_debil = min(scores_dict, key=scores_dict.get)
-            
-            st.markdown(f"""
-            **Área más fuerte:**  
-            {area_fuerte} ({scores_dict[area_fuerte]:.1f})
-            
-            **Área más débil:**  
-            {area_debil} ({scores_dict[area_debil]:.1f})
-            """)
-        
-        with col3:
-            st.markdown("**Países en este cluster:**")
-            st.write(", ".join(perfil['paises']))
-        
-        # Gráfico radar del perfil (usando el color de la tipología)
-        fig_radar = crear_grafico_radar_perfil(perfil, f"Perfil Cluster {cluster_id}", color)
-        st.plotly_chart(fig_radar, width='stretch')
-        
-        # Tabla de scores detallada
-        scores_df = pd.DataFrame({
-            'Área': list(scores_dict.keys()),
-            'Score': [f"{v:.1f}" for v in scores_dict.values()]
-        })
-        
-        st.dataframe(scores_df, width='stretch', hide_index=True)
-        
-        st.divider()
+    render_perfiles_clusters(perfiles, artefactos['tipologias'], clave=f"{algoritmo}_{metrica}_{k_final}")
     
     # ==================== COMPARACIÓN ENTRE CLUSTERS ====================
     st.header("6️⃣ Comparación entre Clusters")
     
-    fig_comparacion = crear_grafico_comparacion_clusters(perfiles)
-    st.plotly_chart(fig_comparacion, width='stretch')
+    render_grafico_comparacion(perfiles)
     
     # Tabla comparativa
     st.subheader("📊 Tabla Comparativa de Scores")
@@ -468,3 +465,209 @@ def render_ml_clustering():
     - 📊 **Benchmarking** con países en clusters más avanzados
     - 📈 **Planificación de trayectorias** para transitar entre clusters
     """)
+
+
+@fragmento
+@medir
+def render_vecinos(df_filled, clusters):
+    """
+    Panel de países más similares. Es un fragmento: cambiar el país o el
+    número de vecinos solo vuelve a ejecutar este panel.
+    """
+    st.subheader("🤝 Países Más Similares")
+    
+    indice_vecinos = construir_indice_vecinos(df_filled)
+    opciones_paises = {COUNTRY_NAMES.get(p, p): p for p in df_filled.index}
+    
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        pais_referencia = st.selectbox("País de referencia:", options=list(opciones_paises))
+    
+    with col2:
+        n_vecinos = st.slider("Número de países similares", 1, 15, N_VECINOS)
+    
+    df_vecinos = tabla_vecinos(indice_vecinos, opciones_paises[pais_referencia], n_vecinos)
+    cluster_por_pais = dict(zip(df_filled.index, clusters))
+    df_vecinos['Cluster'] = df_vecinos['COUNTRY_REGION'].map(cluster_por_pais)
+    
+    st.dataframe(
+        df_vecinos.drop(columns=['COUNTRY_REGION']).style.format({
+            'Distancia': '{:.2f}',
+            'Coincidencia': '{:.0%}'
+        }),
+        width='stretch',
+        hide_index=True
+    )
+    
+    st.caption(
+        f"{pais_referencia} está en el Cluster {cluster_por_pais[opciones_paises[pais_referencia]]}. "
+        "Coincidencia = proporción de variables con la misma respuesta codificada."
+    )
+
+
+@fragmento
+@medir
+def render_estabilidad(df_filled, k_final, clusters, df_scores):
+    """
+    Análisis de estabilidad por remuestreo (K-means). Es un fragmento: los
+    controles de remuestreo solo vuelven a ejecutar este panel.
+    """
+    # La explicación depende del método elegido, pero va encima de los controles
+    explicacion = st.container()
+    
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        n_remuestreos = st.slider("Número de remuestreos", 50, 500, N_REMUESTREOS, step=50)
+    
+    with col2:
+        metodo = st.selectbox("Método", METODOS_REMUESTREO)
+    
+    if metodo == 'bootstrap':
+        muestras = ("muestras bootstrap (tantos países como en el estudio, elegidos con reemplazo, "
+                    "así que algunos se repiten)")
+    else:
+        muestras = f"submuestras aleatorias del {FRACCION_SUBMUESTREO:.0%} de los países (sin reemplazo)"
+    
+    with explicacion:
+        st.markdown(f"""
+        Repetimos el clustering sobre muchas {muestras} para medir si los grupos se mantienen. 
+        La **estabilidad de Jaccard** de cada cluster es el parecido medio con su mejor equivalente 
+        en cada remuestreo (> 0.75 estable, < 0.5 disuelto).
+        """)
+    
+    # Solo se calcula al pulsar el botón; el resultado se muestra mientras no
+    # cambien los parámetros con los que se calculó (también K: mover el
+    # control de K no debe lanzar remuestreos)
+    parametros = (k_final, n_remuestreos, metodo)
+    
+    if st.button("Calcular estabilidad"):
+        st.session_state['estabilidad_parametros'] = parametros
+    
+    if st.session_state.get('estabilidad_parametros') != parametros:
+        if 'estabilidad_parametros' in st.session_state:
+            st.info("Los parámetros han cambiado: pulsa **Calcular estabilidad** para actualizar el análisis.")
+        return
+    
+    with st.spinner(f"Ejecutando {n_remuestreos} remuestreos en paralelo..."):
+        estabilidad = calcular_estabilidad(df_filled, k_final, n_remuestreos, metodo)
+    
+    st.dataframe(
+        estabilidad['jaccard'].style.format({'Jaccard_Medio': '{:.2f}'}),
+        width='stretch',
+        hide_index=True
+    )
+    
+    fig_coasignacion = crear_heatmap_coasignacion(
+        estabilidad['matriz_coasignacion'], clusters,
+        df_scores.loc[df_filled.index, 'Pais'].tolist()
+    )
+    st.plotly_chart(fig_coasignacion, width='stretch')
+    
+    with st.expander("🌍 Países con asignación menos estable"):
+        st.dataframe(
+            estabilidad['estabilidad_paises'].head(10).style.format({'Coasignacion_Media': '{:.0%}'}),
+            width='stretch',
+            hide_index=True
+        )
+
+
+@fragmento
+@medir
+def render_graficos_pca(pca_coords_2d, pca_coords_3d, clusters, labels):
+    """
+    Pestañas de PCA 2D y 3D. Es un fragmento: cambiar de pestaña solo
+    vuelve a ejecutar este panel.
+    """
+    (tab1, ver_2d), (tab2, ver_3d) = pestanas_diferidas(
+        ["📊 Visualización 2D", "🎲 Visualización 3D"], key="pca_pestanas"
+    )
+    
+    if ver_2d:
+        with tab1:
+            fig_2d = crear_grafico_pca_2d(pca_coords_2d, clusters, labels)
+            st.plotly_chart(fig_2d, width='stretch')
+    
+    if ver_3d:
+        with tab2:
+            fig_3d = crear_grafico_pca_3d(pca_coords_3d, clusters, labels)
+            st.plotly_chart(fig_3d, width='stretch')
+
+
+@fragmento
+@medir
+def render_perfiles_clusters(perfiles, tipologias, clave):
+    """
+    Perfil de cada cluster con su radar diferido. Es un fragmento: abrir o
+    cerrar un radar solo vuelve a ejecutar este panel.
+    """
+    for perfil in perfiles:
+        cluster_id = perfil['cluster_id']
+        n_paises = perfil['n_paises']
+        score_general = perfil['score_general']
+        
+        # Tipología precalculada para este K
+        emoji, tipologia, color = tipologias[cluster_id]
+        
+        st.markdown(f"### {emoji} Cluster {cluster_id}: {tipologia}")
+        
+        col1, col2, col3 = st.columns([1, 1, 2])
+        
+        with col1:
+            st.metric("Países", n_paises)
+            st.metric("Score General", f"{score_general:.1f}/100")
+        
+        with col2:
+            # Encontrar área más fuerte y más débil
+            scores_dict = perfil['scores']
+            area_fuerte = max(scores_dict, key=scores_dict.get)
+            area_debil = min(scores_dict, key=scores_dict.get)
+            
+            st.markdown(f"""
+            **Área más fuerte:**  
+            {area_fuerte} ({scores_dict[area_fuerte]:.1f})
+            
+            **Área más débil:**  
+            {area_debil} ({scores_dict[area_debil]:.1f})
+            """)
+        
+        with col3:
+            st.markdown("**Países en este cluster:**")
+            st.write(", ".join(perfil['paises']))
+        
+        # Gráfico radar y tabla de scores (solo al abrir el desplegable)
+        desplegable, abierto = expander_diferido(
+            "📈 Ver perfil por área", key=f"radar_{clave}_{cluster_id}"
+        )
+        
+        if abierto:
+            with desplegable:
+                # Gráfico radar del perfil (usando el color de la tipología)
+                fig_radar = crear_grafico_radar_perfil(perfil, f"Perfil Cluster {cluster_id}", color)
+                st.plotly_chart(fig_radar, width='stretch')
+                
+                # Tabla de scores detallada
+                scores_df = pd.DataFrame({
+                    'Área': list(scores_dict.keys()),
+                    'Score': [f"{v:.1f}" for v in scores_dict.values()]
+                })
+                
+                st.dataframe(scores_df, width='stretch', hide_index=True)
+        
+        st.divider()
+
+
+@fragmento
+@medir
+def render_grafico_comparacion(perfiles):
+    """
+    Gráfico comparativo de clusters, diferido. Es un fragmento: abrirlo
+    solo vuelve a ejecutar este panel.
+    """
+    desplegable, abierto = expander_diferido("📊 Ver gráfico comparativo por área", key="comparacion_clusters")
+    
+    if abierto:
+        with desplegable:
+            fig_comparacion = crear_grafico_comparacion_clusters(perfiles)
+            st.plotly_chart(fig_comparacion, width='stretch')
@@ -8,9 +8,15 @@ explorar las características del dataset.
 import streamlit as st
 import pandas as pd
 from utils import cargar_datos, obtener_info_dataset, enriquecer_dataframe
+from filtros import construir_indice_filtros, filtrar
+from busqueda import construir_indice_busqueda, buscar
+from components.diferido import fragmento
+from components.descargas import boton_descarga
 from config import COUNTRY_NAMES, RESPONSE_LABELS, AIRA_TITULOS
+from instrumentacion import medir
 
 
+@medir
 def render_origen_datos():
     """
     Renderiza la página de origen y exploración de datos.
@@ -124,40 +130,7 @@ def render_origen_datos():
     """)
     
     # Selector de sección para ver variables
-    seccion_seleccionada = st.selectbox(
-        "Selecciona una sección para ver sus variables:",
-        options=[
-            "Sección 1: Contexto Estratégico",
-            "Sección 2: Contexto Normativo",
-            "Sección 3: Gobernanza de Datos",
-            "Sección 4: Aplicaciones de IA",
-            "Sección 5: Desarrollo de Capacidades"
-        ]
-    )
-    
-    # Mapear sección a rango de variables
-    rangos = {
-        "Sección 1: Contexto Estratégico": range(1, 8),
-        "Sección 2: Contexto Normativo": range(8, 37),
-        "Sección 3: Gobernanza de Datos": range(37, 47),
-        "Sección 4: Aplicaciones de IA": range(47, 54),
-        "Sección 5: Desarrollo de Capacidades": range(71, 76)
-    }
-    
-    rango = rangos[seccion_seleccionada]
-    variables_seccion = [f"AIRA_{i}" for i in rango]
-    
-    # Crear DataFrame con títulos
-    df_variables = pd.DataFrame({
-        'Código': variables_seccion,
-        'Título': [AIRA_TITULOS.get(v, 'Sin título') for v in variables_seccion]
-    })
-    
-    st.dataframe(
-        df_variables,
-        width='stretch',
-        hide_index=True
-    )
+    render_variables_seccion()
     
     st.divider()
     
@@ -225,65 +198,163 @@ def render_origen_datos():
     
     st.divider()
     
+    # ==================== BUSCADOR ====================
+    render_buscador()
+    
+    st.divider()
+    
     # ==================== BÚSQUEDA Y FILTRADO ====================
-    st.subheader("🔍 Búsqueda y Filtrado")
+    render_busqueda_filtrado(df_enriquecido, paises_unicos)
     
-    st.markdown("Explora los datos filtrando por país o variable:")
+    st.divider()
     
-    col1, col2 = st.columns(2)
+    # ==================== RESUMEN Y PRÓXIMOS PASOS ====================
+    st.subheader("🎯 Próximos Pasos")
     
-    with col1:
-        pais_seleccionado = st.selectbox(
-            "Selecciona un país:",
-            options=['Todos'] + paises_unicos
-        )
+    st.success("""
+    **¡Datos explorados exitosamente!** 
     
-    with col2:
-        variable_seleccionada = st.selectbox(
-            "Selecciona una variable AIRA:",
-            options=['Todas'] + variables_unicas
-        )
+    Ahora que comprendes la estructura y origen de los datos, puedes:
     
-    # Aplicar filtros
-    df_filtrado = df_enriquecido.copy()
+    1. 🔬 **Explorar el Análisis EDA** para visualizaciones detalladas por sección
+    2. 🤖 **Revisar el análisis de Machine Learning** para ver tipologías de países
+    3. 💡 **Consultar las Conclusiones** para insights clave y recomendaciones
+    
+    Usa el menú lateral para navegar a las siguientes secciones.
+    """)
+
+
+@fragmento
+@medir
+def render_variables_seccion():
+    """
+    Tabla de variables de la sección elegida. Es un fragmento: cambiar de
+    sección solo vuelve a ejecutar esta tabla.
+    """
+    seccion_seleccionada = st.selectbox(
+        "Selecciona una sección para ver sus variables:",
+        options=[
+            "Sección 1: Contexto Estratégico",
+            "Sección 2: Contexto Normativo",
+            "Sección 3: Gobernanza de Datos",
+            "Sección 4: Aplicaciones de IA",
+            "Sección 5: Desarrollo de Capacidades"
+        ]
+    )
     
-    if pais_seleccionado != 'Todos':
-        codigo_pais = [k for k, v in COUNTRY_NAMES.items() if v == pais_seleccionado][0]
-        df_filtrado = df_filtrado[df_filtrado['COUNTRY_REGION'] == codigo_pais]
+    # Mapear sección a rango de variables
+    rangos = {
+        "Sección 1: Contexto Estratégico": range(1, 8),
+        "Sección 2: Contexto Normativo": range(8, 37),
+        "Sección 3: Gobernanza de Datos": range(37, 47),
+        "Sección 4: Aplicaciones de IA": range(47, 54),
+        "Sección 5: Desarrollo de Capacidades": range(71, 76)
+    }
     
-    if variable_seleccionada != 'Todas':
-        df_filtrado = df_filtrado[df_filtrado['Measure_code'] == variable_seleccionada]
+    rango = rangos[seccion_seleccionada]
+    variables_seccion = [f"AIRA_{i}" for i in rango]
     
-    st.markdown(f"**Resultados del filtro:** {len(df_filtrado)} registros")
+    # Crear DataFrame con títulos
+    df_variables = pd.DataFrame({
+        'Código': variables_seccion,
+        'Título': [AIRA_TITULOS.get(v, 'Sin título') for v in variables_seccion]
+    })
     
     st.dataframe(
-        df_filtrado[['Pais', 'Measure_code', 'Variable_Titulo', 'Respuesta']],
+        df_variables,
         width='stretch',
         hide_index=True
     )
+
+
+@fragmento
+@medir
+def render_buscador():
+    """
+    Buscador de variables y países. Es un fragmento: cada búsqueda solo
+    vuelve a ejecutar este panel.
+    """
+    st.subheader("🔎 Buscador de Variables y Países")
     
-    # Opción de descarga
-    csv = df_filtrado.to_csv(index=False).encode('utf-8')
-    st.download_button(
-        label="📥 Descargar datos filtrados como CSV",
-        data=csv,
-        file_name=f"aira_filtrado_{pais_seleccionado}_{variable_seleccionada}.csv",
-        mime="text/csv"
+    consulta = st.text_input(
+        "Busca por título, área, código o nombre de país (admite erratas y palabras incompletas):",
+        placeholder="ej: gobernanza datos, espa, AIRA_12"
     )
     
-    st.divider()
+    if consulta.strip():
+        resultados = buscar(construir_indice_busqueda(), consulta, limite=15)
+        
+        if resultados:
+            st.dataframe(
+                pd.DataFrame({
+                    'Tipo': ['🌍 País' if r['tipo'] == 'pais' else '📝 Variable' for r in resultados],
+                    'Código': [r['codigo'] for r in resultados],
+                    'Nombre': [r['texto'] for r in resultados]
+                }),
+                width='stretch',
+                hide_index=True
+            )
+        else:
+            st.info("No hay variables ni países que coincidan con la búsqueda.")
+
+
+@fragmento
+@medir
+def render_busqueda_filtrado(df_enriquecido, paises_unicos):
+    """
+    Filtros combinados por país, variable y texto. Es un fragmento: cambiar
+    un filtro solo vuelve a ejecutar este panel.
+    """
+    st.subheader("🔍 Búsqueda y Filtrado")
     
-    # ==================== RESUMEN Y PRÓXIMOS PASOS ====================
-    st.subheader("🎯 Próximos Pasos")
+    st.markdown("Explora los datos filtrando por países, variables o buscando en los títulos de las variables:")
     
-    st.success("""
-    **¡Datos explorados exitosamente!** 
+    indice_filtros = construir_indice_filtros(df_enriquecido)
     
-    Ahora que comprendes la estructura y origen de los datos, puedes:
+    col1, col2, col3 = st.columns(3)
     
-    1. 🔬 **Explorar el Análisis EDA** para visualizaciones detalladas por sección
-    2. 🤖 **Revisar el análisis de Machine Learning** para ver tipologías de países
-    3. 💡 **Consultar las Conclusiones** para insights clave y recomendaciones
+    with col1:
+        paises_seleccionados = st.multiselect(
+            "Países:",
+            options=paises_unicos,
+            placeholder="Todos"
+        )
     
-    Usa el menú lateral para navegar a las siguientes secciones.
-    """)
+    with col2:
+        variables_seleccionadas = st.multiselect(
+            "Variables AIRA:",
+            options=indice_filtros['variables'],
+            format_func=lambda v: f"{v} - {AIRA_TITULOS.get(v, 'Sin título')}",
+            placeholder="Todas"
+        )
+    
+    with col3:
+        texto_busqueda = st.text_input(
+            "Buscar en los títulos:",
+            placeholder="ej: regulación, datos"
+        )
+    
+    # Aplicar filtros (corte del índice ordenado, sin copiar el DataFrame)
+    df_filtrado = filtrar(
+        indice_filtros,
+        paises=[indice_filtros['codigo_por_nombre'][p] for p in paises_seleccionados],
+        variables=variables_seleccionadas,
+        texto=texto_busqueda
+    )
+    
+    st.markdown(f"**Resultados del filtro:** {len(df_filtrado)} registros")
+    
+    st.dataframe(
+        df_filtrado[['Pais', 'Measure_code', 'Variable_Titulo', 'Respuesta']],
+        width='stretch',
+        hide_index=True
+    )
+    
+    # Opción de descarga (el archivo se genera al pulsar y se cachea por filtro)
+    boton_descarga(
+        "📥 Descargar datos filtrados",
+        clave=('filtrado', tuple(paises_seleccionados), tuple(variables_seleccionadas), texto_busqueda.strip()),
+        obtener_df=lambda: df_filtrado,
+        nombre_archivo="aira_filtrado",
+        key="descarga_filtrado"
+    )
@@ -0,0 +1,155 @@
+"""
+Página de Perfil de País
+========================
+Esta página muestra la ficha de un país: sus respuestas a todas las
+variables AIRA, sus scores, puestos y percentiles por área, su cluster y
+tipología, los países más parecidos y el top de países de cada área.
+"""
+
+import streamlit as st
+import pandas as pd
+
+from utils import cargar_datos
+from perfiles_paises import construir_perfiles_paises
+from simulador import crear_estado_simulacion
+from visualizations import crear_grafico_radar_perfil, crear_grafico_top_paises
+from components.diferido import fragmento
+from config import AIRA_GRUPOS
+from instrumentacion import medir
+
+
+@medir
+def render_perfil_pais():
+    """
+    Renderiza la página de perfil de país.
+    """
+    st.title("🌍 Perfil de País")
+
+    st.markdown("""
+    Elige un país para ver de un vistazo cómo respondió al cuestionario AIRA, en qué **puesto**
+    queda en cada área temática, a qué **cluster** pertenece y qué países se le parecen más.
+    """)
+
+    with st.spinner("Preparando los perfiles de los países..."):
+        df = cargar_datos()
+        perfiles = construir_perfiles_paises(df)
+        df_scores = crear_estado_simulacion(df)['df_scores']
+
+    render_ficha_pais(perfiles)
+
+    st.divider()
+
+    render_top_paises(df_scores)
+
+
+@fragmento
+@medir
+def render_ficha_pais(perfiles):
+    """
+    Ficha del país elegido. Es un fragmento: cambiar de país solo vuelve a
+    ejecutar la ficha, que se sirve de los perfiles precalculados.
+    """
+    opciones_paises = {perfil['nombre']: pais for pais, perfil in perfiles.items()}
+
+    nombre_pais = st.selectbox("Selecciona un país:", options=sorted(opciones_paises))
+    perfil = perfiles[opciones_paises[nombre_pais]]
+
+    emoji, tipologia, color = perfil['tipologia']
+    n_paises = perfil['n_paises']
+    n_cluster = perfil['n_cluster']
+
+    st.divider()
+
+    # ==================== RESUMEN ====================
+    st.header(f"{emoji} {perfil['nombre']}")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("Score General", f"{perfil['scores']['Score_General']:.1f}/100")
+
+    with col2:
+        st.metric(
+            "Puesto general",
+            f"{perfil['rangos']['Score_General']}º de {n_paises}",
+            help=f"Percentil {perfil['percentiles']['Score_General']:.0f}: porcentaje de países "
+                 f"con un Score General igual o inferior"
+        )
+
+    with col3:
+        st.metric("Cluster", perfil['cluster'])
+
+    st.markdown(f"**Tipología del cluster:** {tipologia}")
+
+    # ==================== SCORES POR ÁREA ====================
+    st.subheader("📊 Scores y Puestos por Área")
+
+    areas = [area for area in AIRA_GRUPOS if area in perfil['scores']]
+
+    col1, col2 = st.columns([1, 1])
+
+    with col1:
+        st.dataframe(
+            pd.DataFrame({
+                'Área': areas,
+                'Score': [perfil['scores'][a] for a in areas],
+                'Puesto': [f"{perfil['rangos'][a]}º de {n_paises}" for a in areas],
+                'Percentil': [perfil['percentiles'][a] for a in areas],
+                'En su cluster': [f"{perfil['rangos_cluster'][a]}º de {n_cluster}" for a in areas]
+            }).style.format({'Score': '{:.1f}', 'Percentil': '{:.0f}'}),
+            width='stretch',
+            hide_index=True
+        )
+
+    with col2:
+        fig_radar = crear_grafico_radar_perfil(
+            {'scores': {a: perfil['scores'][a] for a in areas}},
+            f"Perfil de {perfil['nombre']}",
+            color
+        )
+        st.plotly_chart(fig_radar, width='stretch')
+
+    # ==================== PAÍSES SIMILARES ====================
+    st.subheader("🤝 Países Más Similares")
+
+    st.dataframe(
+        perfil['vecinos'].drop(columns=['COUNTRY_REGION']).style.format({
+            'Distancia': '{:.2f}',
+            'Coincidencia': '{:.0%}'
+        }),
+        width='stretch',
+        hide_index=True
+    )
+
+    # ==================== RESPUESTAS ====================
+    st.subheader("📝 Respuestas por Variable")
+
+    respuestas = perfil['respuestas']
+    area_seleccionada = st.selectbox("Filtrar por área:", options=['Todas'] + sorted(respuestas['Área'].unique()))
+
+    if area_seleccionada != 'Todas':
+        respuestas = respuestas[respuestas['Área'] == area_seleccionada]
+
+    st.dataframe(respuestas, width='stretch', hide_index=True)
+
+
+@fragmento
+@medir
+def render_top_paises(df_scores):
+    """
+    Top de países de un área, servido desde el ranking precalculado. Es un
+    fragmento: cambiar de área o de N no vuelve a ejecutar la ficha del país.
+    """
+    st.subheader("🏆 Top Países por Área")
+
+    columnas = [area for area in AIRA_GRUPOS if area in df_scores.columns] + ['Score_General']
+
+    col1, col2 = st.columns([3, 1])
+
+    with col1:
+        area = st.selectbox("Área:", options=columnas, key="top_paises_area")
+
+    with col2:
+        n = st.slider("Países:", min_value=5, max_value=20, value=10, key="top_paises_n")
+
+    st.plotly_chart(crear_grafico_top_paises(df_scores, area, n), width='stretch')
@@ -0,0 +1,177 @@
+"""
+Página del Simulador de Escenarios
+==================================
+Esta página permite simular cambios en las respuestas AIRA de uno o
+varios países y ver en qué cluster y tipología quedarían, sin reajustar
+el modelo de clustering.
+"""
+
+import streamlit as st
+import pandas as pd
+
+from utils import cargar_datos
+from simulador import crear_estado_simulacion, crear_cambios, simular, COLUMNAS_CAMBIOS, RESPUESTAS_SIMULABLES
+from config import COUNTRY_NAMES, AIRA_TITULOS, AIRA_GRUPOS, RESPONSE_LABELS
+from components.descargas import boton_descarga
+from instrumentacion import medir
+
+
+@medir
+def render_simulador():
+    """
+    Renderiza la página del simulador de escenarios.
+    """
+    st.title("🧪 Simulador de Escenarios")
+
+    st.markdown("""
+    ¿Qué pasaría si un país cambiara algunas de sus respuestas? Elige países, variables y la nueva
+    respuesta para ver cómo cambiarían sus **scores por área**, su **cluster** y su **tipología**.
+
+    El país se asigna al **centroide más cercano** del modelo K-means ya ajustado, sin volver a
+    entrenarlo: el resto de países no se mueve.
+    """)
+
+    with st.spinner("Preparando el simulador..."):
+        df = cargar_datos()
+        estado = crear_estado_simulacion(df)
+
+    cubo = estado['cubo']
+
+    st.caption(f"Modelo de referencia: K-means con K = {estado['k']} clusters")
+
+    st.divider()
+
+    # ==================== DEFINICIÓN DEL ESCENARIO ====================
+    st.header("1️⃣ Definir el Escenario")
+
+    opciones_paises = {COUNTRY_NAMES.get(p, p): p for p in cubo['paises']}
+    opciones_variables = {
+        f"{var} - {AIRA_TITULOS.get(var, 'Sin título')}": var
+        for var in cubo['variables']
+    }
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        paises_seleccionados = st.multiselect(
+            "Países:",
+            options=list(opciones_paises),
+            default=[next(iter(opciones_paises))]
+        )
+        variables_seleccionadas = st.multiselect(
+            "Variables a cambiar:",
+            options=list(opciones_variables)
+        )
+
+    with col2:
+        respuesta = st.selectbox(
+            "Nueva respuesta:",
+            options=RESPUESTAS_SIMULABLES,
+            format_func=lambda codigo: f"{codigo} - {RESPONSE_LABELS.get(codigo, codigo)}"
+        )
+        desde = st.selectbox(
+            "Cambiar solo las respuestas actuales:",
+            options=['Todas'] + RESPUESTAS_SIMULABLES,
+            format_func=lambda codigo: codigo if codigo == 'Todas' else f"{codigo} - {RESPONSE_LABELS.get(codigo, codigo)}"
+        )
+
+    with st.expander("📤 Cargar un lote de escenarios (CSV)"):
+        st.markdown(
+            f"El CSV debe tener las columnas `{'`, `'.join(COLUMNAS_CAMBIOS[1:])}` y, opcionalmente, "
+            "`Escenario` para agrupar cambios. Cada escenario parte de los datos originales."
+        )
+        archivo = st.file_uploader("Archivo de escenarios", type='csv')
+
+    if archivo is not None:
+        cambios = pd.read_csv(archivo, dtype=str)
+    elif paises_seleccionados and variables_seleccionadas:
+        cambios = crear_cambios(
+            [opciones_paises[p] for p in paises_seleccionados],
+            [opciones_variables[v] for v in variables_seleccionadas],
+            respuesta,
+            desde=None if desde == 'Todas' else desde,
+            estado=estado
+        )
+    else:
+        st.info("Selecciona al menos un país y una variable para simular.")
+        return
+
+    if cambios.empty:
+        st.warning("Ninguna de las respuestas seleccionadas coincide con el filtro de respuesta actual.")
+        return
+
+    try:
+        resultado = simular(estado, cambios)
+    except (ValueError, KeyError) as e:
+        st.error(f"❌ No se pudo simular el escenario: {e}")
+        return
+
+    st.divider()
+
+    # ==================== RESULTADOS ====================
+    st.header("2️⃣ Resultados")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("Escenarios simulados", len(resultado))
+
+    with col2:
+        st.metric("Cambios aplicados", int(resultado['Cambios'].sum()))
+
+    with col3:
+        st.metric("Países que cambian de cluster", int(resultado['Cambia_Cluster'].sum()))
+
+    # Detalle del primer escenario cuando solo hay uno
+    if len(resultado) == 1:
+        fila = resultado.iloc[0]
+        actual = estado['df_scores'].loc[fila['COUNTRY_REGION']]
+
+        st.subheader(f"🌍 {fila['Pais']}")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.metric(
+                "Cluster",
+                f"{fila['Cluster_Simulado']}",
+                delta="cambia" if fila['Cambia_Cluster'] else "sin cambios",
+                delta_color="off"
+            )
+            st.markdown(f"**Tipología:** {fila['Tipologia_Actual']} → **{fila['Tipologia_Simulada']}**")
+
+        with col2:
+            st.metric(
+                "Score General",
+                f"{fila['Score_General']:.1f}/100",
+                delta=f"{fila['Delta_Score_General']:+.1f}"
+            )
+
+        areas = list(AIRA_GRUPOS)
+        st.dataframe(
+            pd.DataFrame({
+                'Área': areas,
+                'Actual': [actual[a] for a in areas],
+                'Simulado': [fila[a] for a in areas]
+            }).style.format({'Actual': '{:.1f}', 'Simulado': '{:.1f}'}),
+            width='stretch',
+            hide_index=True
+        )
+
+    st.subheader("📋 Resultado por Escenario")
+
+    st.dataframe(
+        resultado.drop(columns=['COUNTRY_REGION']).style.format({
+            area: '{:.1f}' for area in list(AIRA_GRUPOS) + ['Score_General', 'Delta_Score_General']
+        }),
+        width='stretch',
+        hide_index=True
+    )
+
+    boton_descarga(
+        "📥 Descargar resultados de la simulación",
+        clave=('simulacion', cambios),
+        obtener_df=lambda: resultado,
+        nombre_archivo="aira_simulacion",
+        key="descarga_simulacion"
+    )
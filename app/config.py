@@ -14,6 +14,24 @@ import os
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_PATH = os.path.join(BASE_DIR, 'Data', 'AIRAData_final.csv')
 
+# Exportación completa de la OMS (entrada de ingesta.py) y caché columnar del cubo de respuestas
+RAW_DATA_PATH = os.path.join(BASE_DIR, 'Data', 'AIRAData.csv')
+CACHE_DIR = os.path.join(BASE_DIR, 'Data', 'cache')
+
+# Libro de metadatos de la OMS (opcional; ver metadatos.py)
+METADATA_PATH = os.path.join(BASE_DIR, 'Data', 'AIRA Metadata.xlsx')
+
+# Almacén de oleadas de la encuesta (una partición por oleada)
+OLAS_DIR = os.path.join(BASE_DIR, 'Data', 'oleadas')
+OLA_INICIAL = '2024-2025'
+
+# Instrumentación de rendimiento (opcional, activar con AIRA_PERFILADO=1)
+PERFILADO_ACTIVO = os.environ.get('AIRA_PERFILADO', '0') == '1'
+PERFILADO_LOG_PATH = os.environ.get(
+    'AIRA_PERFILADO_LOG',
+    os.path.join(BASE_DIR, 'logs', 'perfilado.jsonl')
+)
+
 # Configuración de Plotly
 PLOTLY_CONFIG = {
     'displayModeBar': True,
@@ -59,6 +77,18 @@ VALUE_MAPPING = {
     'N/A': -2
 }
 
+# Orden fijo de los códigos de respuesta en el cubo int8 (índice = código)
+CODIGOS_RESPUESTA = ['YES', 'UD', 'NO', 'DNK', 'N/A']
+
+# Codificación ordinal para Machine Learning
+ML_ENCODING = {
+    'YES': 2,  # Completamente implementado
+    'UD': 1,   # En desarrollo / No sabe
+    'NO': 0,   # No implementado
+    'DNK': 1,  # No sabe -> tratado como "en desarrollo"
+    'N/A': 0   # No aplicable -> tratado como "no"
+}
+
 # Colores para las respuestas en mapas y gráficos
 # Colores discretos específicos para cada respuesta
 COLOR_DISCRETE_MAP = {
@@ -131,6 +161,9 @@ SECCIONES = {
 
 # ==================== TÍTULOS DE VARIABLES AIRA ====================
 
+# Formato de los códigos de variable AIRA (AIRA_1 ... AIRA_75)
+PATRON_VARIABLE = r'^AIRA_\d+$'
+
 AIRA_TITULOS = {
     'AIRA_1': 'Estrategia nacional de IA en el sector de la salud',
     'AIRA_2': 'Estrategia nacional de IA transversal (no sectorial)',
@@ -192,6 +225,9 @@ AIRA_TITULOS = {
     'AIRA_75': 'Colaboración internacional en desarrollo de capacidades'
 }
 
+# Peso de cada variable según el libro de metadatos (1.0 si no se indica)
+AIRA_PESOS = {}
+
 # ==================== GRUPOS PARA ANÁLISIS ML ====================
 
 # Grupos de variables para cálculo de scores por área
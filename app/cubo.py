@@ -0,0 +1,170 @@
+"""
+Cubo de respuestas AIRA
+=======================
+Este módulo contiene la representación compacta de las respuestas AIRA
+como un "cubo" int8 (países x variables), donde cada celda guarda el
+índice del código de respuesta en CODIGOS_RESPUESTA o -1 si no hay respuesta.
+
+El cubo es un diccionario con las claves:
+    - 'paises': lista de códigos ISO de país (filas, orden alfabético)
+    - 'variables': lista de códigos AIRA (columnas, mismo orden que el pivot)
+    - 'codigos': np.ndarray int8 de forma (n_paises, n_variables)
+    - 'indice_paises' / 'indice_variables': código -> posición
+
+En disco, un cubo ocupa un directorio con 'codigos.npy' (matriz int8 en
+orden C) y 'meta.json' (países y variables).
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import CODIGOS_RESPUESTA, ML_ENCODING
+
+
+# Valor de las celdas sin respuesta
+SIN_RESPUESTA = -1
+
+# Tabla de codificación ML indexada por código del cubo (la última posición = sin respuesta)
+TABLA_ML = np.array([ML_ENCODING[c] for c in CODIGOS_RESPUESTA] + [np.nan], dtype=float)
+
+
+# ==================== CONSTRUCCIÓN ====================
+
+def codificar_respuestas(respuestas):
+    """
+    Convierte respuestas AIRA ('YES', 'NO', ...) en códigos int8 del cubo.
+
+    Args:
+        respuestas (array-like): Respuestas en texto (NaN = sin respuesta)
+
+    Returns:
+        np.ndarray: Códigos int8 (SIN_RESPUESTA para valores ausentes o desconocidos)
+    """
+    categorias = pd.Categorical(respuestas, categories=CODIGOS_RESPUESTA)
+    return categorias.codes.astype(np.int8)
+
+
+def construir_cubo(df):
+    """
+    Construye el cubo int8 a partir del DataFrame AIRA en formato largo.
+
+    Args:
+        df (pd.DataFrame): DataFrame con columnas 'COUNTRY_REGION', 'Measure_code', 'AIRA_SIMPLE'
+
+    Returns:
+        dict: Cubo de respuestas
+    """
+    paises = pd.Categorical(df['COUNTRY_REGION'])
+    variables = pd.Categorical(df['Measure_code'])
+
+    codigos = np.full((len(paises.categories), len(variables.categories)), SIN_RESPUESTA, dtype=np.int8)
+    codigos[paises.codes, variables.codes] = codificar_respuestas(df['AIRA_SIMPLE'])
+
+    return crear_cubo(list(paises.categories), list(variables.categories), codigos)
+
+
+def crear_cubo(paises, variables, codigos):
+    """
+    Crea el diccionario del cubo con sus índices de búsqueda.
+
+    Args:
+        paises (list): Códigos de país (filas)
+        variables (list): Códigos de variable (columnas)
+        codigos (np.ndarray): Matriz int8 (n_paises, n_variables)
+
+    Returns:
+        dict: Cubo de respuestas
+    """
+    return {
+        'paises': list(paises),
+        'variables': list(variables),
+        'codigos': codigos,
+        'indice_paises': {p: i for i, p in enumerate(paises)},
+        'indice_variables': {v: j for j, v in enumerate(variables)}
+    }
+
+
+# ==================== CONVERSIONES ====================
+
+def codificar_ml(codigos):
+    """
+    Aplica la codificación ordinal de ML (ML_ENCODING) a códigos del cubo.
+
+    Args:
+        codigos (np.ndarray): Códigos int8 del cubo
+
+    Returns:
+        np.ndarray: Valores float (NaN = sin respuesta)
+    """
+    # SIN_RESPUESTA (-1) indexa la última posición de la tabla (NaN)
+    return TABLA_ML[codigos]
+
+
+def cubo_a_pivot(cubo):
+    """
+    Reconstruye la tabla pivotada (países x variables) con los códigos de texto.
+
+    Args:
+        cubo (dict): Cubo de respuestas
+
+    Returns:
+        pd.DataFrame: Igual que df.pivot(index='COUNTRY_REGION', columns='Measure_code')
+    """
+    etiquetas = np.array(CODIGOS_RESPUESTA + [np.nan], dtype=object)
+    return pd.DataFrame(
+        etiquetas[cubo['codigos']],
+        index=pd.Index(cubo['paises'], name='COUNTRY_REGION'),
+        columns=pd.Index(cubo['variables'], name='Measure_code')
+    )
+
+
+# ==================== PERSISTENCIA ====================
+
+ARCHIVO_CODIGOS = 'codigos.npy'
+ARCHIVO_META = 'meta.json'
+
+
+def guardar_cubo(cubo, directorio):
+    """
+    Guarda el cubo en un directorio ('codigos.npy' + 'meta.json').
+
+    Args:
+        cubo (dict): Cubo de respuestas
+        directorio (str): Directorio de destino (se crea si no existe)
+    """
+    os.makedirs(directorio, exist_ok=True)
+    np.save(os.path.join(directorio, ARCHIVO_CODIGOS), np.ascontiguousarray(cubo['codigos']))
+    with open(os.path.join(directorio, ARCHIVO_META), 'w', encoding='utf-8') as f:
+        json.dump({'paises': cubo['paises'], 'variables': cubo['variables'],
+                   'codigos_respuesta': CODIGOS_RESPUESTA}, f, ensure_ascii=False)
+
+
+def existe_cubo(directorio):
+    """
+    Indica si el directorio contiene un cubo guardado.
+    """
+    return (os.path.exists(os.path.join(directorio, ARCHIVO_CODIGOS))
+            and os.path.exists(os.path.join(directorio, ARCHIVO_META)))
+
+
+def cargar_cubo(directorio, mmap=False):
+    """
+    Carga un cubo guardado con guardar_cubo().
+
+    Args:
+        directorio (str): Directorio del cubo
+        mmap (bool): Si es True, la matriz se abre como memmap de solo lectura
+
+    Returns:
+        dict: Cubo de respuestas
+    """
+    with open(os.path.join(directorio, ARCHIVO_META), encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('codigos_respuesta', CODIGOS_RESPUESTA) != CODIGOS_RESPUESTA:
+        raise ValueError(f"El cubo de '{directorio}' usa otros códigos de respuesta: {meta['codigos_respuesta']}")
+
+    codigos = np.load(os.path.join(directorio, ARCHIVO_CODIGOS), mmap_mode='r' if mmap else None)
+    return crear_cubo(meta['paises'], meta['variables'], codigos)
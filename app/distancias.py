@@ -0,0 +1,321 @@
+"""
+Distancias Categóricas y K-medoides para AIRA
+=============================================
+Alternativa al K-means sobre la codificación ordinal de preparar_datos_ml(),
+que agrupa DNK con UD y N/A con NO. Aquí se trabaja con los códigos de
+respuesta originales del cubo (cubo.py) y se agrupa con K-medoides sobre
+una distancia categórica:
+
+- 'hamming': proporción de variables con respuesta distinta (la ausencia
+  de respuesta cuenta como una categoría más).
+- 'gower': solo sobre las variables respondidas por ambos países; YES/UD/NO
+  se tratan como ordinales (NO-UD y UD-YES a distancia 0.5, NO-YES a 1) y
+  DNK/N/A como nominales.
+
+Cada respuesta se codifica en one-hot y las coincidencias entre todos los
+pares de unidades se cuentan por bloques de filas, con productos de matrices
+(BLAS) o con AND + popcount sobre el one-hot empaquetado en bits (64 variables
+por palabra uint64). La memoria intermedia queda acotada por MAX_BYTES_BLOQUE,
+de modo que la matriz completa se calcula para decenas de miles de unidades.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import silhouette_score
+
+from config import CODIGOS_RESPUESTA
+from cubo import SIN_RESPUESTA
+from clustering import K_RANGE
+from instrumentacion import medir
+from entorno import cache_recurso
+
+
+METRICAS = ['gower', 'hamming']
+MOTORES = ['matmul', 'popcount']
+
+# Memoria máxima aproximada (bytes) de los conteos intermedios de cada bloque de filas
+MAX_BYTES_BLOQUE = 64 * 2**20
+
+# Pares de respuestas ordinales adyacentes (distancia 0.5 en Gower)
+PARES_ADYACENTES = [('NO', 'UD'), ('UD', 'YES')]
+
+# Tabla de popcount por byte para NumPy < 2.0 (sin np.bitwise_count)
+_POPCOUNT_BYTE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+# ==================== EMPAQUETADO EN BITS ====================
+
+def _popcount(palabras):
+    """
+    Cuenta los bits a 1 de cada palabra uint64.
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(palabras)
+    bytes_ = palabras.view(np.uint8).reshape(palabras.shape + (8,))
+    return _POPCOUNT_BYTE[bytes_].sum(axis=-1, dtype=np.uint8)
+
+
+def empaquetar_bits(mascara):
+    """
+    Empaqueta una matriz booleana (unidades x variables) en palabras uint64.
+
+    Args:
+        mascara (np.ndarray): Matriz booleana
+
+    Returns:
+        np.ndarray: Matriz uint64 (unidades x ceil(variables / 64))
+    """
+    n, m = mascara.shape
+    relleno = (-m) % 64
+    if relleno:
+        mascara = np.hstack([mascara, np.zeros((n, relleno), dtype=bool)])
+    return np.ascontiguousarray(np.packbits(mascara, axis=1)).view(np.uint64)
+
+
+def contar_coincidencias(A, B, tam_bloque=None):
+    """
+    Cuenta, para cada par de filas (i, j), los bits a 1 comunes de A[i] y B[j].
+
+    Args:
+        A (np.ndarray): Matriz uint64 empaquetada (n x palabras)
+        B (np.ndarray): Matriz uint64 empaquetada (m x palabras)
+        tam_bloque (int, optional): Filas de A por bloque (por defecto según MAX_BYTES_BLOQUE)
+
+    Returns:
+        np.ndarray: Conteos int32 (n x m)
+    """
+    n, palabras = A.shape
+    m = len(B)
+    if tam_bloque is None:
+        tam_bloque = max(1, MAX_BYTES_BLOQUE // max(1, m * palabras * 8))
+
+    conteos = np.empty((n, m), dtype=np.int32)
+    for inicio in range(0, n, tam_bloque):
+        bloque = A[inicio:inicio + tam_bloque]
+        comunes = bloque[:, None, :] & B[None, :, :]
+        conteos[inicio:inicio + tam_bloque] = _popcount(comunes).sum(axis=2, dtype=np.int32)
+    return conteos
+
+
+# ==================== MATRICES DE DISTANCIA ====================
+
+def _operandos(codigos, metrica):
+    """
+    Prepara las parejas de matrices one-hot (A, B) cuyos productos A·Bᵀ dan
+    los conteos por par de unidades que necesita la métrica.
+    """
+    one_hot = {codigo: codigos == i for i, codigo in enumerate(CODIGOS_RESPUESTA)}
+    respuestas = np.hstack(list(one_hot.values()))
+
+    if metrica == 'hamming':
+        # Variables con la misma respuesta, contando 'sin respuesta' como categoría
+        iguales = np.hstack([respuestas, codigos == SIN_RESPUESTA])
+        return {'iguales': (iguales, iguales)}
+
+    presentes = codigos != SIN_RESPUESTA
+    return {
+        # Variables con la misma respuesta en ambos países
+        'iguales': (respuestas, respuestas),
+        # Variables respondidas por ambos países
+        'ambos': (presentes, presentes),
+        # Parejas ordinales adyacentes (NO-UD, UD-NO, UD-YES, YES-UD)
+        'adyacentes': (
+            np.hstack([one_hot[a] for a, b in PARES_ADYACENTES] + [one_hot[b] for a, b in PARES_ADYACENTES]),
+            np.hstack([one_hot[b] for a, b in PARES_ADYACENTES] + [one_hot[a] for a, b in PARES_ADYACENTES])
+        )
+    }
+
+
+@medir
+@cache_recurso
+def calcular_distancias(codigos, metrica='gower', motor='matmul'):
+    """
+    Calcula la matriz de distancias categóricas entre todas las filas del cubo.
+
+    Los conteos por par se obtienen por bloques de filas, con uno de dos motores:
+    'matmul' (producto de matrices one-hot float32, usa BLAS) o 'popcount'
+    (one-hot empaquetado en bits, AND + popcount; 32 veces menos memoria por operando).
+    Los conteos son enteros pequeños, así que ambos motores dan el mismo resultado.
+
+    Args:
+        codigos (np.ndarray): Códigos int8 del cubo (unidades x variables)
+        metrica (str): 'gower' o 'hamming'
+        motor (str): 'matmul' o 'popcount'
+
+    Returns:
+        np.ndarray: Distancias float32 en [0, 1] (unidades x unidades), de solo lectura.
+                    Con Streamlit se comparte entre sesiones sin copiarse
+    """
+    if metrica not in METRICAS:
+        raise ValueError(f"Métrica desconocida: {metrica}. Opciones: {METRICAS}")
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido: {motor}. Opciones: {MOTORES}")
+
+    n, n_variables = codigos.shape
+    if motor == 'popcount':
+        operandos = {nombre: (empaquetar_bits(A), empaquetar_bits(B))
+                     for nombre, (A, B) in _operandos(codigos, metrica).items()}
+        ancho_fila = max(B.shape[1] * 8 for _, B in operandos.values())
+    else:
+        operandos = {nombre: (A.astype(np.float32), B.astype(np.float32))
+                     for nombre, (A, B) in _operandos(codigos, metrica).items()}
+        ancho_fila = 4
+
+    distancias = np.empty((n, n), dtype=np.float32)
+    tam_bloque = max(1, MAX_BYTES_BLOQUE // max(1, n * ancho_fila))
+
+    for inicio in range(0, n, tam_bloque):
+        filas = slice(inicio, min(inicio + tam_bloque, n))
+        if motor == 'popcount':
+            conteos = {nombre: contar_coincidencias(A[filas], B, tam_bloque=tam_bloque)
+                       for nombre, (A, B) in operandos.items()}
+        else:
+            conteos = {nombre: (A[filas] @ B.T).astype(np.int32) for nombre, (A, B) in operandos.items()}
+
+        if metrica == 'hamming':
+            distancias[filas] = 1 - conteos['iguales'] / n_variables
+        else:
+            ambos = conteos['ambos']
+            diferencias = ambos - conteos['iguales'] - 0.5 * conteos['adyacentes']
+            distancias[filas] = np.divide(diferencias, ambos, out=np.ones(ambos.shape), where=ambos > 0)
+
+    np.fill_diagonal(distancias, 0)
+    distancias.setflags(write=False)
+    return distancias
+
+
+# ==================== K-MEDOIDES ====================
+
+def _kmedoides(distancias, k, rng, max_iter):
+    """
+    Una ejecución de K-medoides (iteración alternada) con inicialización k-medoids++.
+    """
+    n = len(distancias)
+
+    medoides = [int(rng.integers(n))]
+    minimas = distancias[medoides[0]].astype(float)
+    for _ in range(1, k):
+        pesos = minimas ** 2
+        if pesos.sum() > 0:
+            nuevo = int(rng.choice(n, p=pesos / pesos.sum()))
+        else:
+            nuevo = int(rng.choice(np.setdiff1d(np.arange(n), medoides)))
+        medoides.append(nuevo)
+        minimas = np.minimum(minimas, distancias[nuevo])
+    medoides = np.array(medoides)
+
+    for _ in range(max_iter):
+        etiquetas = np.argmin(distancias[:, medoides], axis=1)
+        etiquetas[medoides] = np.arange(k)
+
+        # Nuevo medoide de cada cluster: el miembro con menor suma de distancias al resto
+        nuevos = medoides.copy()
+        for c in range(k):
+            miembros = np.flatnonzero(etiquetas == c)
+            nuevos[c] = miembros[np.argmin(distancias[np.ix_(miembros, miembros)].sum(axis=1))]
+
+        if np.array_equal(nuevos, medoides):
+            break
+        medoides = nuevos
+
+    etiquetas = np.argmin(distancias[:, medoides], axis=1)
+    etiquetas[medoides] = np.arange(k)
+    coste = float(distancias[np.arange(n), medoides[etiquetas]].sum())
+    return etiquetas, medoides, coste
+
+
+def kmedoides(distancias, k, n_init=10, max_iter=100, random_state=42):
+    """
+    Agrupa con K-medoides sobre una matriz de distancias precalculada.
+
+    Args:
+        distancias (np.ndarray): Matriz de distancias (n x n)
+        k (int): Número de clusters
+        n_init (int): Número de inicializaciones (se conserva la de menor coste)
+        max_iter (int): Iteraciones máximas por inicialización
+        random_state (int): Semilla
+
+    Returns:
+        tuple: (etiquetas, medoides, coste)
+    """
+    rng = np.random.default_rng(random_state)
+    mejor = None
+    for _ in range(n_init):
+        resultado = _kmedoides(distancias, k, rng, max_iter)
+        if mejor is None or resultado[2] < mejor[2]:
+            mejor = resultado
+    return mejor
+
+
+# ==================== CLUSTERING DE PAÍSES ====================
+
+@medir(nombre='barrido_k_medoides')
+@cache_recurso
+def calcular_barrido_k_medoides(codigos, metrica='gower', k_range=K_RANGE):
+    """
+    Ajusta K-medoides para cada K del rango sobre la misma matriz de distancias.
+
+    Args:
+        codigos (np.ndarray): Códigos int8 del cubo (países x variables)
+        metrica (str): 'gower' o 'hamming'
+        k_range (range): Rango de valores K a evaluar
+
+    Returns:
+        dict: Mismas claves que calcular_barrido_k(); 'inertias' contiene el coste
+              (suma de distancias de cada país a su medoide).
+              Con Streamlit se comparte entre sesiones: no debe modificarse
+    """
+    distancias = calcular_distancias(codigos, metrica)
+
+    costes = []
+    silhouette_scores = []
+    etiquetas = {}
+    for k in k_range:
+        etiquetas[k], _, coste = kmedoides(distancias, k)
+        costes.append(coste)
+        silhouette_scores.append(silhouette_score(distancias, etiquetas[k], metric='precomputed'))
+
+    k_optimo = list(k_range)[silhouette_scores.index(max(silhouette_scores))]
+
+    return {
+        'k_range': k_range,
+        'inertias': costes,
+        'silhouette_scores': silhouette_scores,
+        'k_optimo': k_optimo,
+        'etiquetas': etiquetas
+    }
+
+
+@medir
+@cache_recurso
+def aplicar_kmedoides(codigos, paises, k, metrica='gower'):
+    """
+    Aplica K-medoides final con K clusters (equivalente a aplicar_clustering()).
+
+    Args:
+        codigos (np.ndarray): Códigos int8 del cubo (países x variables)
+        paises (list): Códigos ISO de las filas del cubo
+        k (int): Número de clusters
+        metrica (str): 'gower' o 'hamming'
+
+    Returns:
+        tuple: (clusters, df_clusters, modelo)
+            - clusters: np.ndarray con la asignación de cada país
+            - df_clusters: DataFrame con columnas 'COUNTRY_REGION' y 'Cluster'
+            - modelo: dict con 'medoides' (códigos de país), 'coste' y 'metrica'
+            Con Streamlit se comparte entre sesiones: no debe modificarse
+    """
+    distancias = calcular_distancias(codigos, metrica)
+    clusters, medoides, coste = kmedoides(distancias, k)
+
+    df_clusters = pd.DataFrame({
+        'COUNTRY_REGION': list(paises),
+        'Cluster': clusters
+    })
+
+    modelo = {
+        'medoides': [paises[i] for i in medoides],
+        'coste': coste,
+        'metrica': metrica
+    }
+    return clusters, df_clusters, modelo
@@ -0,0 +1,281 @@
+"""
+Entorno de ejecución de AIRA
+============================
+Este módulo contiene los puntos de extensión que el núcleo de cálculo
+(utils.py, clustering.py, visualizations.py) usa en lugar de importar
+Streamlit directamente: caché de resultados, reporte de errores y avisos,
+y tema de los gráficos.
+
+Por defecto se usan implementaciones puras de Python (caché en memoria,
+excepciones, warnings y tema fijo), de modo que el núcleo funciona en procesos de
+trabajo, scripts por lotes o benchmarks. La aplicación Streamlit registra
+sus propios enlaces con adaptador_streamlit.instalar().
+"""
+
+import copy
+import functools
+import hashlib
+import inspect
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class ErrorDatosAIRA(Exception):
+    """
+    Error en la carga o validación de los datos AIRA.
+    """
+
+
+# Número máximo de resultados guardados por función en la caché por defecto
+MAX_ENTRADAS_CACHE = 32
+
+# Implementaciones registradas (None = implementación por defecto)
+_backend = {
+    'cache_datos': None,
+    'cache_recurso': None,
+    'error': None,
+    'aviso': None,
+    'tema': None
+}
+
+# Tema usado cuando no hay proveedor registrado ('dark' o 'light')
+_tema_por_defecto = {'valor': 'dark'}
+
+
+# ==================== CACHÉ EN MEMORIA POR DEFECTO ====================
+
+def _clave_valor(valor):
+    """
+    Calcula una clave hashable para un argumento de una función cacheada.
+    Los DataFrames y arrays se identifican por su contenido.
+    """
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        hash_filas = pd.util.hash_pandas_object(valor, index=True).values
+        columnas = tuple(valor.columns) if isinstance(valor, pd.DataFrame) else (valor.name,)
+        return ('pandas', columnas, hashlib.sha1(hash_filas.tobytes()).hexdigest())
+
+    if isinstance(valor, np.ndarray):
+        return ('numpy', valor.shape, str(valor.dtype),
+                hashlib.sha1(np.ascontiguousarray(valor).tobytes()).hexdigest())
+
+    if isinstance(valor, (list, tuple)):
+        return (type(valor).__name__,) + tuple(_clave_valor(v) for v in valor)
+
+    if isinstance(valor, dict):
+        return ('dict',) + tuple(sorted((k, _clave_valor(v)) for k, v in valor.items()))
+
+    try:
+        hash(valor)
+        return valor
+    except TypeError:
+        return ('repr', repr(valor))
+
+
+def _cache_en_memoria(func, copiar=False):
+    """
+    Caché LRU en memoria del proceso. Igual que en Streamlit, los
+    parámetros cuyo nombre empieza por '_' no forman parte de la clave.
+
+    Con copiar=True se comporta como st.cache_data: guarda una copia del
+    resultado y devuelve otra en cada acierto, así que modificar lo devuelto
+    no altera la caché. Sin copiar (st.cache_resource) se comparte el objeto.
+    """
+    firma = inspect.signature(func)
+    resultados = OrderedDict()
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def envoltura(*args, **kwargs):
+        argumentos = firma.bind(*args, **kwargs)
+        argumentos.apply_defaults()
+        clave = tuple(
+            (nombre, _clave_valor(valor))
+            for nombre, valor in argumentos.arguments.items()
+            if not nombre.startswith('_')
+        )
+
+        with lock:
+            if clave in resultados:
+                resultados.move_to_end(clave)
+                guardado = resultados[clave]
+                return copy.deepcopy(guardado) if copiar else guardado
+
+        resultado = func(*args, **kwargs)
+
+        with lock:
+            resultados[clave] = copy.deepcopy(resultado) if copiar else resultado
+            if len(resultados) > MAX_ENTRADAS_CACHE:
+                resultados.popitem(last=False)
+
+        return resultado
+
+    envoltura.clear = resultados.clear
+    return envoltura
+
+
+def _cache_datos_en_memoria(func):
+    """
+    Caché en memoria por defecto de cache_datos (devuelve copias).
+    """
+    return _cache_en_memoria(func, copiar=True)
+
+
+# Caché por defecto de cada tipo cuando no hay implementación registrada
+_cache_por_defecto = {
+    'cache_datos': _cache_datos_en_memoria,
+    'cache_recurso': _cache_en_memoria
+}
+
+
+# ==================== DECORADORES DE CACHÉ ====================
+
+def _cache_perezosa(tipo, func):
+    """
+    Envuelve una función con la caché registrada para 'tipo'. El enlace se
+    resuelve en la primera llamada (y de nuevo si cambia la implementación),
+    por lo que el adaptador puede instalarse después de importar los módulos.
+    """
+    enlace = {'backend': None, 'impl': None}
+
+    @functools.wraps(func)
+    def envoltura(*args, **kwargs):
+        backend = _backend[tipo] or _cache_por_defecto[tipo]
+        if enlace['backend'] is not backend:
+            enlace['impl'] = backend(func)
+            enlace['backend'] = backend
+        return enlace['impl'](*args, **kwargs)
+
+    return envoltura
+
+
+def cache_datos(func):
+    """
+    Decorador de caché para resultados de datos (DataFrames, listas, dicts).
+    Con Streamlit equivale a st.cache_data; como ella, cada llamada devuelve
+    una copia del resultado cacheado.
+
+    Args:
+        func (callable): Función a cachear
+
+    Returns:
+        callable: Función cacheada
+    """
+    return _cache_perezosa('cache_datos', func)
+
+
+def cache_recurso(func):
+    """
+    Decorador de caché para recursos compartidos que no deben copiarse
+    (modelos, índices, figuras). Con Streamlit equivale a st.cache_resource.
+
+    Args:
+        func (callable): Función a cachear
+
+    Returns:
+        callable: Función cacheada
+    """
+    return _cache_perezosa('cache_recurso', func)
+
+
+# ==================== REPORTE DE ERRORES ====================
+
+def reportar_error(mensaje):
+    """
+    Reporta un error fatal y detiene la ejecución.
+    Por defecto lanza ErrorDatosAIRA; en Streamlit muestra st.error y llama a st.stop().
+
+    Args:
+        mensaje (str): Mensaje de error para el usuario
+    """
+    if _backend['error'] is not None:
+        _backend['error'](mensaje)
+
+    # Si la implementación registrada no detuvo la ejecución, se lanza la excepción
+    raise ErrorDatosAIRA(mensaje)
+
+
+def reportar_aviso(mensaje):
+    """
+    Reporta un problema no fatal sin detener la ejecución.
+    Por defecto emite un UserWarning; en Streamlit muestra st.warning.
+
+    Args:
+        mensaje (str): Mensaje de aviso para el usuario
+    """
+    if _backend['aviso'] is not None:
+        _backend['aviso'](mensaje)
+    else:
+        warnings.warn(mensaje, stacklevel=2)
+
+
+# ==================== TEMA DE GRÁFICOS ====================
+
+def obtener_tema():
+    """
+    Devuelve el tema actual de los gráficos.
+
+    Returns:
+        str: 'dark' o 'light'
+    """
+    if _backend['tema'] is not None:
+        return _backend['tema']()
+    return _tema_por_defecto['valor']
+
+
+def establecer_tema(tema):
+    """
+    Fija el tema por defecto cuando no hay proveedor registrado
+    (scripts por lotes, procesos de trabajo).
+
+    Args:
+        tema (str): 'dark' o 'light'
+    """
+    _tema_por_defecto['valor'] = tema
+
+
+# ==================== REGISTRO DE IMPLEMENTACIONES ====================
+
+def registrar_cache(cache_datos_impl=None, cache_recurso_impl=None):
+    """
+    Registra las implementaciones de caché (decoradores que reciben una función).
+
+    Args:
+        cache_datos_impl (callable, optional): Decorador para cache_datos
+        cache_recurso_impl (callable, optional): Decorador para cache_recurso
+    """
+    _backend['cache_datos'] = cache_datos_impl
+    _backend['cache_recurso'] = cache_recurso_impl
+
+
+def registrar_reporte_errores(funcion):
+    """
+    Registra la función que muestra los errores fatales al usuario.
+
+    Args:
+        funcion (callable): Función que recibe el mensaje de error
+    """
+    _backend['error'] = funcion
+
+
+def registrar_reporte_avisos(funcion):
+    """
+    Registra la función que muestra los avisos no fatales al usuario.
+
+    Args:
+        funcion (callable): Función que recibe el mensaje de aviso
+    """
+    _backend['aviso'] = funcion
+
+
+def registrar_proveedor_tema(funcion):
+    """
+    Registra la función que devuelve el tema actual de los gráficos.
+
+    Args:
+        funcion (callable): Función sin argumentos que devuelve 'dark' o 'light'
+    """
+    _backend['tema'] = funcion
@@ -0,0 +1,226 @@
+"""
+Estabilidad de los Clusters para AIRA
+=====================================
+Este módulo mide la robustez del clustering K-means repitiéndolo sobre
+cientos de remuestreos de los países (submuestreo sin reemplazo o bootstrap)
+repartidos entre varios procesos.
+
+Para cada remuestreo se acumulan, en matrices preasignadas de tamaño
+países x países, cuántas veces cada par de países cae en el mismo cluster
+y cuántas veces ambos están en la muestra. Así la memoria es O(n²)
+independientemente del número de remuestreos. Además se calcula la
+estabilidad de Jaccard de cada cluster de referencia (Hennig, 2007):
+la media, entre remuestreos, del mayor índice de Jaccard con algún
+cluster del remuestreo.
+
+Interpretación orientativa de la estabilidad de Jaccard:
+    > 0.75: cluster estable; 0.6-0.75: patrón reconocible; < 0.5: cluster disuelto
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+
+from clustering import aplicar_clustering
+from config import COUNTRY_NAMES
+from instrumentacion import medir
+from entorno import cache_datos
+
+
+N_REMUESTREOS = 200
+FRACCION_SUBMUESTREO = 0.8
+METODOS_REMUESTREO = ['submuestreo', 'bootstrap']
+
+# Umbrales de Jaccard para clasificar la estabilidad de cada cluster
+UMBRALES_JACCARD = [(0.75, 'Estable'), (0.6, 'Patrón reconocible'), (0.5, 'Débil'), (0.0, 'Disuelto')]
+
+# Datos compartidos por cada proceso de trabajo (se fijan una vez en el inicializador)
+_datos_proceso = {}
+
+
+# ==================== REMUESTREOS (PROCESOS DE TRABAJO) ====================
+
+def _inicializar_proceso(X, etiquetas_ref, k):
+    """
+    Guarda en cada proceso los datos comunes a todos los remuestreos.
+    """
+    _datos_proceso.update({'X': X, 'etiquetas_ref': etiquetas_ref, 'k': k})
+
+
+def _lote_remuestreos(semillas, fraccion, metodo):
+    """
+    Ejecuta un lote de remuestreos y devuelve sus acumuladores parciales.
+
+    Args:
+        semillas (list): Semilla de cada remuestreo del lote
+        fraccion (float): Fracción de países en cada submuestra
+        metodo (str): 'submuestreo' o 'bootstrap'
+
+    Returns:
+        tuple: (coasignaciones, comuestreos, suma_jaccard, conteo_jaccard)
+    """
+    X = _datos_proceso['X']
+    etiquetas_ref = _datos_proceso['etiquetas_ref']
+    k = _datos_proceso['k']
+    n = len(X)
+
+    coasignaciones = np.zeros((n, n), dtype=np.int32)
+    comuestreos = np.zeros((n, n), dtype=np.int32)
+    suma_jaccard = np.zeros(k)
+    conteo_jaccard = np.zeros(k, dtype=np.int64)
+
+    for semilla in semillas:
+        rng = np.random.default_rng(semilla)
+        if metodo == 'bootstrap':
+            muestra = rng.integers(0, n, size=n)
+        else:
+            muestra = rng.choice(n, size=max(int(round(fraccion * n)), k + 1), replace=False)
+
+        modelo = KMeans(n_clusters=k, random_state=int(semilla % 2**31), n_init=10).fit(X[muestra])
+
+        # Cada país de la muestra cuenta una vez (en bootstrap puede repetirse)
+        indices, posicion = np.unique(muestra, return_index=True)
+        etiquetas = modelo.labels_[posicion]
+
+        pertenencia = np.zeros((len(indices), k), dtype=np.int32)
+        pertenencia[np.arange(len(indices)), etiquetas] = 1
+        bloque = np.ix_(indices, indices)
+        coasignaciones[bloque] += pertenencia @ pertenencia.T
+        comuestreos[bloque] += 1
+
+        # Jaccard de cada cluster de referencia (restringido a la muestra) con su mejor pareja
+        referencia = etiquetas_ref[indices]
+        contingencia = np.bincount(referencia * k + etiquetas, minlength=k * k).reshape(k, k)
+        tam_ref = contingencia.sum(axis=1)
+        tam_nuevo = contingencia.sum(axis=0)
+        union = tam_ref[:, None] + tam_nuevo[None, :] - contingencia
+        jaccard = np.divide(contingencia, union, out=np.zeros((k, k)), where=union > 0).max(axis=1)
+
+        presentes = tam_ref > 0
+        suma_jaccard[presentes] += jaccard[presentes]
+        conteo_jaccard[presentes] += 1
+
+    return coasignaciones, comuestreos, suma_jaccard, conteo_jaccard
+
+
+# ==================== ANÁLISIS DE ESTABILIDAD ====================
+
+def clasificar_estabilidad(jaccard):
+    """
+    Clasifica un valor de estabilidad de Jaccard según UMBRALES_JACCARD.
+
+    Args:
+        jaccard (float): Estabilidad media de Jaccard
+
+    Returns:
+        str: Categoría de estabilidad
+    """
+    for umbral, categoria in UMBRALES_JACCARD:
+        if jaccard >= umbral:
+            return categoria
+    return UMBRALES_JACCARD[-1][1]
+
+
+@medir
+@cache_datos
+def calcular_estabilidad(df_filled, k, n_remuestreos=N_REMUESTREOS, metodo='submuestreo',
+                         fraccion=FRACCION_SUBMUESTREO, procesos=None, semilla=42):
+    """
+    Evalúa la estabilidad del clustering K-means mediante remuestreos en paralelo.
+
+    Args:
+        df_filled (pd.DataFrame): Datos codificados sin valores faltantes
+        k (int): Número de clusters
+        n_remuestreos (int): Número de remuestreos
+        metodo (str): 'submuestreo' (sin reemplazo) o 'bootstrap' (con reemplazo)
+        fraccion (float): Fracción de países de cada submuestra (solo submuestreo)
+        procesos (int, optional): Número de procesos (por defecto, núcleos disponibles).
+                                  Con 1 se ejecuta en el proceso actual. Los procesos
+                                  se arrancan con 'spawn', no con fork: el servidor de
+                                  Streamlit tiene varios hilos y un fork podría bloquearse
+        semilla (int): Semilla base; los resultados no dependen del número de procesos
+
+    Returns:
+        dict: Diccionario con:
+            - 'matriz_coasignacion': DataFrame países x países con la proporción de
+              remuestreos en que ambos países comparten cluster (cuando ambos están en la muestra)
+            - 'jaccard': DataFrame por cluster con 'Jaccard_Medio', 'Estabilidad' y 'N_Paises'
+            - 'estabilidad_paises': DataFrame por país con su coasignación media con el
+              resto de países de su cluster de referencia
+            - 'etiquetas': asignación de referencia (K-means completo)
+            - 'n_remuestreos', 'metodo'
+    """
+    if metodo not in METODOS_REMUESTREO:
+        raise ValueError(f"Método de remuestreo desconocido: {metodo}. Opciones: {METODOS_REMUESTREO}")
+
+    X = np.ascontiguousarray(df_filled.to_numpy(dtype=float))
+    etiquetas_ref, _, _ = aplicar_clustering(df_filled, k)
+    etiquetas_ref = np.asarray(etiquetas_ref)
+    n = len(X)
+
+    # Acumuladores preasignados: memoria O(n²) sea cual sea el número de remuestreos
+    coasignaciones = np.zeros((n, n), dtype=np.int64)
+    comuestreos = np.zeros((n, n), dtype=np.int64)
+    suma_jaccard = np.zeros(k)
+    conteo_jaccard = np.zeros(k, dtype=np.int64)
+
+    acumuladores = (coasignaciones, comuestreos, suma_jaccard, conteo_jaccard)
+
+    def acumular(parcial):
+        # Suma en el sitio: los parciales se descartan en cuanto se acumulan
+        for total, valor in zip(acumuladores, parcial):
+            total += valor
+
+    semillas = np.random.SeedSequence(semilla).generate_state(n_remuestreos, dtype=np.uint64)
+    procesos = procesos or os.cpu_count() or 1
+
+    if procesos == 1:
+        _inicializar_proceso(X, etiquetas_ref, k)
+        acumular(_lote_remuestreos(semillas, fraccion, metodo))
+    else:
+        # Varios lotes por proceso para equilibrar la carga; cada lote devuelve solo sus acumuladores
+        lotes = np.array_split(semillas, min(n_remuestreos, procesos * 4))
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_inicializar_proceso, initargs=(X, etiquetas_ref, k)) as pool:
+            futuros = [pool.submit(_lote_remuestreos, lote, fraccion, metodo) for lote in lotes if len(lote)]
+            for futuro in as_completed(futuros):
+                acumular(futuro.result())
+
+    proporcion = np.divide(coasignaciones, comuestreos, out=np.full((n, n), np.nan), where=comuestreos > 0)
+    np.fill_diagonal(proporcion, 1.0)
+
+    paises = list(df_filled.index)
+    nombres = [COUNTRY_NAMES.get(p, p) for p in paises]
+    matriz = pd.DataFrame(proporcion, index=paises, columns=paises)
+
+    jaccard_medio = np.divide(suma_jaccard, conteo_jaccard, out=np.full(k, np.nan), where=conteo_jaccard > 0)
+    df_jaccard = pd.DataFrame({
+        'Cluster': np.arange(k),
+        'N_Paises': np.bincount(etiquetas_ref, minlength=k),
+        'Jaccard_Medio': jaccard_medio,
+        'Estabilidad': [clasificar_estabilidad(j) for j in jaccard_medio]
+    })
+
+    # Coasignación media de cada país con los demás miembros de su cluster de referencia
+    mismo_cluster = etiquetas_ref[:, None] == etiquetas_ref[None, :]
+    np.fill_diagonal(mismo_cluster, False)
+    suma = np.where(mismo_cluster, np.nan_to_num(proporcion), 0).sum(axis=1)
+    companeros = mismo_cluster.sum(axis=1)
+    df_paises = pd.DataFrame({
+        'Pais': nombres,
+        'Cluster': etiquetas_ref,
+        'Coasignacion_Media': np.divide(suma, companeros, out=np.ones(n), where=companeros > 0)
+    }, index=pd.Index(paises, name='COUNTRY_REGION')).sort_values('Coasignacion_Media')
+
+    return {
+        'matriz_coasignacion': matriz,
+        'jaccard': df_jaccard,
+        'estabilidad_paises': df_paises,
+        'etiquetas': etiquetas_ref,
+        'n_remuestreos': n_remuestreos,
+        'metodo': metodo
+    }
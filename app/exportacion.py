@@ -0,0 +1,148 @@
+"""
+Exportación de Datos para AIRA
+==============================
+Genera los archivos de los botones de descarga (CSV, Parquet, Excel y
+paquetes zip) solo cuando se piden y los guarda en caché.
+
+- Cada artefacto se identifica por (versión de los datos, clave del filtro,
+  formato). La versión es la firma del CSV de datos (fecha de modificación y
+  tamaño): si el archivo cambia, los artefactos antiguos dejan de usarse.
+- El DataFrame se pasa como una función sin argumentos que solo se llama si
+  el artefacto no está en caché, de modo que un rerun sin descarga no
+  serializa nada.
+- paquete_secciones() empaqueta las tablas resumen de las 5 secciones en un
+  único zip comprimido.
+
+Parquet requiere pyarrow y Excel requiere openpyxl (dependencias opcionales).
+
+Uso:
+    datos = generar_artefacto(version_datos(), ('seccion', 1), 'parquet', lambda: df_pivot)
+"""
+
+import io
+import os
+import zipfile
+from importlib.util import find_spec
+
+from config import DATA_PATH, SECCIONES
+from agregados import construir_agregados_secciones
+from instrumentacion import medir
+from entorno import cache_datos
+
+
+# Formato -> (extensión, tipo MIME, módulo opcional necesario)
+FORMATOS_EXPORTACION = {
+    'csv': ('csv', 'text/csv', None),
+    'parquet': ('parquet', 'application/vnd.apache.parquet', 'pyarrow'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'openpyxl')
+}
+
+
+# ==================== FORMATOS ====================
+
+def formatos_disponibles():
+    """
+    Formatos de exportación cuyas dependencias están instaladas.
+
+    Returns:
+        list: Claves de FORMATOS_EXPORTACION (siempre incluye 'csv')
+    """
+    return [
+        formato for formato, (_, _, modulo) in FORMATOS_EXPORTACION.items()
+        if modulo is None or find_spec(modulo) is not None
+    ]
+
+
+def version_datos(ruta=DATA_PATH):
+    """
+    Versión del dataset: firma del archivo (fecha de modificación y tamaño).
+
+    Args:
+        ruta (str): Ruta del CSV de datos
+
+    Returns:
+        tuple: (st_mtime_ns, st_size), o None si el archivo no existe
+    """
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return (estado.st_mtime_ns, estado.st_size)
+
+
+def serializar(df, formato='csv'):
+    """
+    Serializa un DataFrame en el formato indicado.
+
+    Args:
+        df (pd.DataFrame): Datos a exportar (sin el índice)
+        formato (str): 'csv', 'parquet' o 'xlsx'
+
+    Returns:
+        bytes: Contenido del archivo
+
+    Raises:
+        ValueError: Si el formato no existe
+        ImportError: Si falta la dependencia opcional del formato
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato de exportación desconocido: {formato}")
+
+    if formato == 'csv':
+        return df.to_csv(index=False).encode('utf-8')
+
+    buffer = io.BytesIO()
+    if formato == 'parquet':
+        # Un MultiIndex u otro índice no se exporta: mismas columnas que el CSV
+        df.reset_index(drop=True).to_parquet(buffer, index=False, compression='zstd')
+    else:
+        df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+# ==================== ARTEFACTOS EN CACHÉ ====================
+
+@medir
+@cache_datos
+def generar_artefacto(version, clave, formato, _obtener_df):
+    """
+    Devuelve el archivo de una descarga, generándolo solo si no está en caché.
+
+    Args:
+        version: Versión de los datos (ver version_datos())
+        clave (tuple): Identifica el filtro o la vista exportada (ej: ('seccion', 2))
+        formato (str): 'csv', 'parquet' o 'xlsx'
+        _obtener_df (callable): Función sin argumentos que devuelve el DataFrame;
+                                no forma parte de la clave de caché
+
+    Returns:
+        bytes: Contenido del archivo
+    """
+    return serializar(_obtener_df(), formato)
+
+
+@medir
+@cache_datos
+def paquete_secciones(version, formato, _df):
+    """
+    Zip comprimido con la tabla resumen (países x variables) de cada sección.
+
+    Args:
+        version: Versión de los datos (ver version_datos())
+        formato (str): Formato de cada tabla ('csv', 'parquet' o 'xlsx')
+        _df (pd.DataFrame): Datos originales en formato largo; no forma parte de la clave
+
+    Returns:
+        bytes: Contenido del zip
+    """
+    extension = FORMATOS_EXPORTACION[formato][0]
+    agregados = construir_agregados_secciones(_df)
+    buffer = io.BytesIO()
+
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as paquete:
+        for seccion_key in SECCIONES:
+            df_pivot = agregados[seccion_key]['pivot']
+            if not df_pivot.empty:
+                paquete.writestr(f"aira_{seccion_key}_resumen.{extension}", serializar(df_pivot, formato))
+
+    return buffer.getvalue()
@@ -0,0 +1,127 @@
+"""
+Filtros de Búsqueda para AIRA
+=============================
+Índice prearmado para filtrar el dataset en formato largo por país,
+variable y texto libre sin recorrer ni copiar el DataFrame completo.
+
+El índice se construye una sola vez y guarda:
+
+- El mapa inverso nombre de país -> código ISO, para resolver las
+  selecciones de la interfaz con un acceso a diccionario.
+- El DataFrame enriquecido ordenado por un MultiIndex (país, variable),
+  con las variables en orden numérico (AIRA_1, AIRA_2, ..., AIRA_10):
+  un filtro es una búsqueda en ese índice ordenado y, cuando las filas
+  seleccionadas son contiguas (un país, o un país y una variable), el
+  resultado es un corte del DataFrame y no una copia.
+- Un índice de búsqueda (busqueda.py) sobre los títulos de las variables,
+  para el texto libre (sin tildes, por prefijo y con tolerancia a erratas).
+
+Uso:
+    indice = construir_indice_filtros(enriquecer_dataframe(df))
+    filtrar(indice, paises=['ESP', 'PRT'], texto='regulacion')
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import COUNTRY_NAMES
+from busqueda import construir_indice_busqueda, documentos_aira, buscar
+from instrumentacion import medir
+from entorno import cache_recurso
+
+
+# ==================== CONSTRUCCIÓN DEL ÍNDICE ====================
+
+@medir
+@cache_recurso
+def construir_indice_filtros(df_enriquecido):
+    """
+    Construye el índice de filtros sobre el DataFrame enriquecido.
+
+    Args:
+        df_enriquecido (pd.DataFrame): Resultado de enriquecer_dataframe()
+
+    Returns:
+        dict: Índice con 'df' (ordenado por el MultiIndex (pais, variable)),
+              'codigo_por_nombre', 'paises', 'variables' y 'busqueda' (índice de
+              construir_indice_busqueda() sobre las variables).
+              Con Streamlit se comparte entre sesiones: no debe modificarse
+    """
+    # Nivel de variables categórico en orden numérico: sort_index() conserva el
+    # orden del cuestionario (AIRA_9 antes que AIRA_10) en lugar del lexicográfico
+    variables = sorted(df_enriquecido['Measure_code'].unique(), key=lambda v: (len(v), v))
+    df = df_enriquecido.set_index(pd.MultiIndex.from_arrays(
+        [df_enriquecido['COUNTRY_REGION'], pd.Categorical(df_enriquecido['Measure_code'], categories=variables)],
+        names=['pais', 'variable']
+    )).sort_index()
+
+    paises = list(df.index.levels[0])
+
+    return {
+        'df': df,
+        'codigo_por_nombre': {COUNTRY_NAMES.get(p, p): p for p in paises},
+        'paises': paises,
+        'variables': variables,
+        'busqueda': construir_indice_busqueda(documentos_aira(variables=variables, paises=[]))
+    }
+
+
+# ==================== CONSULTAS ====================
+
+def buscar_variables(indice, texto):
+    """
+    Variables cuyo código, título o área coincide con todas las palabras
+    del texto (sin distinguir mayúsculas ni tildes, por prefijo o con erratas).
+
+    Args:
+        indice (dict): Índice de construir_indice_filtros()
+        texto (str): Texto libre (ej: 'regulación datos')
+
+    Returns:
+        list: Códigos AIRA que coinciden, de más a menos relevante
+    """
+    return [r['codigo'] for r in buscar(indice['busqueda'], texto, tipos=['variable'], limite=None)]
+
+
+def filtrar(indice, paises=None, variables=None, texto=None):
+    """
+    Filtra el dataset por países, variables y texto libre sobre los títulos.
+
+    Los filtros se combinan con Y; una lista vacía o None no filtra. Si las
+    filas resultantes son contiguas en el índice ordenado se devuelve un
+    corte (iloc[a:b]) del DataFrame del índice en lugar de una copia.
+
+    Args:
+        indice (dict): Índice de construir_indice_filtros()
+        paises (list, optional): Códigos ISO de país
+        variables (list, optional): Códigos AIRA
+        texto (str, optional): Texto a buscar en los títulos de las variables
+
+    Returns:
+        pd.DataFrame: Filas seleccionadas (no deben modificarse en el sitio)
+    """
+    df = indice['df']
+
+    if texto and texto.strip():
+        encontradas = buscar_variables(indice, texto)
+        variables = [v for v in variables if v in encontradas] if variables else encontradas
+        if not variables:
+            return df.iloc[:0]
+
+    # Solo las claves presentes: get_locs falla con claves desconocidas
+    claves_paises = [p for p in paises if p in df.index.levels[0]] if paises else None
+    claves_variables = [v for v in variables if v in df.index.levels[1]] if variables else None
+    if claves_paises == [] or claves_variables == []:
+        return df.iloc[:0]
+
+    if claves_paises is None and claves_variables is None:
+        return df
+
+    posiciones = df.index.get_locs((
+        claves_paises if claves_paises is not None else slice(None),
+        claves_variables if claves_variables is not None else slice(None)
+    ))
+
+    if len(posiciones) and posiciones[-1] - posiciones[0] + 1 == len(posiciones):
+        return df.iloc[posiciones[0]:posiciones[-1] + 1]
+    return df.iloc[np.sort(posiciones)]
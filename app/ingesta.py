@@ -0,0 +1,274 @@
+"""
+Ingesta de la Exportación de la OMS para AIRA
+=============================================
+Punto de entrada repetible que sustituye a notebooks/preprocesamiento.ipynb:
+lee la exportación completa de la OMS (AIRAData.csv) por bloques, conserva
+solo las tres columnas que usa la aplicación, valida los códigos y escribe
+a la vez:
+
+- el CSV final en el formato de DATA_PATH ('Measure_code', 'AIRA_SIMPLE', 'COUNTRY_REGION');
+- la caché columnar del cubo de respuestas (cubo.py) en CACHE_DIR.
+
+Las columnas y sus tipos se declaran antes de leer (usecols + dtype), y cada
+bloque se valida, se vuelca al CSV y se escribe en el cubo antes de leer el
+siguiente, de modo que la memoria depende del tamaño de bloque y no del archivo.
+
+Uso:
+    python ingesta.py --origen ../Data/AIRAData.csv --tamano-bloque 200000
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Permitir ejecutar el script desde cualquier directorio
+sys.path.append(str(Path(__file__).parent))
+
+from config import RAW_DATA_PATH, DATA_PATH, CACHE_DIR, COUNTRY_NAMES, RESPONSE_LABELS, PATRON_VARIABLE
+from cubo import codificar_respuestas, crear_cubo, guardar_cubo, SIN_RESPUESTA
+from instrumentacion import medir
+
+
+# Columnas de la exportación de la OMS -> columnas del CSV final
+COLUMNAS_ORIGEN = {
+    'Measure code': 'Measure_code',
+    'AIRA_SIMPLE': 'AIRA_SIMPLE',
+    'COUNTRY_REGION': 'COUNTRY_REGION'
+}
+
+# Tipos declarados de antemano (los valores vacíos y 'N/A' se leen como NaN, igual que cargar_datos())
+TIPOS_ORIGEN = {columna: 'string' for columna in COLUMNAS_ORIGEN}
+
+TAMANO_BLOQUE = 100_000
+
+# Número máximo de ejemplos de valores inválidos que se guardan en el informe
+MAX_EJEMPLOS = 20
+
+
+# ==================== VALIDACIÓN ====================
+
+def _acumular(contador, valores):
+    """
+    Suma los conteos de una serie de valores inválidos a un Counter.
+    """
+    for valor, cantidad in valores.value_counts().items():
+        if valor in contador or len(contador) < MAX_EJEMPLOS:
+            contador[valor] += int(cantidad)
+
+
+def validar_bloque(bloque, informe):
+    """
+    Valida un bloque de la exportación y devuelve la máscara de filas válidas.
+
+    Una fila es válida si su país está en COUNTRY_NAMES, su variable tiene la forma
+    AIRA_<n> y su respuesta está en RESPONSE_LABELS o está vacía.
+
+    Args:
+        bloque (pd.DataFrame): Bloque con las columnas ya renombradas
+        informe (dict): Informe de ingesta que se actualiza en el sitio
+
+    Returns:
+        np.ndarray: Máscara booleana de filas válidas
+    """
+    pais_valido = bloque['COUNTRY_REGION'].isin(list(COUNTRY_NAMES)).to_numpy()
+    variable_valida = bloque['Measure_code'].str.fullmatch(PATRON_VARIABLE).fillna(False).to_numpy(dtype=bool)
+    respuesta = bloque['AIRA_SIMPLE']
+    respuesta_valida = (respuesta.isna() | respuesta.isin(list(RESPONSE_LABELS))).to_numpy()
+
+    _acumular(informe['paises_desconocidos'], bloque['COUNTRY_REGION'][~pais_valido].fillna('<vacío>'))
+    _acumular(informe['variables_invalidas'], bloque['Measure_code'][~variable_valida].fillna('<vacío>'))
+    _acumular(informe['respuestas_invalidas'], respuesta[~respuesta_valida])
+
+    return pais_valido & variable_valida & respuesta_valida
+
+
+# ==================== CUBO INCREMENTAL ====================
+
+def _ampliar_variables(estado, variables):
+    """
+    Añade columnas al cubo en construcción para las variables nuevas del bloque.
+    """
+    nuevas = [v for v in pd.unique(variables) if v not in estado['indice_variables']]
+    if not nuevas:
+        return
+    for v in nuevas:
+        estado['indice_variables'][v] = len(estado['indice_variables'])
+    n_paises = estado['codigos'].shape[0]
+    estado['codigos'] = np.hstack([estado['codigos'], np.full((n_paises, len(nuevas)), SIN_RESPUESTA, dtype=np.int8)])
+    estado['vistos'] = np.hstack([estado['vistos'], np.zeros((n_paises, len(nuevas)), dtype=bool)])
+
+
+def _escribir_en_cubo(estado, bloque, informe):
+    """
+    Escribe un bloque validado en el cubo y devuelve la máscara de filas no duplicadas.
+    Si un par (país, variable) aparece varias veces se conserva la primera aparición.
+    """
+    _ampliar_variables(estado, bloque['Measure_code'])
+
+    filas = bloque['COUNTRY_REGION'].map(estado['indice_paises']).to_numpy(dtype=np.int64)
+    columnas = bloque['Measure_code'].map(estado['indice_variables']).to_numpy(dtype=np.int64)
+
+    plano = filas * estado['codigos'].shape[1] + columnas
+    nuevas = ~estado['vistos'][filas, columnas] & ~pd.Series(plano).duplicated().to_numpy()
+    informe['duplicados'] += int((~nuevas).sum())
+
+    filas, columnas = filas[nuevas], columnas[nuevas]
+    estado['codigos'][filas, columnas] = codificar_respuestas(bloque['AIRA_SIMPLE'].to_numpy()[nuevas])
+    estado['vistos'][filas, columnas] = True
+    return nuevas
+
+
+def _finalizar_cubo(estado):
+    """
+    Recorta el cubo a los países con datos y ordena las variables como el pivot.
+    """
+    paises = sorted(estado['indice_paises'])
+    variables = sorted(estado['indice_variables'])
+    orden_filas = np.array([estado['indice_paises'][p] for p in paises], dtype=np.int64)
+    orden_columnas = np.array([estado['indice_variables'][v] for v in variables], dtype=np.int64)
+
+    vistos = estado['vistos'][np.ix_(orden_filas, orden_columnas)]
+    con_datos = vistos.any(axis=1)
+    codigos = estado['codigos'][np.ix_(orden_filas[con_datos], orden_columnas)]
+    return crear_cubo([p for p, c in zip(paises, con_datos) if c], variables, codigos)
+
+
+# ==================== INGESTA ====================
+
+@medir
+def ingerir(origen=RAW_DATA_PATH, salida=DATA_PATH, directorio_cache=CACHE_DIR,
+            tamano_bloque=TAMANO_BLOQUE, estricto=False):
+    """
+    Ingiere la exportación de la OMS por bloques y escribe el CSV final y la caché del cubo.
+
+    Args:
+        origen (str): Ruta de la exportación completa (AIRAData.csv)
+        salida (str): Ruta del CSV final (por defecto DATA_PATH)
+        directorio_cache (str): Directorio de la caché columnar del cubo
+        tamano_bloque (int): Filas por bloque de lectura
+        estricto (bool): Si es True, cualquier fila inválida detiene la ingesta
+
+    Returns:
+        dict: Informe con filas leídas y escritas, duplicados y ejemplos de
+              países, variables y respuestas inválidos
+
+    Raises:
+        ValueError: Si faltan columnas, si no hay filas válidas o si estricto=True
+                    y se encuentra una fila inválida
+    """
+    informe = {
+        'filas_leidas': 0,
+        'filas_escritas': 0,
+        'duplicados': 0,
+        'paises_desconocidos': Counter(),
+        'variables_invalidas': Counter(),
+        'respuestas_invalidas': Counter()
+    }
+
+    # Los países son conocidos de antemano; las variables se descubren al leer
+    paises = sorted(COUNTRY_NAMES)
+    estado = {
+        'indice_paises': {p: i for i, p in enumerate(paises)},
+        'indice_variables': {},
+        'codigos': np.full((len(paises), 0), SIN_RESPUESTA, dtype=np.int8),
+        'vistos': np.zeros((len(paises), 0), dtype=bool)
+    }
+
+    # Se escribe en un archivo temporal y se reemplaza al final para no dejar un CSV a medias
+    temporal = f"{salida}.tmp"
+    try:
+        lector = pd.read_csv(origen, usecols=list(COLUMNAS_ORIGEN), dtype=TIPOS_ORIGEN,
+                             chunksize=tamano_bloque)
+        with lector, open(temporal, 'w', encoding='utf-8', newline='') as archivo:
+            pd.DataFrame(columns=list(COLUMNAS_ORIGEN.values())).to_csv(archivo, index=False)
+
+            for bloque in lector:
+                bloque = bloque.rename(columns=COLUMNAS_ORIGEN)[list(COLUMNAS_ORIGEN.values())]
+                informe['filas_leidas'] += len(bloque)
+
+                validas = validar_bloque(bloque, informe)
+                if estricto and not validas.all():
+                    raise ValueError(
+                        f"Filas inválidas en el bloque que termina en la fila {informe['filas_leidas']}: "
+                        f"{_resumen_invalidos(informe)}"
+                    )
+                bloque = bloque[validas]
+
+                bloque = bloque[_escribir_en_cubo(estado, bloque, informe)]
+                bloque.to_csv(archivo, index=False, header=False)
+                informe['filas_escritas'] += len(bloque)
+
+        if informe['filas_escritas'] == 0:
+            raise ValueError(f"No hay filas válidas en '{origen}'")
+
+        os.replace(temporal, salida)
+    except ValueError as e:
+        if 'Usecols' in str(e):
+            raise ValueError(f"Faltan columnas en '{origen}'; se esperan {list(COLUMNAS_ORIGEN)}") from e
+        raise
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    cubo = _finalizar_cubo(estado)
+    guardar_cubo(cubo, directorio_cache)
+    informe['paises'] = len(cubo['paises'])
+    informe['variables'] = len(cubo['variables'])
+    return informe
+
+
+def _resumen_invalidos(informe):
+    """
+    Texto breve con los valores inválidos encontrados.
+    """
+    partes = []
+    for clave, nombre in [('paises_desconocidos', 'países'),
+                          ('variables_invalidas', 'variables'),
+                          ('respuestas_invalidas', 'respuestas')]:
+        if informe[clave]:
+            ejemplos = ', '.join(f"{valor} ({cantidad})" for valor, cantidad in informe[clave].most_common(5))
+            partes.append(f"{nombre}: {ejemplos}")
+    return '; '.join(partes) or 'ninguno'
+
+
+# ==================== LÍNEA DE COMANDOS ====================
+
+def main(argv=None):
+    """
+    Punto de entrada de la línea de comandos.
+    """
+    parser = argparse.ArgumentParser(
+        description="Ingiere la exportación AIRA de la OMS por bloques y genera el CSV final y la caché del cubo."
+    )
+    parser.add_argument('--origen', default=RAW_DATA_PATH,
+                        help="Exportación completa de la OMS (por defecto: Data/AIRAData.csv)")
+    parser.add_argument('--salida', default=DATA_PATH,
+                        help="CSV final (por defecto: Data/AIRAData_final.csv)")
+    parser.add_argument('--cache', default=CACHE_DIR,
+                        help="Directorio de la caché del cubo (por defecto: Data/cache)")
+    parser.add_argument('--tamano-bloque', type=int, default=TAMANO_BLOQUE,
+                        help=f"Filas por bloque de lectura (por defecto: {TAMANO_BLOQUE})")
+    parser.add_argument('--estricto', action='store_true',
+                        help="Detener la ingesta ante cualquier fila inválida")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    informe = ingerir(args.origen, args.salida, args.cache, args.tamano_bloque, args.estricto)
+    duracion = time.perf_counter() - inicio
+
+    print(f"✅ Ingesta completada en {duracion:.1f} s: {informe['filas_escritas']} de "
+          f"{informe['filas_leidas']} filas ({informe['paises']} países, {informe['variables']} variables)")
+    if informe['duplicados']:
+        print(f"⚠️ {informe['duplicados']} filas duplicadas descartadas (se conserva la primera)")
+    if informe['filas_leidas'] - informe['filas_escritas'] - informe['duplicados']:
+        print(f"⚠️ Filas inválidas descartadas: {_resumen_invalidos(informe)}")
+
+
+if __name__ == "__main__":
+    main()
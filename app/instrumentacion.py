@@ -0,0 +1,293 @@
+"""
+Instrumentación de rendimiento para AIRA
+========================================
+Este módulo contiene un decorador y un gestor de contexto para medir
+el tiempo de reloj, el tiempo de CPU y la memoria pico de las funciones
+más costosas de la aplicación, tanto por llamada como por rerun.
+
+La instrumentación es opcional: solo se activa con la variable de entorno
+AIRA_PERFILADO=1. Cuando está desactivada, el decorador devuelve la función
+original y el gestor de contexto no hace nada, por lo que no añade coste.
+
+Los tiempos son por hilo, pero el pico de memoria de tracemalloc es global
+al proceso: solo es exacto si ninguna otra sesión mide a la vez. Cada
+registro lleva 'memoria_fiable', que es False si otro hilo midió durante
+la medición (su pico puede incluir memoria ajena o haberse reiniciado).
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+from config import PERFILADO_ACTIVO, PERFILADO_LOG_PATH
+
+
+# Estado por hilo (Streamlit ejecuta cada sesión en su propio hilo)
+_estado = threading.local()
+
+# Bloqueo para escrituras concurrentes en el archivo de log
+_lock_log = threading.Lock()
+
+# Hilos con mediciones abiertas y generación (aumenta cada vez que un hilo
+# empieza a medir), para detectar mediciones solapadas entre sesiones
+_concurrencia = {'hilos': 0, 'generacion': 0}
+_lock_concurrencia = threading.Lock()
+
+
+# ==================== ESTADO INTERNO ====================
+
+def esta_activo():
+    """
+    Indica si la instrumentación está activada.
+
+    Returns:
+        bool: True si AIRA_PERFILADO=1
+    """
+    return PERFILADO_ACTIVO
+
+
+def _pila():
+    """
+    Devuelve la pila de mediciones abiertas del hilo actual.
+    """
+    if not hasattr(_estado, 'pila'):
+        _estado.pila = []
+    return _estado.pila
+
+
+def _abrir_marco(nombre):
+    """
+    Abre un marco de medición y reinicia el pico de memoria.
+
+    El pico de tracemalloc es global, así que antes de reiniciarlo se
+    traslada el pico observado hasta ahora al marco padre.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    pila = _pila()
+    with _lock_concurrencia:
+        if not pila:
+            _concurrencia['hilos'] += 1
+            _concurrencia['generacion'] += 1
+        generacion = _concurrencia['generacion']
+        solapado = _concurrencia['hilos'] > 1
+
+    actual, pico = tracemalloc.get_traced_memory()
+    if pila:
+        pila[-1]['pico_max'] = max(pila[-1]['pico_max'], pico)
+    tracemalloc.reset_peak()
+
+    marco = {
+        'nombre': nombre,
+        'base': actual,
+        'pico_max': actual,
+        'generacion': generacion,
+        'solapado': solapado,
+        'inicio_reloj': time.perf_counter(),
+        'inicio_cpu': time.thread_time()
+    }
+    pila.append(marco)
+    return marco
+
+
+def _cerrar_marco(marco):
+    """
+    Cierra un marco de medición y devuelve su registro.
+    """
+    tiempo_reloj = time.perf_counter() - marco['inicio_reloj']
+    tiempo_cpu = time.thread_time() - marco['inicio_cpu']
+
+    _, pico = tracemalloc.get_traced_memory()
+    marco['pico_max'] = max(marco['pico_max'], pico)
+
+    pila = _pila()
+    with _lock_concurrencia:
+        # Otro hilo empezó a medir o sigue midiendo: el pico no es solo de este marco
+        solapado = (marco['solapado'] or _concurrencia['hilos'] > 1
+                    or _concurrencia['generacion'] != marco['generacion'])
+
+    if pila and pila[-1] is marco:
+        pila.pop()
+        if not pila:
+            _liberar_hilo()
+    if pila:
+        # El pico del hijo también cuenta para el padre
+        pila[-1]['pico_max'] = max(pila[-1]['pico_max'], marco['pico_max'])
+
+    return {
+        'nombre': marco['nombre'],
+        'tiempo_reloj_ms': tiempo_reloj * 1000,
+        'tiempo_cpu_ms': tiempo_cpu * 1000,
+        'memoria_pico_kb': (marco['pico_max'] - marco['base']) / 1024,
+        'memoria_fiable': not solapado,
+        'profundidad': len(pila),
+        'timestamp': time.time()
+    }
+
+
+def _liberar_hilo():
+    """
+    Indica que el hilo actual ya no tiene mediciones abiertas.
+    """
+    with _lock_concurrencia:
+        _concurrencia['hilos'] = max(_concurrencia['hilos'] - 1, 0)
+
+
+def _registrar(registro):
+    """
+    Guarda un registro en el rerun actual o, si no hay rerun abierto
+    (por ejemplo en scripts), lo escribe directamente en el log.
+    """
+    rerun = getattr(_estado, 'rerun', None)
+
+    if rerun is not None:
+        registro['rerun_id'] = rerun['rerun_id']
+        rerun['registros'].append(registro)
+    else:
+        registro['rerun_id'] = None
+        _escribir_log([dict(registro, tipo='llamada')])
+
+
+def _escribir_log(lineas):
+    """
+    Añade líneas JSON al archivo de log de perfilado.
+    """
+    try:
+        os.makedirs(os.path.dirname(PERFILADO_LOG_PATH), exist_ok=True)
+        with _lock_log:
+            with open(PERFILADO_LOG_PATH, 'a', encoding='utf-8') as f:
+                for linea in lineas:
+                    f.write(json.dumps(linea, ensure_ascii=False) + '\n')
+    except OSError:
+        # El perfilado nunca debe romper la aplicación
+        pass
+
+
+# ==================== API PÚBLICA ====================
+
+def medir(func=None, *, nombre=None):
+    """
+    Decorador que mide tiempo de reloj, tiempo de CPU y memoria pico
+    de cada llamada a la función decorada.
+
+    Se puede usar como @medir o como @medir(nombre='...').
+
+    Args:
+        func (callable): Función a decorar
+        nombre (str, optional): Nombre con el que se registra la función
+
+    Returns:
+        callable: Función instrumentada (o la original si está desactivado)
+    """
+    def decorador(f):
+        if not PERFILADO_ACTIVO:
+            return f
+
+        etiqueta = nombre or getattr(f, '__name__', repr(f))
+
+        @functools.wraps(f)
+        def envoltura(*args, **kwargs):
+            marco = _abrir_marco(etiqueta)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                _registrar(_cerrar_marco(marco))
+
+        return envoltura
+
+    if func is not None:
+        return decorador(func)
+    return decorador
+
+
+@contextmanager
+def medir_bloque(nombre):
+    """
+    Gestor de contexto para medir un bloque de código arbitrario
+    (por ejemplo el barrido de K o el cálculo de PCA).
+
+    Args:
+        nombre (str): Nombre con el que se registra el bloque
+    """
+    if not PERFILADO_ACTIVO:
+        yield
+        return
+
+    marco = _abrir_marco(nombre)
+    try:
+        yield
+    finally:
+        _registrar(_cerrar_marco(marco))
+
+
+def iniciar_rerun():
+    """
+    Marca el inicio de un rerun de la aplicación.
+    """
+    if not PERFILADO_ACTIVO:
+        return
+
+    # Descartar cualquier medición que quedara abierta (p. ej. tras st.stop)
+    if _pila():
+        _liberar_hilo()
+    _estado.pila = []
+
+    _estado.rerun = {
+        'rerun_id': uuid.uuid4().hex[:12],
+        'registros': [],
+        'marco': _abrir_marco('rerun')
+    }
+
+
+def finalizar_rerun(etiqueta=''):
+    """
+    Cierra el rerun actual, escribe sus registros en el log JSON-lines
+    y devuelve el resumen.
+
+    Args:
+        etiqueta (str): Etiqueta descriptiva (por ejemplo la página actual)
+
+    Returns:
+        dict: Resumen del rerun con sus registros, o None si no hay rerun
+    """
+    rerun = getattr(_estado, 'rerun', None)
+    if not PERFILADO_ACTIVO or rerun is None:
+        return None
+
+    total = _cerrar_marco(rerun['marco'])
+    _estado.rerun = None
+
+    resumen = {
+        'tipo': 'rerun',
+        'rerun_id': rerun['rerun_id'],
+        'etiqueta': etiqueta,
+        'n_llamadas': len(rerun['registros']),
+        'tiempo_reloj_ms': total['tiempo_reloj_ms'],
+        'tiempo_cpu_ms': total['tiempo_cpu_ms'],
+        'memoria_pico_kb': total['memoria_pico_kb'],
+        'memoria_fiable': total['memoria_fiable'],
+        'timestamp': total['timestamp']
+    }
+
+    _escribir_log(
+        [dict(r, tipo='llamada') for r in rerun['registros']] + [resumen]
+    )
+
+    _estado.ultimo_rerun = dict(resumen, registros=rerun['registros'])
+    return _estado.ultimo_rerun
+
+
+def obtener_ultimo_rerun():
+    """
+    Devuelve el resumen del último rerun finalizado en este hilo.
+
+    Returns:
+        dict: Resumen del rerun, o None
+    """
+    return getattr(_estado, 'ultimo_rerun', None)
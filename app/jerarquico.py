@@ -0,0 +1,264 @@
+"""
+Clustering Jerárquico para AIRA
+===============================
+Clustering aglomerativo que construye el árbol de fusiones (linkage) una
+sola vez y lo cachea. Las etiquetas para cualquier K se obtienen cortando
+ese árbol en O(n), sin volver a ajustar nada, de modo que mover el selector
+de K en la página de clustering es inmediato.
+
+Métricas admitidas:
+- 'euclidea': sobre la codificación ordinal de preparar_datos_ml(), con
+  enlace de Ward por defecto.
+- 'gower' / 'hamming': sobre los códigos del cubo, con la matriz de
+  distancias de distancias.py y enlace medio por defecto (Ward solo es
+  válido con distancia euclídea).
+
+La curva de silueta de todos los K se calcula sobre la misma matriz de
+distancias que usa el árbol.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import AgglomerativeClustering
+from sklearn.metrics import pairwise_distances, silhouette_score
+
+from clustering import K_RANGE
+from distancias import calcular_distancias, METRICAS
+from instrumentacion import medir
+from entorno import cache_datos, cache_recurso
+
+
+METRICAS_JERARQUICO = ['euclidea'] + METRICAS
+ENLACES = ['ward', 'average', 'complete', 'single']
+
+# Enlace por defecto de cada métrica
+ENLACE_POR_METRICA = {'euclidea': 'ward', 'gower': 'average', 'hamming': 'average'}
+
+
+# ==================== ÁRBOL DE FUSIONES ====================
+
+@cache_recurso
+def calcular_matriz_distancias(datos, metrica='euclidea'):
+    """
+    Matriz de distancias compartida por el árbol y la curva de silueta.
+
+    Args:
+        datos (pd.DataFrame | np.ndarray): Datos codificados ('euclidea') o
+                                           códigos int8 del cubo ('gower', 'hamming')
+        metrica (str): Una de METRICAS_JERARQUICO
+
+    Returns:
+        np.ndarray: Matriz n x n de distancias, de solo lectura.
+                    Con Streamlit se comparte entre sesiones sin copiarse
+    """
+    if metrica not in METRICAS_JERARQUICO:
+        raise ValueError(f"Métrica desconocida: {metrica}. Opciones: {METRICAS_JERARQUICO}")
+
+    if metrica == 'euclidea':
+        distancias = pairwise_distances(np.asarray(datos, dtype=float))
+        distancias.setflags(write=False)
+        return distancias
+    return calcular_distancias(np.asarray(datos), metrica)
+
+
+def _orden_hojas(hijos, n):
+    """
+    Orden de las hojas de izquierda a derecha en el dendrograma (recorrido en profundidad).
+    """
+    orden = []
+    pila = [2 * n - 2]
+    while pila:
+        nodo = pila.pop()
+        if nodo < n:
+            orden.append(nodo)
+        else:
+            izquierdo, derecho = hijos[nodo - n]
+            pila.extend([derecho, izquierdo])
+    return np.array(orden, dtype=np.int64)
+
+
+@medir
+@cache_datos
+def construir_arbol(datos, metrica='euclidea', enlace=None):
+    """
+    Ajusta el clustering aglomerativo completo (hasta un único cluster) y
+    devuelve el árbol de fusiones.
+
+    Args:
+        datos (pd.DataFrame | np.ndarray): Datos codificados ('euclidea') o
+                                           códigos int8 del cubo ('gower', 'hamming')
+        metrica (str): Una de METRICAS_JERARQUICO
+        enlace (str, optional): Uno de ENLACES (por defecto, ENLACE_POR_METRICA)
+
+    Returns:
+        dict: Diccionario con:
+            - 'hijos': array (n-1, 2); la fusión i crea el nodo n + i (las hojas son 0..n-1)
+            - 'alturas': distancia de cada fusión (creciente)
+            - 'tamanos': número de hojas del nodo creado en cada fusión
+            - 'orden_hojas': orden de las hojas en el dendrograma
+            - 'n', 'metrica', 'enlace'
+
+    Raises:
+        ValueError: Si la métrica o el enlace no son válidos, o si se pide Ward sin distancia euclídea
+    """
+    enlace = enlace or ENLACE_POR_METRICA.get(metrica)
+    if metrica not in METRICAS_JERARQUICO:
+        raise ValueError(f"Métrica desconocida: {metrica}. Opciones: {METRICAS_JERARQUICO}")
+    if enlace not in ENLACES:
+        raise ValueError(f"Enlace desconocido: {enlace}. Opciones: {ENLACES}")
+    if enlace == 'ward' and metrica != 'euclidea':
+        raise ValueError("El enlace de Ward solo admite la métrica 'euclidea'")
+
+    parametros = dict(n_clusters=None, distance_threshold=0, linkage=enlace, compute_distances=True)
+    if enlace == 'ward':
+        modelo = AgglomerativeClustering(**parametros).fit(np.asarray(datos, dtype=float))
+    else:
+        distancias = calcular_matriz_distancias(datos, metrica)
+        modelo = AgglomerativeClustering(metric='precomputed', **parametros).fit(distancias)
+
+    hijos = modelo.children_.astype(np.int64)
+    n = len(hijos) + 1
+
+    tamanos = np.ones(2 * n - 1, dtype=np.int64)
+    for i, (izquierdo, derecho) in enumerate(hijos):
+        tamanos[n + i] = tamanos[izquierdo] + tamanos[derecho]
+
+    return {
+        'hijos': hijos,
+        'alturas': modelo.distances_.astype(float),
+        'tamanos': tamanos[n:],
+        'orden_hojas': _orden_hojas(hijos, n),
+        'n': n,
+        'metrica': metrica,
+        'enlace': enlace
+    }
+
+
+def cortar_arbol(arbol, k):
+    """
+    Etiquetas de K clusters cortando el árbol: se aplican las primeras n - k
+    fusiones. Coste O(n), sin reajustar el modelo.
+
+    Los clusters se numeran de izquierda a derecha según el dendrograma.
+
+    Args:
+        arbol (dict): Árbol de construir_arbol()
+        k (int): Número de clusters (entre 1 y n)
+
+    Returns:
+        np.ndarray: Asignación de cluster de cada hoja
+    """
+    n = arbol['n']
+    if not 1 <= k <= n:
+        raise ValueError(f"K debe estar entre 1 y {n}")
+
+    hijos = arbol['hijos']
+    etiquetas = np.full(2 * n - 1, -1, dtype=np.int64)
+    siguiente = 0
+
+    # De arriba abajo: las últimas k - 1 fusiones quedan cortadas y cada
+    # nodo sin etiqueta que no esté cortado es la raíz de un cluster
+    for nodo in range(2 * n - 2, -1, -1):
+        if nodo - n >= n - k:
+            continue
+        if etiquetas[nodo] < 0:
+            etiquetas[nodo] = siguiente
+            siguiente += 1
+        if nodo >= n:
+            etiquetas[hijos[nodo - n]] = etiquetas[nodo]
+
+    # Renumerar por orden de aparición en el dendrograma
+    hojas = etiquetas[:n]
+    _, primeras = np.unique(hojas[arbol['orden_hojas']], return_index=True)
+    renumeracion = np.empty(k, dtype=np.int64)
+    renumeracion[hojas[arbol['orden_hojas']][np.sort(primeras)]] = np.arange(k)
+    return renumeracion[hojas]
+
+
+def altura_corte(arbol, k):
+    """
+    Altura a la que una línea horizontal corta el dendrograma en K clusters.
+
+    Args:
+        arbol (dict): Árbol de construir_arbol()
+        k (int): Número de clusters
+
+    Returns:
+        float: Punto medio entre la última fusión aplicada y la primera cortada
+    """
+    alturas = arbol['alturas']
+    n = arbol['n']
+    inferior = alturas[n - k - 1] if k < n else 0.0
+    superior = alturas[n - k] if k > 1 else alturas[-1]
+    return (inferior + superior) / 2
+
+
+# ==================== CLUSTERING DE PAÍSES ====================
+
+@medir(nombre='barrido_k_jerarquico')
+@cache_datos
+def calcular_barrido_k_jerarquico(datos, metrica='euclidea', enlace=None, k_range=K_RANGE):
+    """
+    Evalúa cada K del rango cortando el mismo árbol.
+
+    Args:
+        datos (pd.DataFrame | np.ndarray): Datos codificados ('euclidea') o
+                                           códigos int8 del cubo ('gower', 'hamming')
+        metrica (str): Una de METRICAS_JERARQUICO
+        enlace (str, optional): Uno de ENLACES
+        k_range (range): Rango de valores K a evaluar
+
+    Returns:
+        dict: Mismas claves que calcular_barrido_k(); 'inertias' contiene la altura
+              de la fusión que reduciría K clusters a K - 1
+    """
+    arbol = construir_arbol(datos, metrica, enlace)
+    distancias = calcular_matriz_distancias(datos, metrica)
+
+    alturas = []
+    silhouette_scores = []
+    etiquetas = {}
+    for k in k_range:
+        etiquetas[k] = cortar_arbol(arbol, k)
+        alturas.append(float(arbol['alturas'][arbol['n'] - k]))
+        silhouette_scores.append(silhouette_score(distancias, etiquetas[k], metric='precomputed'))
+
+    k_optimo = list(k_range)[silhouette_scores.index(max(silhouette_scores))]
+
+    return {
+        'k_range': k_range,
+        'inertias': alturas,
+        'silhouette_scores': silhouette_scores,
+        'k_optimo': k_optimo,
+        'etiquetas': etiquetas
+    }
+
+
+@medir
+def aplicar_jerarquico(datos, paises, k, metrica='euclidea', enlace=None):
+    """
+    Clustering jerárquico final con K clusters (equivalente a aplicar_clustering()).
+
+    Args:
+        datos (pd.DataFrame | np.ndarray): Datos codificados ('euclidea') o
+                                           códigos int8 del cubo ('gower', 'hamming')
+        paises (list): Códigos ISO de las filas de los datos
+        k (int): Número de clusters
+        metrica (str): Una de METRICAS_JERARQUICO
+        enlace (str, optional): Uno de ENLACES
+
+    Returns:
+        tuple: (clusters, df_clusters, arbol)
+            - clusters: np.ndarray con la asignación de cada país
+            - df_clusters: DataFrame con columnas 'COUNTRY_REGION' y 'Cluster'
+            - arbol: árbol de construir_arbol() (cacheado)
+    """
+    arbol = construir_arbol(datos, metrica, enlace)
+    clusters = cortar_arbol(arbol, k)
+
+    df_clusters = pd.DataFrame({
+        'COUNTRY_REGION': list(paises),
+        'Cluster': clusters
+    })
+
+    return clusters, df_clusters, arbol
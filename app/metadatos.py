@@ -0,0 +1,278 @@
+"""
+Metadatos de las Variables AIRA
+===============================
+Convierte el libro de metadatos de la OMS ('AIRA Metadata.xlsx') en una
+tabla de búsqueda compacta código -> {titulo, seccion, peso} y la aplica
+sobre los diccionarios estáticos de config.py en tiempo de ejecución:
+
+- Los títulos sustituyen a los de AIRA_TITULOS.
+- La sección de cada variable (por número, "Section 2", o por nombre,
+  "Contexto Normativo") la coloca en la lista de variables de SECCIONES.
+- Los pesos van a AIRA_PESOS, que calcular_scores_por_area() y
+  calcular_scores_olas() usan para la media ponderada de cada área.
+
+El libro solo se analiza cuando cambia (fecha de modificación o tamaño);
+el resultado se guarda como JSON en CACHE_DIR y las cargas siguientes leen
+solo ese JSON, sin importar openpyxl. Si el libro no existe, se mantienen
+los títulos estáticos de config.AIRA_TITULOS.
+
+Uso:
+    python metadatos.py --forzar
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+# Permitir ejecutar el script desde cualquier directorio
+sys.path.append(str(Path(__file__).parent))
+
+from config import METADATA_PATH, CACHE_DIR, AIRA_TITULOS, AIRA_PESOS, SECCIONES, PATRON_VARIABLE
+from busqueda import normalizar_texto
+from instrumentacion import medir
+
+
+ARCHIVO_CACHE = 'metadatos.json'
+
+# Nombres de columna aceptados en el libro (comparados sin mayúsculas ni espacios extremos)
+ALIAS_COLUMNAS = {
+    'codigo': ['measure code', 'measure_code', 'code', 'código', 'codigo', 'variable'],
+    'titulo': ['measure', 'measure name', 'title', 'label', 'título', 'titulo', 'description'],
+    'seccion': ['section', 'sección', 'seccion', 'domain', 'area'],
+    'peso': ['weight', 'peso']
+}
+
+# Filas iniciales en las que se busca la cabecera
+MAX_FILAS_CABECERA = 20
+
+_metadatos_aplicados = None
+
+
+# ==================== ANÁLISIS DEL LIBRO ====================
+
+def _firma_archivo(ruta):
+    """
+    Firma del archivo (fecha de modificación y tamaño) para invalidar la caché.
+    """
+    estado = os.stat(ruta)
+    return [estado.st_mtime_ns, estado.st_size]
+
+
+def _localizar_columnas(fila):
+    """
+    Devuelve la posición de cada columna conocida en una fila de cabecera,
+    o None si la fila no contiene la columna de código.
+    """
+    nombres = [str(valor).strip().lower() if valor is not None else '' for valor in fila]
+    posiciones = {}
+    for campo, alias in ALIAS_COLUMNAS.items():
+        for i, nombre in enumerate(nombres):
+            if nombre in alias:
+                posiciones[campo] = i
+                break
+    return posiciones if 'codigo' in posiciones else None
+
+
+def _convertir_peso(valor):
+    """
+    Convierte el peso a float (1.0 si falta o no es numérico).
+    """
+    try:
+        return float(valor) if valor not in (None, '') else 1.0
+    except (TypeError, ValueError):
+        return 1.0
+
+
+@medir
+def analizar_libro(ruta=METADATA_PATH):
+    """
+    Lee el libro de metadatos con openpyxl en modo de solo lectura.
+
+    Args:
+        ruta (str): Ruta del libro .xlsx
+
+    Returns:
+        dict: Código AIRA -> {'titulo': str, 'seccion': str | None, 'peso': float}
+
+    Raises:
+        ValueError: Si ninguna hoja tiene una columna de código reconocible
+    """
+    # openpyxl solo se importa cuando hay que volver a analizar el libro
+    import openpyxl
+
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        for hoja in libro.worksheets:
+            filas = hoja.iter_rows(values_only=True)
+            posiciones = None
+            for _, fila in zip(range(MAX_FILAS_CABECERA), filas):
+                posiciones = _localizar_columnas(fila)
+                if posiciones:
+                    break
+            if not posiciones:
+                continue
+
+            metadatos = {}
+            for fila in filas:
+                valores = {campo: fila[i] if i < len(fila) else None for campo, i in posiciones.items()}
+                codigo = str(valores['codigo'] or '').strip()
+                if not re.match(PATRON_VARIABLE, codigo) or codigo in metadatos:
+                    continue
+                titulo = valores.get('titulo')
+                seccion = valores.get('seccion')
+                metadatos[codigo] = {
+                    'titulo': str(titulo).strip() if titulo else None,
+                    'seccion': str(seccion).strip() if seccion else None,
+                    'peso': _convertir_peso(valores.get('peso'))
+                }
+            return metadatos
+    finally:
+        libro.close()
+
+    raise ValueError(f"No se encontró una columna de código en '{ruta}'")
+
+
+# ==================== CACHÉ ====================
+
+def cargar_metadatos(ruta=METADATA_PATH, directorio_cache=CACHE_DIR, forzar=False):
+    """
+    Devuelve la tabla de metadatos, analizando el libro solo si cambió desde la última vez.
+
+    Args:
+        ruta (str): Ruta del libro .xlsx
+        directorio_cache (str): Directorio de la caché JSON
+        forzar (bool): Si es True, se vuelve a analizar el libro aunque no haya cambiado
+
+    Returns:
+        dict | None: Código AIRA -> {'titulo', 'seccion', 'peso'}, o None si no hay libro
+    """
+    if not os.path.exists(ruta):
+        return None
+
+    firma = _firma_archivo(ruta)
+    ruta_cache = os.path.join(directorio_cache, ARCHIVO_CACHE)
+
+    if not forzar and os.path.exists(ruta_cache):
+        with open(ruta_cache, encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('firma') == firma:
+            return cache['variables']
+
+    metadatos = analizar_libro(ruta)
+
+    # Escritura atómica para que un proceso concurrente nunca lea un JSON a medias
+    os.makedirs(directorio_cache, exist_ok=True)
+    temporal = f"{ruta_cache}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({'firma': firma, 'variables': metadatos}, f, ensure_ascii=False)
+    os.replace(temporal, ruta_cache)
+    return metadatos
+
+
+def clave_seccion(seccion):
+    """
+    Clave de SECCIONES que corresponde a la sección indicada en el libro.
+
+    Args:
+        seccion (str): Sección del libro, por número ("Section 2", "2. ...")
+                       o por nombre ("Contexto Normativo")
+
+    Returns:
+        str | None: Clave (ej: 'seccion_2'), o None si no se reconoce
+    """
+    if not seccion:
+        return None
+
+    numero = re.search(r'\d+', seccion)
+    if numero and f"seccion_{int(numero.group())}" in SECCIONES:
+        return f"seccion_{int(numero.group())}"
+
+    texto = normalizar_texto(seccion)
+    for seccion_key, info in SECCIONES.items():
+        if normalizar_texto(info['nombre']) in texto:
+            return seccion_key
+    return None
+
+
+def aplicar_metadatos(metadatos):
+    """
+    Actualiza en el sitio config.AIRA_TITULOS, config.AIRA_PESOS y las listas de
+    variables de config.SECCIONES, de modo que todos los módulos que ya los
+    importaron ven los valores nuevos. Las secciones no reconocidas se ignoran.
+
+    Args:
+        metadatos (dict): Tabla de cargar_metadatos()
+    """
+    AIRA_TITULOS.update({codigo: m['titulo'] for codigo, m in metadatos.items() if m['titulo']})
+    AIRA_PESOS.update({codigo: m['peso'] for codigo, m in metadatos.items()})
+
+    destinos = {codigo: clave_seccion(m['seccion']) for codigo, m in metadatos.items()}
+    destinos = {codigo: clave for codigo, clave in destinos.items() if clave}
+    if not destinos:
+        return
+
+    for seccion_key, info in SECCIONES.items():
+        variables = [v for v in info['variables'] if destinos.get(v, seccion_key) == seccion_key]
+        variables += [v for v, clave in destinos.items() if clave == seccion_key and v not in variables]
+        info['variables'] = sorted(variables, key=lambda v: int(v.split('_')[1]))
+
+
+def instalar_metadatos():
+    """
+    Carga y aplica los metadatos una sola vez por proceso.
+
+    Returns:
+        dict | None: Tabla de metadatos aplicada, o None si no hay libro
+    """
+    global _metadatos_aplicados
+    if _metadatos_aplicados is None:
+        metadatos = cargar_metadatos()
+        if metadatos:
+            aplicar_metadatos(metadatos)
+        _metadatos_aplicados = metadatos or {}
+    return _metadatos_aplicados or None
+
+
+def obtener_metadato(codigo):
+    """
+    Devuelve el título, la sección y el peso de una variable.
+
+    Args:
+        codigo (str): Código AIRA (p. ej. 'AIRA_1')
+
+    Returns:
+        dict: {'titulo', 'seccion', 'peso'} (sección None si no hay libro de metadatos)
+    """
+    metadatos = instalar_metadatos() or {}
+    if codigo in metadatos:
+        return metadatos[codigo]
+    return {'titulo': AIRA_TITULOS.get(codigo), 'seccion': None, 'peso': AIRA_PESOS.get(codigo, 1.0)}
+
+
+# ==================== LÍNEA DE COMANDOS ====================
+
+def main(argv=None):
+    """
+    Analiza el libro de metadatos y actualiza la caché JSON.
+    """
+    parser = argparse.ArgumentParser(description="Convierte 'AIRA Metadata.xlsx' en la caché de metadatos.")
+    parser.add_argument('--libro', default=METADATA_PATH,
+                        help="Libro de metadatos (por defecto: Data/AIRA Metadata.xlsx)")
+    parser.add_argument('--cache', default=CACHE_DIR,
+                        help="Directorio de la caché (por defecto: Data/cache)")
+    parser.add_argument('--forzar', action='store_true',
+                        help="Volver a analizar el libro aunque no haya cambiado")
+    args = parser.parse_args(argv)
+
+    metadatos = cargar_metadatos(args.libro, args.cache, forzar=args.forzar)
+    if metadatos is None:
+        print(f"⚠️ No se encontró el libro de metadatos en '{args.libro}'; se usan los títulos de config.py")
+    else:
+        print(f"✅ Metadatos de {len(metadatos)} variables en '{os.path.join(args.cache, ARCHIVO_CACHE)}'")
+
+
+if __name__ == "__main__":
+    main()
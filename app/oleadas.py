@@ -0,0 +1,402 @@
+"""
+Oleadas de la Encuesta AIRA
+===========================
+Este módulo gestiona varias oleadas (repeticiones) de la encuesta AIRA para
+compararlas en el tiempo.
+
+Cada oleada se guarda como una partición independiente en OLAS_DIR/<oleada>/
+con el formato de cubo de cubo.py. Al cargarlas, las particiones se apilan en
+un cubo int8 de forma (oleadas, países, variables) alineado sobre la unión de
+países y variables, sin volver a pivotar ninguna oleada. A partir de ese cubo:
+
+- calcular_transiciones(): matrices de transición de respuestas por variable
+  (p. ej. cuántos países pasan de NO a UD o de UD a YES) con un solo bincount.
+- calcular_scores_olas(): scores por área de todas las oleadas a la vez,
+  con la misma imputación y agregación que preparar_datos_ml() y
+  calcular_scores_por_area().
+- calcular_deltas_scores(): diferencias de scores por país entre dos oleadas.
+
+Si no hay particiones, la oleada OLA_INICIAL se toma de DATA_PATH.
+
+Uso:
+    python oleadas.py --ola 2026-2027 --archivo nuevos_datos.csv
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Permitir ejecutar el script desde cualquier directorio
+sys.path.append(str(Path(__file__).parent))
+
+from config import OLAS_DIR, OLA_INICIAL, CODIGOS_RESPUESTA, AIRA_GRUPOS, AIRA_PESOS, COUNTRY_NAMES
+from cubo import construir_cubo, guardar_cubo, cargar_cubo, existe_cubo, codificar_ml, SIN_RESPUESTA
+from utils import cargar_datos, depurar_datos, COLUMNAS_REQUERIDAS
+from instrumentacion import medir
+from entorno import cache_datos
+
+
+# Etiquetas de las filas/columnas de las matrices de transición (la última = sin respuesta)
+ESTADOS_TRANSICION = CODIGOS_RESPUESTA + ['Sin respuesta']
+
+# Orden de avance para resumir transiciones (DNK y N/A no cuentan como avance ni retroceso)
+NIVEL_AVANCE = {'NO': 0, 'UD': 1, 'YES': 2}
+
+
+# ==================== ALMACÉN DE OLEADAS ====================
+
+def guardar_ola(df, ola, directorio=OLAS_DIR):
+    """
+    Guarda una oleada como partición del almacén.
+
+    Args:
+        df (pd.DataFrame): Datos de la oleada en formato largo
+                           ('COUNTRY_REGION', 'Measure_code', 'AIRA_SIMPLE')
+        ola (str): Identificador de la oleada (p. ej. '2024-2025')
+        directorio (str): Directorio del almacén
+
+    Returns:
+        str: Ruta de la partición creada
+    """
+    ruta = os.path.join(directorio, str(ola))
+    guardar_cubo(construir_cubo(df), ruta)
+    return ruta
+
+
+def listar_olas(directorio=OLAS_DIR):
+    """
+    Lista las oleadas guardadas en el almacén, en orden alfabético.
+
+    Args:
+        directorio (str): Directorio del almacén
+
+    Returns:
+        list: Identificadores de oleada
+    """
+    if not os.path.isdir(directorio):
+        return []
+    return sorted(
+        nombre for nombre in os.listdir(directorio)
+        if existe_cubo(os.path.join(directorio, nombre))
+    )
+
+
+def _firma_almacen(directorio):
+    """
+    Firma del almacén (oleadas y fechas de modificación) usada como clave de caché.
+    """
+    return tuple(
+        (ola, os.path.getmtime(os.path.join(directorio, ola, 'codigos.npy')))
+        for ola in listar_olas(directorio)
+    )
+
+
+def apilar_cubos(olas, cubos):
+    """
+    Apila cubos de varias oleadas sobre la unión de países y variables.
+
+    Args:
+        olas (list): Identificadores de oleada
+        cubos (list): Cubos (dict de cubo.py) en el mismo orden
+
+    Returns:
+        dict: Cubo apilado con las claves 'olas', 'paises', 'variables',
+              'codigos' (int8, forma oleadas x países x variables),
+              'presentes' (bool, oleadas x países) y 'variables_presentes'
+              (bool, oleadas x variables)
+    """
+    paises = sorted(set().union(*(c['paises'] for c in cubos)))
+    variables = sorted(set().union(*(c['variables'] for c in cubos)))
+
+    codigos = np.full((len(olas), len(paises), len(variables)), SIN_RESPUESTA, dtype=np.int8)
+    presentes = np.zeros((len(olas), len(paises)), dtype=bool)
+    variables_presentes = np.zeros((len(olas), len(variables)), dtype=bool)
+
+    for w, cubo in enumerate(cubos):
+        # Posiciones de las filas/columnas de la oleada dentro de la unión (ambas ordenadas)
+        filas = np.searchsorted(paises, cubo['paises'])
+        columnas = np.searchsorted(variables, cubo['variables'])
+        codigos[w][np.ix_(filas, columnas)] = cubo['codigos']
+        presentes[w, filas] = True
+        variables_presentes[w, columnas] = True
+
+    return {
+        'olas': list(olas),
+        'paises': paises,
+        'variables': variables,
+        'codigos': codigos,
+        'presentes': presentes,
+        'variables_presentes': variables_presentes
+    }
+
+
+@cache_datos
+def _cargar_olas(directorio, firma):
+    """
+    Carga y apila las particiones del almacén (cacheado por firma del almacén).
+    """
+    olas = listar_olas(directorio)
+    if olas:
+        cubos = [cargar_cubo(os.path.join(directorio, ola)) for ola in olas]
+    else:
+        olas = [OLA_INICIAL]
+        cubos = [construir_cubo(cargar_datos())]
+    return apilar_cubos(olas, cubos)
+
+
+@medir
+def cargar_olas(directorio=OLAS_DIR):
+    """
+    Carga todas las oleadas como un cubo apilado.
+    Si el almacén está vacío se usa DATA_PATH como oleada OLA_INICIAL.
+
+    Args:
+        directorio (str): Directorio del almacén
+
+    Returns:
+        dict: Cubo apilado (ver apilar_cubos())
+    """
+    # La firma forma parte de la clave de caché: añadir o reescribir una oleada invalida la caché
+    return _cargar_olas(directorio, repr(_firma_almacen(directorio)))
+
+
+def _indice_ola(olas_cubo, ola):
+    """
+    Posición de una oleada en el cubo apilado.
+    """
+    if ola not in olas_cubo['olas']:
+        raise ValueError(f"Oleada desconocida: {ola}. Disponibles: {olas_cubo['olas']}")
+    return olas_cubo['olas'].index(ola)
+
+
+# ==================== TRANSICIONES ====================
+
+@medir
+def calcular_transiciones(olas_cubo, ola_origen, ola_destino):
+    """
+    Cuenta, para cada variable, cuántos países pasan de cada respuesta a cada otra
+    entre dos oleadas. Solo se cuentan los países presentes en ambas oleadas.
+
+    Args:
+        olas_cubo (dict): Cubo apilado de cargar_olas()
+        ola_origen (str): Oleada inicial
+        ola_destino (str): Oleada final
+
+    Returns:
+        np.ndarray: Conteos int64 de forma (n_variables, n_estados, n_estados),
+                    con filas = respuesta de origen y columnas = respuesta de destino
+                    en el orden de ESTADOS_TRANSICION
+    """
+    w0 = _indice_ola(olas_cubo, ola_origen)
+    w1 = _indice_ola(olas_cubo, ola_destino)
+    n_estados = len(ESTADOS_TRANSICION)
+    n_variables = len(olas_cubo['variables'])
+
+    comunes = olas_cubo['presentes'][w0] & olas_cubo['presentes'][w1]
+    origen = olas_cubo['codigos'][w0, comunes].astype(np.int64)
+    destino = olas_cubo['codigos'][w1, comunes].astype(np.int64)
+
+    # SIN_RESPUESTA (-1) pasa a ser el último estado
+    origen[origen < 0] = n_estados - 1
+    destino[destino < 0] = n_estados - 1
+
+    # Un único bincount sobre el índice plano (variable, origen, destino)
+    variable = np.arange(n_variables)
+    indice = (variable * n_estados + origen) * n_estados + destino
+    conteos = np.bincount(indice.ravel(), minlength=n_variables * n_estados * n_estados)
+    return conteos.reshape(n_variables, n_estados, n_estados)
+
+
+def tabla_transiciones(olas_cubo, transiciones, variable):
+    """
+    Devuelve la matriz de transición de una variable como DataFrame etiquetado.
+
+    Args:
+        olas_cubo (dict): Cubo apilado
+        transiciones (np.ndarray): Resultado de calcular_transiciones()
+        variable (str): Código de variable AIRA
+
+    Returns:
+        pd.DataFrame: Filas = respuesta de origen, columnas = respuesta de destino
+    """
+    j = olas_cubo['variables'].index(variable)
+    return pd.DataFrame(
+        transiciones[j],
+        index=pd.Index(ESTADOS_TRANSICION, name='Origen'),
+        columns=pd.Index(ESTADOS_TRANSICION, name='Destino')
+    )
+
+
+def resumir_transiciones(olas_cubo, transiciones):
+    """
+    Resume las transiciones de cada variable en avances (NO→UD, UD→YES, NO→YES),
+    retrocesos y países sin cambios.
+
+    Args:
+        olas_cubo (dict): Cubo apilado
+        transiciones (np.ndarray): Resultado de calcular_transiciones()
+
+    Returns:
+        pd.DataFrame: Una fila por variable con 'Avances', 'Retrocesos', 'Sin_Cambio' y 'Total'
+    """
+    # Nivel de cada estado (NaN para DNK, N/A y sin respuesta)
+    niveles = np.array([NIVEL_AVANCE.get(e, np.nan) for e in ESTADOS_TRANSICION])
+    diferencia = niveles[None, :] - niveles[:, None]
+
+    avances = transiciones[:, diferencia > 0].sum(axis=1)
+    retrocesos = transiciones[:, diferencia < 0].sum(axis=1)
+    sin_cambio = np.trace(transiciones, axis1=1, axis2=2)
+
+    return pd.DataFrame({
+        'Avances': avances,
+        'Retrocesos': retrocesos,
+        'Sin_Cambio': sin_cambio,
+        'Total': transiciones.sum(axis=(1, 2))
+    }, index=pd.Index(olas_cubo['variables'], name='Measure_code'))
+
+
+# ==================== SCORES POR OLEADA ====================
+
+def _matriz_areas(variables):
+    """
+    Matriz (variables x áreas) con 1 donde la variable pertenece al área.
+    """
+    indice = {v: j for j, v in enumerate(variables)}
+    matriz = np.zeros((len(variables), len(AIRA_GRUPOS)))
+    for a, vars_area in enumerate(AIRA_GRUPOS.values()):
+        for v in vars_area:
+            if v in indice:
+                matriz[indice[v], a] = 1
+    return matriz
+
+
+@medir
+def calcular_scores_olas(olas_cubo):
+    """
+    Calcula los scores (0-100) por área y el score general de todas las oleadas.
+
+    Reproduce preparar_datos_ml() + calcular_scores_por_area() para cada oleada:
+    codificación ML, imputación por la mediana de la variable dentro de la oleada
+    y promedio de las variables del área ponderado con AIRA_PESOS, pero con
+    operaciones vectorizadas sobre el cubo apilado.
+
+    Args:
+        olas_cubo (dict): Cubo apilado de cargar_olas()
+
+    Returns:
+        np.ndarray: Scores de forma (oleadas, países, áreas + 1); la última columna
+                    es el score general. Los países ausentes de una oleada quedan en NaN
+    """
+    valores = codificar_ml(olas_cubo['codigos'])
+
+    # Variables con al menos una respuesta en cada oleada
+    con_datos = ~np.isnan(valores).all(axis=1)
+
+    # Mediana de cada variable dentro de cada oleada (0 si la variable no tiene datos)
+    medianas = np.zeros(con_datos.shape)
+    medianas[con_datos] = np.nanmedian(np.moveaxis(valores, 1, 2)[con_datos], axis=1)
+    valores = np.where(np.isnan(valores), medianas[:, None, :], valores)
+
+    # Las variables que no forman parte de una oleada no cuentan en el promedio del área
+    # (igual que vars_existentes en calcular_scores_por_area), y cada una pesa lo que
+    # indique el libro de metadatos (AIRA_PESOS; sin libro, 1.0)
+    pesos_variables = np.array([AIRA_PESOS.get(v, 1.0) for v in olas_cubo['variables']])
+    pesos = ((_matriz_areas(olas_cubo['variables']) * pesos_variables[:, None])[None, :, :]
+             * olas_cubo['variables_presentes'][:, :, None])
+    total = pesos.sum(axis=1, keepdims=True)
+    pesos = np.divide(pesos, total, out=np.zeros_like(pesos), where=total > 0)
+
+    areas = np.einsum('wpv,wva->wpa', valores, pesos) / 2 * 100
+    areas[np.broadcast_to((total == 0), areas.shape)] = np.nan
+    general = np.nanmean(areas, axis=2, keepdims=True)
+
+    scores = np.concatenate([areas, general], axis=2)
+    scores[~olas_cubo['presentes']] = np.nan
+    return scores
+
+
+def scores_ola(olas_cubo, scores, ola):
+    """
+    Devuelve los scores de una oleada como DataFrame (mismo formato que calcular_scores_por_area()).
+
+    Args:
+        olas_cubo (dict): Cubo apilado
+        scores (np.ndarray): Resultado de calcular_scores_olas()
+        ola (str): Identificador de la oleada
+
+    Returns:
+        pd.DataFrame: Scores por área, 'Score_General' y 'Pais'
+    """
+    w = _indice_ola(olas_cubo, ola)
+    presentes = olas_cubo['presentes'][w]
+    df_scores = pd.DataFrame(
+        scores[w, presentes],
+        index=pd.Index(np.array(olas_cubo['paises'])[presentes], name='COUNTRY_REGION'),
+        columns=list(AIRA_GRUPOS.keys()) + ['Score_General']
+    )
+    df_scores['Pais'] = df_scores.index.map(COUNTRY_NAMES)
+    return df_scores
+
+
+@medir
+def calcular_deltas_scores(olas_cubo, ola_origen, ola_destino, scores=None):
+    """
+    Calcula la variación de los scores por área de cada país entre dos oleadas.
+
+    Args:
+        olas_cubo (dict): Cubo apilado de cargar_olas()
+        ola_origen (str): Oleada inicial
+        ola_destino (str): Oleada final
+        scores (np.ndarray, optional): Resultado de calcular_scores_olas() si ya se calculó
+
+    Returns:
+        pd.DataFrame: Diferencia (destino - origen) por área y general, solo para países
+                      presentes en ambas oleadas, ordenado por 'Score_General' descendente
+    """
+    if scores is None:
+        scores = calcular_scores_olas(olas_cubo)
+    w0 = _indice_ola(olas_cubo, ola_origen)
+    w1 = _indice_ola(olas_cubo, ola_destino)
+
+    comunes = olas_cubo['presentes'][w0] & olas_cubo['presentes'][w1]
+    df_deltas = pd.DataFrame(
+        scores[w1, comunes] - scores[w0, comunes],
+        index=pd.Index(np.array(olas_cubo['paises'])[comunes], name='COUNTRY_REGION'),
+        columns=list(AIRA_GRUPOS.keys()) + ['Score_General']
+    )
+    df_deltas['Pais'] = df_deltas.index.map(COUNTRY_NAMES)
+    return df_deltas.sort_values('Score_General', ascending=False)
+
+
+# ==================== LÍNEA DE COMANDOS ====================
+
+def main(argv=None):
+    """
+    Registra una oleada en el almacén a partir de un CSV en formato AIRAData_final.csv.
+    """
+    parser = argparse.ArgumentParser(description="Añade una oleada de la encuesta AIRA al almacén.")
+    parser.add_argument('--ola', required=True, help="Identificador de la oleada (p. ej. 2026-2027)")
+    parser.add_argument('--archivo', required=True,
+                        help="CSV con columnas Measure_code, AIRA_SIMPLE y COUNTRY_REGION")
+    parser.add_argument('--directorio', default=OLAS_DIR,
+                        help="Directorio del almacén (por defecto: Data/oleadas)")
+    args = parser.parse_args(argv)
+
+    # Misma validación que cargar_datos(): solo se guardan datos depurados
+    df, informe = depurar_datos(pd.read_csv(args.archivo))
+    if informe['errores']:
+        sys.exit("❌ Oleada no válida, no se guarda: " + " ".join(informe['errores']))
+    for aviso in informe['avisos']:
+        print(f"⚠️ {aviso}")
+
+    ruta = guardar_ola(df[COLUMNAS_REQUERIDAS], args.ola, args.directorio)
+    print(f"✅ Oleada '{args.ola}' guardada en '{ruta}': "
+          f"{df['COUNTRY_REGION'].nunique()} países, {df['Measure_code'].nunique()} variables")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Perfiles de País para AIRA
+==========================
+Resumen precalculado de cada país: sus respuestas a todas las variables,
+sus scores por área con el puesto y percentil que ocupa en cada una (en
+general y dentro de su cluster), su cluster y tipología y sus países más
+similares.
+
+Todos los resúmenes se calculan de una vez (cacheados) y de forma
+vectorial: las respuestas salen de las filas del cubo, los puestos del
+ranking de ranking.py (una pasada sobre la matriz países x áreas) y el
+cluster del modelo K-means del simulador. Cambiar de país en la página es
+una consulta a un diccionario.
+
+Uso:
+    perfiles = construir_perfiles_paises(df)
+    perfiles['ESP']['rangos']['Score_General']
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import AIRA_TITULOS, COUNTRY_NAMES, CODIGOS_RESPUESTA, RESPONSE_LABELS
+from simulador import crear_estado_simulacion, AREA_POR_VARIABLE
+from vecinos import construir_indice_vecinos, tabla_vecinos, N_VECINOS
+from ranking import construir_ranking
+from utils import preparar_datos_ml
+from instrumentacion import medir
+from entorno import cache_recurso
+
+
+# Etiqueta en español de cada código del cubo (la última posición = sin respuesta)
+ETIQUETAS_RESPUESTA = np.array(
+    [RESPONSE_LABELS.get(c, c) for c in CODIGOS_RESPUESTA] + ['Sin respuesta'], dtype=object
+)
+
+
+# ==================== CONSTRUCCIÓN DE LOS PERFILES ====================
+
+@medir
+@cache_recurso
+def construir_perfiles_paises(df, k=None, n_vecinos=N_VECINOS):
+    """
+    Precalcula el resumen de todos los países.
+
+    Args:
+        df (pd.DataFrame): DataFrame original en formato largo
+        k (int, optional): Número de clusters. Si es None se usa el K óptimo
+        n_vecinos (int): Países similares que se guardan por país
+
+    Returns:
+        dict: Código ISO -> resumen con 'nombre', 'respuestas' (DataFrame por variable),
+              'scores', 'rangos' (puestos densos), 'percentiles', 'bandas' y
+              'rangos_cluster' (por área y 'Score_General'), 'n_paises', 'cluster',
+              'n_cluster', 'tipologia' (emoji, nombre, color) y 'vecinos' (DataFrame).
+              Con Streamlit se comparte entre sesiones: no debe modificarse
+    """
+    estado = crear_estado_simulacion(df, k)
+    cubo = estado['cubo']
+    _, _, df_filled = preparar_datos_ml(df)
+    indice_vecinos = construir_indice_vecinos(df_filled)
+
+    # Scores y puestos de todos los países (mismo orden de filas que el cubo)
+    ranking = construir_ranking(estado['df_scores'].loc[cubo['paises']], estado['clusters'])
+    columnas_scores = ranking['columnas']
+    scores = ranking['scores']
+    tamanos_clusters = np.bincount(estado['clusters'])
+
+    # Respuestas de todos los países como etiquetas (una sola indexación del cubo),
+    # con las variables en orden numérico (AIRA_1, AIRA_2, ..., AIRA_10)
+    orden = sorted(range(len(cubo['variables'])), key=lambda j: (len(cubo['variables'][j]), cubo['variables'][j]))
+    respuestas = ETIQUETAS_RESPUESTA[cubo['codigos'][:, orden]]
+    variables = [cubo['variables'][j] for j in orden]
+    titulos = [AIRA_TITULOS.get(v, 'Sin título') for v in variables]
+    areas = [AREA_POR_VARIABLE.get(v, 'Sin área') for v in variables]
+
+    perfiles = {}
+    for fila, pais in enumerate(cubo['paises']):
+        cluster = int(estado['clusters'][fila])
+        perfiles[pais] = {
+            'nombre': COUNTRY_NAMES.get(pais, pais),
+            'respuestas': pd.DataFrame({
+                'Variable': variables,
+                'Título': titulos,
+                'Área': areas,
+                'Respuesta': respuestas[fila]
+            }),
+            'scores': dict(zip(columnas_scores, scores[fila].tolist())),
+            'rangos': dict(zip(columnas_scores, ranking['puestos'][fila].tolist())),
+            'percentiles': dict(zip(columnas_scores, ranking['percentiles'][fila].tolist())),
+            'bandas': dict(zip(columnas_scores, ranking['bandas'][fila].tolist())),
+            'rangos_cluster': dict(zip(columnas_scores, ranking['por_cluster']['puestos'][fila].tolist())),
+            'n_paises': len(cubo['paises']),
+            'cluster': cluster,
+            'n_cluster': int(tamanos_clusters[cluster]),
+            'tipologia': estado['tipologias'][cluster],
+            'vecinos': tabla_vecinos(indice_vecinos, pais, n_vecinos)
+        }
+
+    return perfiles
@@ -0,0 +1,206 @@
+"""
+Rankings y Percentiles de AIRA
+==============================
+Puestos, percentiles y bandas de cuantiles de todos los países en todas las
+áreas temáticas y en el Score General, calculados en una sola pasada sobre
+la matriz de scores (países x columnas):
+
+- Un único argsort estable por columnas ordena la matriz entera; los
+  puestos densos (los empates comparten puesto y el siguiente no salta),
+  los percentiles y las bandas salen de acumulados sobre ese orden.
+- Con clusters, el mismo orden se reagrupa por cluster y los puestos se
+  calculan dentro de cada uno, sin repetir la ordenación por grupo.
+- top_n() responde con el orden precalculado: los N primeros de una
+  columna (o de un cluster) son un corte, sin nlargest.
+
+Uso:
+    ranking = construir_ranking(df_scores)
+    top_n(ranking, 'Regulación', n=10)
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import AIRA_GRUPOS
+from instrumentacion import medir
+from entorno import cache_recurso
+
+
+# Número de bandas por defecto (cuartiles); la banda 1 es la de scores más altos
+N_BANDAS = 4
+
+
+# ==================== PUESTOS POR GRUPO ====================
+
+def calcular_puestos(scores, grupos=None, n_bandas=N_BANDAS):
+    """
+    Puestos densos, percentiles y bandas de cada fila en cada columna.
+
+    Los puestos van de mayor a menor score (1 = más alto). Si se indican
+    grupos, cada fila se compara solo con las de su mismo grupo.
+
+    Args:
+        scores (np.ndarray): Matriz (filas x columnas) de scores
+        grupos (array-like, optional): Grupo de cada fila (ej: su cluster)
+        n_bandas (int): Número de bandas de cuantiles (4 = cuartiles)
+
+    Returns:
+        dict: Matrices con la forma de scores:
+              'orden' (índices de fila ordenados por columna, de mejor a peor),
+              'puestos' (densos, int), 'percentiles' (0-100, % de filas del grupo
+              con score menor o igual) y 'bandas' (1..n_bandas, 1 = mejores)
+    """
+    scores = np.asarray(scores, dtype=float)
+    n_filas, n_columnas = scores.shape
+    filas = np.arange(n_filas)[:, None]
+
+    # Un solo argsort estable (de mayor a menor; a igual score, orden de filas)
+    orden = np.argsort(-scores, axis=0, kind='stable')
+
+    if grupos is None:
+        inicio_grupo = (filas == 0) & np.ones((1, n_columnas), dtype=bool)
+    else:
+        grupos = np.asarray(grupos)
+        # Reagrupar el orden global por grupo (estable: se mantiene el orden por score)
+        orden = np.take_along_axis(orden, np.argsort(grupos[orden], axis=0, kind='stable'), axis=0)
+        grupos_ordenados = grupos[orden]
+        inicio_grupo = np.vstack([
+            np.ones((1, n_columnas), dtype=bool),
+            grupos_ordenados[1:] != grupos_ordenados[:-1]
+        ])
+
+    ordenados = np.take_along_axis(scores, orden, axis=0)
+    nuevo_valor = inicio_grupo | np.vstack([
+        np.ones((1, n_columnas), dtype=bool),
+        ordenados[1:] != ordenados[:-1]
+    ])
+
+    # Puesto denso: valores distintos vistos desde el inicio del grupo
+    acumulado = np.cumsum(nuevo_valor, axis=0)
+    base_grupo = np.maximum.accumulate(np.where(inicio_grupo, acumulado, 0), axis=0)
+    puestos_ordenados = acumulado - base_grupo + 1
+
+    # Posiciones (dentro del grupo) donde empieza el grupo y cada bloque de empates
+    posicion_grupo = np.maximum.accumulate(np.where(inicio_grupo, filas, 0), axis=0)
+    posicion_empate = np.maximum.accumulate(np.where(nuevo_valor, filas, 0), axis=0)
+    fin_grupo = np.minimum.accumulate(
+        np.where(np.vstack([inicio_grupo[1:], np.ones((1, n_columnas), dtype=bool)]), filas, n_filas)[::-1],
+        axis=0
+    )[::-1]
+    tamano_grupo = fin_grupo - posicion_grupo + 1
+    mejores = posicion_empate - posicion_grupo
+
+    percentiles_ordenados = (tamano_grupo - mejores) / tamano_grupo * 100
+    bandas_ordenadas = mejores * n_bandas // tamano_grupo + 1
+
+    # Devolver cada matriz al orden original de las filas
+    resultado = {'orden': orden}
+    for nombre, valores in (('puestos', puestos_ordenados),
+                            ('percentiles', percentiles_ordenados),
+                            ('bandas', bandas_ordenadas)):
+        matriz = np.empty_like(valores)
+        np.put_along_axis(matriz, orden, valores, axis=0)
+        resultado[nombre] = matriz
+
+    return resultado
+
+
+# ==================== RANKING COMPLETO ====================
+
+@medir
+@cache_recurso
+def construir_ranking(df_scores, clusters=None, n_bandas=N_BANDAS):
+    """
+    Ranking de todas las áreas y del Score General en una sola pasada.
+
+    Args:
+        df_scores (pd.DataFrame): Scores por área (ver calcular_scores_por_area()),
+                                  con los países como índice
+        clusters (array-like, optional): Cluster de cada fila de df_scores; si se
+                                         indica se calcula también el ranking por cluster
+        n_bandas (int): Número de bandas de cuantiles (4 = cuartiles)
+
+    Returns:
+        dict: 'paises', 'nombres', 'columnas', 'scores' (matriz) y el resultado de
+              calcular_puestos() ('orden', 'puestos', 'percentiles', 'bandas');
+              con clusters, además 'clusters' y 'por_cluster' (mismo formato).
+              Con Streamlit se comparte entre sesiones: no debe modificarse
+    """
+    columnas = [area for area in AIRA_GRUPOS if area in df_scores.columns]
+    if 'Score_General' in df_scores.columns:
+        columnas.append('Score_General')
+
+    scores = df_scores[columnas].to_numpy(dtype=float)
+    nombres = df_scores['Pais'] if 'Pais' in df_scores.columns else df_scores.index.to_series()
+
+    ranking = {
+        'paises': list(df_scores.index),
+        'nombres': nombres.tolist(),
+        'columnas': columnas,
+        'scores': scores,
+        **calcular_puestos(scores, n_bandas=n_bandas)
+    }
+
+    if clusters is not None:
+        ranking['clusters'] = np.asarray(clusters)
+        ranking['por_cluster'] = calcular_puestos(scores, ranking['clusters'], n_bandas=n_bandas)
+
+    return ranking
+
+
+def tabla_ranking(ranking, columna, por_cluster=False):
+    """
+    Tabla con el score, puesto, percentil y banda de cada país en una columna.
+
+    Args:
+        ranking (dict): Resultado de construir_ranking()
+        columna (str): Área o 'Score_General'
+        por_cluster (bool): Si True, puestos dentro del cluster de cada país
+
+    Returns:
+        pd.DataFrame: Países como índice, ordenados de mejor a peor puesto
+    """
+    j = ranking['columnas'].index(columna)
+    puestos = ranking['por_cluster'] if por_cluster else ranking
+    orden = puestos['orden'][:, j]
+
+    tabla = pd.DataFrame({
+        'Pais': np.asarray(ranking['nombres'], dtype=object)[orden],
+        columna: ranking['scores'][orden, j],
+        'Puesto': puestos['puestos'][orden, j],
+        'Percentil': puestos['percentiles'][orden, j],
+        'Banda': puestos['bandas'][orden, j]
+    }, index=pd.Index(np.asarray(ranking['paises'], dtype=object)[orden]))
+
+    if por_cluster:
+        tabla.insert(1, 'Cluster', ranking['clusters'][orden])
+
+    return tabla
+
+
+def top_n(ranking, columna, n=10, cluster=None):
+    """
+    Los N países con mayor score en una columna, a partir del orden precalculado.
+
+    Args:
+        ranking (dict): Resultado de construir_ranking()
+        columna (str): Área o 'Score_General'
+        n (int): Número de países
+        cluster (int, optional): Si se indica, solo los países de ese cluster
+                                 (requiere construir_ranking(..., clusters=...))
+
+    Returns:
+        pd.DataFrame: Columnas 'Pais' y columna, de mayor a menor score
+                      (a igual score, en el orden original, como nlargest)
+    """
+    j = ranking['columnas'].index(columna)
+    orden = ranking['orden'][:, j]
+
+    if cluster is not None:
+        orden = orden[ranking['clusters'][orden] == cluster]
+
+    orden = orden[:n]
+    return pd.DataFrame({
+        'Pais': np.asarray(ranking['nombres'], dtype=object)[orden],
+        columna: ranking['scores'][orden, j]
+    }, index=pd.Index(np.asarray(ranking['paises'], dtype=object)[orden]))
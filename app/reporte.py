@@ -0,0 +1,328 @@
+"""
+Generador de Reportes por Lotes para AIRA
+=========================================
+Punto de entrada de línea de comandos para generar reportes sin interfaz
+de Streamlit (el núcleo de cálculo no importa Streamlit). Reutiliza utils.py, clustering.py y visualizations.py para
+calcular en una sola pasada el clustering, los scores por área y las
+distribuciones de cada variable, y escribe todas las tablas y figuras
+en un directorio de salida.
+
+Las figuras de variables, secciones y clustering son independientes entre
+sí, por lo que se generan en paralelo con un pool de procesos.
+
+Uso:
+    python reporte.py --salida reportes/ --procesos 4 --formato html
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+# Permitir ejecutar el script desde cualquier directorio
+sys.path.append(str(Path(__file__).parent))
+
+from config import SECCIONES, AIRA_TITULOS
+from utils import (
+    cargar_datos, enriquecer_dataframe, preparar_datos_ml,
+    calcular_distribuciones_por_variable, crear_tabla_pivotada_seccion
+)
+from clustering import ejecutar_analisis_clustering
+from instrumentacion import medir
+from entorno import establecer_tema
+from metadatos import instalar_metadatos
+
+
+# Formatos de exportación de figuras (png/svg/pdf requieren kaleido)
+FORMATOS_FIGURA = ['html', 'png', 'svg', 'pdf']
+
+
+# ==================== TAREAS DE LOS PROCESOS ====================
+
+def _inicializar_proceso(tema):
+    """
+    Inicializa cada proceso del pool con el tema de los gráficos.
+    """
+    establecer_tema(tema)
+
+
+def _exportar_figura(fig, ruta_base, formato):
+    """
+    Exporta una figura de Plotly a disco.
+
+    Args:
+        fig (plotly.graph_objects.Figure): Figura a exportar
+        ruta_base (str): Ruta del archivo sin extensión
+        formato (str): 'html', 'png', 'svg' o 'pdf'
+
+    Returns:
+        str: Ruta del archivo generado
+    """
+    ruta = f"{ruta_base}.{formato}"
+
+    if formato == 'html':
+        fig.write_html(ruta, include_plotlyjs='cdn')
+    else:
+        fig.write_image(ruta)
+
+    return ruta
+
+
+def _tarea_variable(variable, df_variable, distribucion, directorio, formato):
+    """
+    Genera el mapa y el gráfico de distribución de una variable AIRA.
+    """
+    from visualizations import crear_mapa_europa, crear_grafico_distribucion
+
+    base = os.path.join(directorio, variable)
+    return [
+        _exportar_figura(crear_mapa_europa(df_variable, variable), f"{base}_mapa", formato),
+        _exportar_figura(crear_grafico_distribucion(distribucion), f"{base}_distribucion", formato)
+    ]
+
+
+def _tarea_seccion(seccion_key, df_pivot, distribucion, directorio, formato):
+    """
+    Genera la tabla resumen y la distribución agregada de una sección.
+    """
+    from visualizations import crear_tabla_interactiva, crear_grafico_distribucion
+
+    nombre = SECCIONES[seccion_key]['nombre']
+    base = os.path.join(directorio, seccion_key)
+    return [
+        _exportar_figura(
+            crear_tabla_interactiva(df_pivot, titulo=f"Tabla Resumen - {nombre}"),
+            f"{base}_tabla", formato
+        ),
+        _exportar_figura(crear_grafico_distribucion(distribucion), f"{base}_distribucion", formato)
+    ]
+
+
+def _tarea_clustering(resultados, directorio, formato):
+    """
+    Genera las figuras del análisis de clustering.
+    """
+    from visualizations import (
+        crear_grafico_metodo_codo, crear_grafico_silhouette,
+        crear_grafico_pca_2d, crear_grafico_pca_3d,
+        crear_grafico_radar_perfil, crear_grafico_comparacion_clusters
+    )
+
+    barrido = resultados['barrido']
+    pca = resultados['pca']
+    clusters = resultados['clusters']
+
+    figuras = {
+        'metodo_codo': crear_grafico_metodo_codo(barrido['inertias'], barrido['k_range']),
+        'silueta': crear_grafico_silhouette(barrido['silhouette_scores'], barrido['k_range']),
+        'pca_2d': crear_grafico_pca_2d(pca['coords_2d'], clusters, pca['labels']),
+        'pca_3d': crear_grafico_pca_3d(pca['coords_3d'], clusters, pca['labels']),
+        'comparacion_clusters': crear_grafico_comparacion_clusters(resultados['perfiles'])
+    }
+
+    for perfil in resultados['perfiles']:
+        cluster_id = perfil['cluster_id']
+        _, _, color = resultados['tipologias'][cluster_id]
+        figuras[f"radar_cluster_{cluster_id}"] = crear_grafico_radar_perfil(
+            perfil, f"Perfil Cluster {cluster_id}", color
+        )
+
+    return [
+        _exportar_figura(fig, os.path.join(directorio, nombre), formato)
+        for nombre, fig in figuras.items()
+    ]
+
+
+# ==================== CÁLCULO EN UNA PASADA ====================
+
+@medir
+def calcular_resultados(df):
+    """
+    Calcula todos los resultados del reporte en una sola pasada.
+
+    Args:
+        df (pd.DataFrame): DataFrame AIRA en formato largo
+
+    Returns:
+        dict: Datos enriquecidos, distribuciones, tablas de sección y clustering
+    """
+    df_enriquecido = enriquecer_dataframe(df)
+    distribuciones = calcular_distribuciones_por_variable(df_enriquecido)
+
+    secciones = {}
+    for seccion_key, seccion_info in SECCIONES.items():
+        numero_seccion = int(seccion_key.split('_')[1])
+        df_seccion = df_enriquecido[df_enriquecido['Measure_code'].isin(seccion_info['variables'])]
+
+        distribucion_seccion = (
+            distribuciones[distribuciones['Measure_code'].isin(seccion_info['variables'])]
+            .groupby('Respuesta', observed=True)['Cantidad'].sum()
+            .reset_index()
+        )
+
+        secciones[seccion_key] = {
+            'pivot': crear_tabla_pivotada_seccion(df, numero_seccion),
+            'distribucion': distribucion_seccion,
+            'n_respuestas': len(df_seccion)
+        }
+
+    _, _, df_filled = preparar_datos_ml(df)
+
+    return {
+        'df_enriquecido': df_enriquecido,
+        'distribuciones': distribuciones,
+        'secciones': secciones,
+        'clustering': ejecutar_analisis_clustering(df_filled)
+    }
+
+
+def _escribir_tablas(resultados, directorio):
+    """
+    Escribe todas las tablas del reporte en formato CSV.
+
+    Returns:
+        list: Rutas de los archivos generados
+    """
+    clustering = resultados['clustering']
+    barrido = clustering['barrido']
+
+    distribuciones = resultados['distribuciones'].copy()
+    distribuciones.insert(1, 'Variable_Titulo', distribuciones['Measure_code'].map(AIRA_TITULOS))
+
+    tablas = {
+        'distribuciones_variables': distribuciones,
+        'clustering_resultados': clustering['df_resultado'],
+        'scores_por_area': clustering['df_scores'].rename_axis('COUNTRY_REGION').reset_index(),
+        'barrido_k': pd.DataFrame({
+            'K': list(barrido['k_range']),
+            'Inercia': barrido['inertias'],
+            'Silueta': barrido['silhouette_scores']
+        }),
+        'perfiles_clusters': pd.DataFrame([
+            {
+                'Cluster': perfil['cluster_id'],
+                'Tipología': clustering['tipologias'][perfil['cluster_id']][1],
+                'N° Países': perfil['n_paises'],
+                'Score General': perfil['score_general'],
+                **perfil['scores'],
+                'Países': ', '.join(perfil['paises'])
+            }
+            for perfil in clustering['perfiles']
+        ])
+    }
+
+    for seccion_key, seccion in resultados['secciones'].items():
+        tablas[f"{seccion_key}_resumen"] = seccion['pivot']
+
+    rutas = []
+    for nombre, tabla in tablas.items():
+        ruta = os.path.join(directorio, f"{nombre}.csv")
+        tabla.to_csv(ruta, index=False)
+        rutas.append(ruta)
+
+    return rutas
+
+
+# ==================== GENERACIÓN DEL REPORTE ====================
+
+@medir
+def generar_reporte(directorio_salida, procesos=None, formato='html', tema='light'):
+    """
+    Genera el reporte completo: tablas CSV y figuras de cada variable,
+    sección y del análisis de clustering.
+
+    Args:
+        directorio_salida (str): Directorio donde se escribe el reporte
+        procesos (int, optional): Número de procesos del pool (por defecto, núcleos disponibles)
+        formato (str): Formato de las figuras ('html', 'png', 'svg' o 'pdf')
+        tema (str): Tema de los gráficos ('light' o 'dark')
+
+    Returns:
+        dict: Rutas generadas ('tablas' y 'figuras')
+    """
+    directorios = {
+        'tablas': os.path.join(directorio_salida, 'tablas'),
+        'variables': os.path.join(directorio_salida, 'figuras', 'variables'),
+        'secciones': os.path.join(directorio_salida, 'figuras', 'secciones'),
+        'clustering': os.path.join(directorio_salida, 'figuras', 'clustering')
+    }
+    for ruta in directorios.values():
+        os.makedirs(ruta, exist_ok=True)
+
+    instalar_metadatos()
+    df = cargar_datos()
+    resultados = calcular_resultados(df)
+
+    rutas_tablas = _escribir_tablas(resultados, directorios['tablas'])
+
+    # Dividir datos una sola vez por variable para repartirlos entre procesos
+    datos_por_variable = dict(tuple(resultados['df_enriquecido'].groupby('Measure_code')))
+    distribuciones_por_variable = dict(tuple(resultados['distribuciones'].groupby('Measure_code')))
+
+    rutas_figuras = []
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso,
+                             initargs=(tema,)) as pool:
+        futuros = [
+            pool.submit(_tarea_variable, variable, df_variable,
+                        distribuciones_por_variable[variable], directorios['variables'], formato)
+            for variable, df_variable in datos_por_variable.items()
+            if variable in distribuciones_por_variable
+        ]
+
+        futuros += [
+            pool.submit(_tarea_seccion, seccion_key, seccion['pivot'], seccion['distribucion'],
+                        directorios['secciones'], formato)
+            for seccion_key, seccion in resultados['secciones'].items()
+            if not seccion['pivot'].empty
+        ]
+
+        futuros.append(pool.submit(
+            _tarea_clustering,
+            {clave: resultados['clustering'][clave]
+             for clave in ['barrido', 'pca', 'clusters', 'perfiles', 'tipologias']},
+            directorios['clustering'], formato
+        ))
+
+        for futuro in as_completed(futuros):
+            rutas_figuras.extend(futuro.result())
+
+    return {'tablas': rutas_tablas, 'figuras': sorted(rutas_figuras)}
+
+
+def main(argv=None):
+    """
+    Punto de entrada de la línea de comandos.
+    """
+    parser = argparse.ArgumentParser(
+        description="Genera el reporte AIRA (tablas y figuras) sin interfaz de Streamlit."
+    )
+    parser.add_argument('--salida', default='reporte_aira',
+                        help="Directorio de salida (por defecto: reporte_aira)")
+    parser.add_argument('--procesos', type=int, default=None,
+                        help="Número de procesos en paralelo (por defecto: todos los núcleos)")
+    parser.add_argument('--formato', choices=FORMATOS_FIGURA, default='html',
+                        help="Formato de las figuras; png/svg/pdf requieren kaleido")
+    parser.add_argument('--tema', choices=['claro', 'oscuro'], default='claro',
+                        help="Tema de los gráficos (por defecto: claro)")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    rutas = generar_reporte(
+        args.salida,
+        procesos=args.procesos,
+        formato=args.formato,
+        tema='light' if args.tema == 'claro' else 'dark'
+    )
+    duracion = time.perf_counter() - inicio
+
+    print(f"✅ Reporte generado en '{args.salida}' en {duracion:.1f} s: "
+          f"{len(rutas['tablas'])} tablas y {len(rutas['figuras'])} figuras")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Simulador de Escenarios para AIRA
+=================================
+Responde a preguntas del tipo "si el país X pasa AIRA_8..AIRA_12 de NO a YES,
+¿en qué cluster y con qué tipología quedaría?".
+
+- Los cambios se aplican sobre una vista copy-on-write del cubo de
+  respuestas: el cubo base nunca se modifica y solo se copian las filas
+  de los países afectados.
+- Solo se recalculan, con calcular_scores_por_area(), las áreas que
+  contienen alguna variable cambiada; el resto de scores se reutiliza.
+- El nuevo cluster es el centroide más cercano del modelo K-means
+  cacheado (KMeans.predict), sin reajustar nada.
+- Las medianas de imputación son las de los datos base, de modo que un
+  escenario no desplaza a los demás países.
+
+Todo el cálculo es vectorial: un lote con cientos de escenarios se
+resuelve con una sola codificación, un cálculo de scores y una predicción.
+
+Uso:
+    estado = crear_estado_simulacion(df)
+    cambios = crear_cambios('ESP', [f'AIRA_{i}' for i in range(8, 13)], 'YES', desde='NO')
+    resultado = simular(estado, cambios)
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import AIRA_GRUPOS, COUNTRY_NAMES, CODIGOS_RESPUESTA
+from cubo import construir_cubo, codificar_respuestas, codificar_ml, SIN_RESPUESTA
+from clustering import calcular_barrido_k, aplicar_clustering, obtener_tipologia_perfil
+from clustering_minibatch import calcular_medianas
+from utils import preparar_datos_ml, calcular_scores_por_area, preparar_perfiles_clusters
+from instrumentacion import medir
+from entorno import cache_recurso
+
+
+# Columnas de una tabla de cambios (mismo formato largo que cargar_datos(), más el escenario)
+COLUMNAS_CAMBIOS = ['Escenario', 'COUNTRY_REGION', 'Measure_code', 'AIRA_SIMPLE']
+
+# Columnas fijas del resultado de simular() (les siguen los scores por área y el delta)
+COLUMNAS_RESULTADO = ['Escenario', 'COUNTRY_REGION', 'Pais', 'Cambios', 'Cluster_Actual', 'Cluster_Simulado',
+                      'Cambia_Cluster', 'Tipologia_Actual', 'Tipologia_Simulada']
+
+# cargar_datos() lee 'N/A' como valor ausente (NaN, imputado con la mediana), así que
+# el cubo nunca contiene ese código: en los cambios 'N/A' se trata igual, como "sin respuesta".
+# Estas son las respuestas que tiene sentido ofrecer en la página
+RESPUESTAS_SIMULABLES = [codigo for codigo in CODIGOS_RESPUESTA if codigo != 'N/A']
+
+# Área de cada variable
+AREA_POR_VARIABLE = {variable: area for area, variables in AIRA_GRUPOS.items() for variable in variables}
+
+
+# ==================== ESTADO BASE ====================
+
+@medir
+@cache_recurso
+def crear_estado_simulacion(df, k=None):
+    """
+    Prepara el estado base del simulador: cubo, medianas de imputación,
+    scores, modelo K-means y tipologías de cada cluster.
+
+    Args:
+        df (pd.DataFrame): DataFrame original en formato largo
+        k (int, optional): Número de clusters. Si es None se usa el K óptimo
+
+    Returns:
+        dict: Estado del simulador (se comparte entre sesiones; no debe modificarse)
+    """
+    cubo = construir_cubo(df)
+    _, _, df_filled = preparar_datos_ml(df)
+
+    k = k or calcular_barrido_k(df_filled)['k_optimo']
+    clusters, df_clusters, modelo = aplicar_clustering(df_filled, k)
+
+    df_scores = calcular_scores_por_area(df_filled)
+    perfiles = preparar_perfiles_clusters(df_clusters, df_scores)
+
+    return {
+        'cubo': cubo,
+        'medianas': calcular_medianas(cubo['codigos']),
+        'df_scores': df_scores,
+        'clusters': np.asarray(clusters),
+        'modelo': modelo,
+        'k': k,
+        'tipologias': {p['cluster_id']: obtener_tipologia_perfil(p) for p in perfiles}
+    }
+
+
+# ==================== CAMBIOS ====================
+
+def crear_cambios(paises, variables, respuesta, desde=None, estado=None, escenario=None):
+    """
+    Construye una tabla de cambios: todas las variables indicadas pasan a
+    'respuesta' en todos los países indicados.
+
+    Args:
+        paises (str | list): Código ISO o lista de códigos
+        variables (list): Códigos AIRA a cambiar
+        respuesta (str): Nuevo código de respuesta (ej: 'YES')
+        desde (str, optional): Si se indica, solo cambian las celdas cuya respuesta
+                               actual es esta (requiere 'estado'); 'N/A' = sin respuesta
+        estado (dict, optional): Estado de crear_estado_simulacion()
+        escenario (str, optional): Nombre del escenario (por defecto, el código del país)
+
+    Returns:
+        pd.DataFrame: Tabla con las columnas de COLUMNAS_CAMBIOS
+
+    Raises:
+        ValueError: Si 'desde' no es un código de respuesta o falta el estado
+    """
+    if desde is not None and desde not in CODIGOS_RESPUESTA:
+        raise ValueError(
+            f"Respuesta actual ('desde') desconocida: {desde}. Opciones: {', '.join(CODIGOS_RESPUESTA)}"
+        )
+
+    paises = [paises] if isinstance(paises, str) else list(paises)
+    cambios = pd.DataFrame({
+        'COUNTRY_REGION': np.repeat(paises, len(variables)),
+        'Measure_code': np.tile(list(variables), len(paises)),
+        'AIRA_SIMPLE': respuesta
+    })
+
+    if desde is not None:
+        if estado is None:
+            raise ValueError("Para filtrar por la respuesta actual ('desde') hace falta el estado del simulador")
+        filas, columnas = _indices(estado['cubo'], cambios)
+        actuales = estado['cubo']['codigos'][filas, columnas]
+        codigo_desde = SIN_RESPUESTA if desde == 'N/A' else CODIGOS_RESPUESTA.index(desde)
+        cambios = cambios[actuales == codigo_desde]
+
+    cambios.insert(0, 'Escenario', escenario if escenario is not None else cambios['COUNTRY_REGION'])
+    return cambios.reset_index(drop=True)
+
+
+def _indices(cubo, cambios):
+    """
+    Posiciones (fila, columna) del cubo de cada cambio.
+
+    Raises:
+        ValueError: Si algún país o variable no está en el cubo
+    """
+    filas = cambios['COUNTRY_REGION'].map(cubo['indice_paises'])
+    columnas = cambios['Measure_code'].map(cubo['indice_variables'])
+
+    desconocidos = sorted(set(cambios['COUNTRY_REGION'][filas.isna()]) |
+                          set(cambios['Measure_code'][columnas.isna()]))
+    if desconocidos:
+        raise ValueError(f"Países o variables desconocidos en los cambios: {', '.join(desconocidos[:10])}")
+
+    return filas.to_numpy(dtype=np.int64), columnas.to_numpy(dtype=np.int64)
+
+
+# ==================== SIMULACIÓN ====================
+
+@medir
+def simular(estado, cambios):
+    """
+    Simula uno o varios escenarios de cambios de respuestas.
+
+    Cada escenario parte de los datos base; dentro de un escenario, si una
+    celda se cambia varias veces prevalece el último cambio.
+
+    Args:
+        estado (dict): Estado de crear_estado_simulacion()
+        cambios (pd.DataFrame): Tabla con 'COUNTRY_REGION', 'Measure_code', 'AIRA_SIMPLE'
+                                y opcionalmente 'Escenario' (por defecto, el país)
+
+    Returns:
+        pd.DataFrame: Una fila por (escenario, país) con el cluster y la tipología
+                      actuales y simulados, los scores simulados y 'Delta_Score_General'
+                      (vacío, con esas columnas, si no hay cambios)
+
+    Raises:
+        ValueError: Si hay países, variables o respuestas desconocidos
+    """
+    cubo = estado['cubo']
+    if cambios.empty:
+        # Sin cambios (p. ej. ninguna celda coincide con 'desde') no hay nada que predecir
+        columnas_areas = [area for area in AIRA_GRUPOS if area in estado['df_scores'].columns]
+        return pd.DataFrame(columns=COLUMNAS_RESULTADO + columnas_areas +
+                            ['Score_General', 'Delta_Score_General'])
+
+    if 'Escenario' not in cambios.columns:
+        cambios = cambios.assign(Escenario=cambios['COUNTRY_REGION'])
+
+    filas, columnas = _indices(cubo, cambios)
+    respuestas = cambios['AIRA_SIMPLE'].to_numpy(dtype=object)
+    invalidas = sorted({r for r in respuestas if r not in CODIGOS_RESPUESTA and not pd.isna(r)})
+    if invalidas:
+        raise ValueError(f"Respuestas desconocidas en los cambios: {', '.join(map(str, invalidas))}")
+
+    # Igual que en cargar_datos(), 'N/A' es una respuesta ausente (se imputa con la mediana)
+    respuestas = np.where(respuestas == 'N/A', np.nan, respuestas)
+
+    # Una fila simulada por (escenario, país): copia de solo esas filas del cubo (copy-on-write)
+    claves = pd.MultiIndex.from_arrays([cambios['Escenario'], cambios['COUNTRY_REGION']])
+    posicion, unidades = pd.factorize(claves)
+    filas_base = np.empty(len(unidades), dtype=np.int64)
+    filas_base[posicion] = filas
+    codigos = cubo['codigos'][filas_base]
+    ultimos = ~pd.Series(posicion * codigos.shape[1] + columnas).duplicated(keep='last').to_numpy()
+    codigos[posicion[ultimos], columnas[ultimos]] = codificar_respuestas(respuestas[ultimos])
+
+    # Codificación e imputación con las medianas base
+    X = codificar_ml(codigos)
+    faltantes = np.isnan(X)
+    X[faltantes] = np.broadcast_to(estado['medianas'], X.shape)[faltantes]
+    df_simulado = pd.DataFrame(X, columns=cubo['variables'])
+
+    # Solo se recalculan las áreas que contienen alguna variable cambiada
+    df_scores = estado['df_scores'].iloc[filas_base].reset_index(drop=True)
+    areas = sorted({AREA_POR_VARIABLE[v] for v in cambios['Measure_code'].unique() if v in AREA_POR_VARIABLE})
+    if areas:
+        df_scores[areas] = calcular_scores_por_area(df_simulado, areas=areas)[areas].to_numpy()
+    columnas_areas = [area for area in AIRA_GRUPOS if area in df_scores.columns]
+    score_actual = df_scores['Score_General'].to_numpy()
+    df_scores['Score_General'] = df_scores[columnas_areas].mean(axis=1)
+
+    # Centroide más cercano del modelo cacheado (sin reajuste)
+    cluster_simulado = estado['modelo'].predict(df_simulado)
+    cluster_actual = estado['clusters'][filas_base]
+
+    resultado = pd.DataFrame({
+        'Escenario': unidades.get_level_values(0),
+        'COUNTRY_REGION': unidades.get_level_values(1),
+        'Pais': [COUNTRY_NAMES.get(p, p) for p in unidades.get_level_values(1)],
+        'Cambios': np.bincount(posicion, minlength=len(unidades)),
+        'Cluster_Actual': cluster_actual,
+        'Cluster_Simulado': cluster_simulado,
+        'Cambia_Cluster': cluster_actual != cluster_simulado,
+        'Tipologia_Actual': [estado['tipologias'][c][1] for c in cluster_actual],
+        'Tipologia_Simulada': [estado['tipologias'][c][1] for c in cluster_simulado]
+    })
+    resultado[columnas_areas + ['Score_General']] = df_scores[columnas_areas + ['Score_General']].to_numpy()
+    resultado['Delta_Score_General'] = resultado['Score_General'] - score_actual
+    return resultado
@@ -7,32 +7,39 @@ procesamiento, transformaciones y cálculos utilizados en toda la aplicación.
 
 import pandas as pd
 import numpy as np
-import streamlit as st
 from config import (
     DATA_PATH, COUNTRY_NAMES, RESPONSE_LABELS, VALUE_MAPPING,
-    AIRA_TITULOS, SECCIONES, AIRA_GRUPOS
+    AIRA_TITULOS, SECCIONES, AIRA_GRUPOS, AIRA_PESOS, ML_ENCODING, PATRON_VARIABLE
 )
+from instrumentacion import medir
+from entorno import cache_datos, reportar_error, reportar_aviso
 
 
 # ==================== CARGA DE DATOS ====================
 
-@st.cache_data
+@medir
+@cache_datos
 def cargar_datos():
     """
-    Carga el dataset AIRA desde el archivo CSV.
+    Carga el dataset AIRA desde el archivo CSV y lo valida con depurar_datos().
     
     Returns:
         pd.DataFrame: DataFrame con los datos AIRA
     """
     try:
         df = pd.read_csv(DATA_PATH)
-        return df
     except FileNotFoundError:
-        st.error(f"❌ No se encontró el archivo de datos en: {DATA_PATH}")
-        st.stop()
+        reportar_error(f"No se encontró el archivo de datos en: {DATA_PATH}")
     except Exception as e:
-        st.error(f"❌ Error al cargar los datos: {str(e)}")
-        st.stop()
+        reportar_error(f"Error al cargar los datos: {str(e)}")
+
+    # Validar antes de que los códigos erróneos lleguen al pivot o a COUNTRY_NAMES
+    df, informe = depurar_datos(df)
+    if informe['errores']:
+        reportar_error("Datos AIRA no válidos: " + " ".join(informe['errores']))
+    for aviso in informe['avisos']:
+        reportar_aviso(aviso)
+    return df
 
 
 # ==================== ENRIQUECIMIENTO DE DATOS ====================
@@ -102,7 +109,8 @@ def filtrar_por_seccion(df, numero_seccion):
 
 # ==================== TRANSFORMACIONES PARA ML ====================
 
-@st.cache_data
+@medir
+@cache_datos
 def preparar_datos_ml(df):
     """
     Prepara los datos para análisis de Machine Learning (clustering).
@@ -124,17 +132,8 @@ def preparar_datos_ml(df):
         values='AIRA_SIMPLE'
     )
     
-    # Mapeo de codificación para ML
-    encoding_map = {
-        'YES': 2,  # Completamente implementado
-        'UD': 1,   # En desarrollo / No sabe
-        'NO': 0,   # No implementado
-        'DNK': 1,  # No sabe -> tratado como "en desarrollo"
-        'N/A': 0   # No aplicable -> tratado como "no"
-    }
-    
-    # Aplicar codificación
-    df_encoded = df_pivot.replace(encoding_map)
+    # Aplicar codificación para ML (ver ML_ENCODING en config.py)
+    df_encoded = df_pivot.replace(ML_ENCODING)
     
     # Convertir a numérico, forzando valores no reconocidos a NaN
     df_encoded = df_encoded.apply(pd.to_numeric, errors='coerce')
@@ -149,9 +148,9 @@ def preparar_datos_ml(df):
             
             # Si la mediana es NaN (columna completamente vacía), usar 0
             if pd.isna(mediana):
-                df_filled[col].fillna(0, inplace=True)
+                df_filled[col] = df_filled[col].fillna(0)
             else:
-                df_filled[col].fillna(mediana, inplace=True)
+                df_filled[col] = df_filled[col].fillna(mediana)
     
     # Verificación final: asegurarse de que no queden NaN
     # Si aún hay NaN, rellenar con 0
@@ -165,6 +164,10 @@ def preparar_datos_ml(df):
 
 # ==================== ANÁLISIS ESTADÍSTICO ====================
 
+# Orden lógico de las respuestas en tablas y gráficos
+ORDEN_RESPUESTAS = ['Sí', 'En desarrollo', 'No', 'No sabe', 'No aplicable']
+
+
 def calcular_distribucion_respuestas(df_filtrado):
     """
     Calcula la distribución de respuestas para un conjunto de datos filtrado.
@@ -179,10 +182,9 @@ def calcular_distribucion_respuestas(df_filtrado):
     distribucion.columns = ['Respuesta', 'Cantidad']
     
     # Ordenar según un orden lógico
-    orden = ['Sí', 'En desarrollo', 'No', 'No sabe', 'No aplicable']
     distribucion['Respuesta'] = pd.Categorical(
         distribucion['Respuesta'], 
-        categories=orden, 
+        categories=ORDEN_RESPUESTAS, 
         ordered=True
     )
     distribucion = distribucion.sort_values('Respuesta')
@@ -190,6 +192,36 @@ def calcular_distribucion_respuestas(df_filtrado):
     return distribucion
 
 
+def calcular_distribuciones_por_variable(df_enriquecido):
+    """
+    Calcula la distribución de respuestas de todas las variables en una sola pasada.
+    
+    Args:
+        df_enriquecido (pd.DataFrame): DataFrame completo enriquecido (columna 'Respuesta')
+        
+    Returns:
+        pd.DataFrame: Columnas 'Measure_code', 'Respuesta', 'Cantidad' y 'Porcentaje',
+                      ordenadas por variable y respuesta
+    """
+    distribuciones = (
+        df_enriquecido.groupby(['Measure_code', 'Respuesta'])
+        .size()
+        .reset_index(name='Cantidad')
+    )
+    
+    # Porcentaje sobre el total de respuestas válidas de cada variable
+    totales = distribuciones.groupby('Measure_code')['Cantidad'].transform('sum')
+    distribuciones['Porcentaje'] = (distribuciones['Cantidad'] / totales * 100).round(2)
+    
+    distribuciones['Respuesta'] = pd.Categorical(
+        distribuciones['Respuesta'],
+        categories=ORDEN_RESPUESTAS,
+        ordered=True
+    )
+    
+    return distribuciones.sort_values(['Measure_code', 'Respuesta']).reset_index(drop=True)
+
+
 def obtener_paises_por_respuesta(df_filtrado, respuesta):
     """
     Obtiene la lista de países que dieron una respuesta específica.
@@ -205,12 +237,14 @@ def obtener_paises_por_respuesta(df_filtrado, respuesta):
     return sorted(paises)
 
 
-def calcular_scores_por_area(df_filled):
+def calcular_scores_por_area(df_filled, areas=None):
     """
     Calcula scores (0-100) por área temática para cada país.
     
     Args:
         df_filled (pd.DataFrame): DataFrame con datos codificados y sin valores faltantes
+        areas (list, optional): Áreas de AIRA_GRUPOS a calcular. Por defecto todas; con un
+                                subconjunto no se añade 'Score_General', que depende de todas
         
     Returns:
         pd.DataFrame: DataFrame con scores por área para cada país
@@ -218,20 +252,26 @@ def calcular_scores_por_area(df_filled):
     scores_dict = {}
     
     for area, variables in AIRA_GRUPOS.items():
+        if areas is not None and area not in areas:
+            continue
+        
         # Filtrar solo las variables que existen en el DataFrame
         vars_existentes = [v for v in variables if v in df_filled.columns]
         
         if vars_existentes:
-            # Calcular promedio de las variables del área
-            scores_dict[area] = df_filled[vars_existentes].mean(axis=1)
+            # Media de las variables del área, ponderada con los pesos del libro de
+            # metadatos (AIRA_PESOS; sin libro todos valen 1.0 y es la media simple)
+            pesos = pd.Series([AIRA_PESOS.get(v, 1.0) for v in vars_existentes], index=vars_existentes)
+            scores_dict[area] = df_filled[vars_existentes].mul(pesos, axis=1).sum(axis=1) / pesos.sum()
     
     df_scores = pd.DataFrame(scores_dict)
     
     # Convertir a escala 0-100 (ya que los valores están en 0-2)
     df_scores = (df_scores / 2) * 100
     
-    # Agregar score general
-    df_scores['Score_General'] = df_scores.mean(axis=1)
+    # Agregar score general (solo si se han calculado todas las áreas)
+    if areas is None:
+        df_scores['Score_General'] = df_scores.mean(axis=1)
     
     # Agregar nombre de país
     df_scores['Pais'] = df_scores.index.map(COUNTRY_NAMES)
@@ -241,6 +281,7 @@ def calcular_scores_por_area(df_filled):
 
 # ==================== CREACIÓN DE TABLAS PIVOTADAS ====================
 
+@medir
 def crear_tabla_pivotada_seccion(df, numero_seccion):
     """
     Crea una tabla pivotada para una sección específica.
@@ -411,6 +452,9 @@ def obtener_color_respuesta(respuesta):
 
 # ==================== VALIDACIONES ====================
 
+COLUMNAS_REQUERIDAS = ['Measure_code', 'AIRA_SIMPLE', 'COUNTRY_REGION']
+
+
 def validar_dataframe(df):
     """
     Valida que el DataFrame tenga las columnas necesarias.
@@ -421,8 +465,158 @@ def validar_dataframe(df):
     Returns:
         bool: True si es válido, False en caso contrario
     """
-    columnas_requeridas = ['Measure_code', 'AIRA_SIMPLE', 'COUNTRY_REGION']
-    return all(col in df.columns for col in columnas_requeridas)
+    return all(col in df.columns for col in COLUMNAS_REQUERIDAS)
+
+
+# Número máximo de valores inválidos de ejemplo en el informe de validación
+MAX_EJEMPLOS_VALIDACION = 10
+
+
+def _mascaras_validacion(df):
+    """
+    Calcula, con operaciones vectorizadas, las máscaras de filas válidas
+    por país, variable y respuesta, y la de pares (país, variable) repetidos.
+
+    Países y variables se factorizan una sola vez: las comprobaciones se hacen
+    sobre los valores únicos y los duplicados se buscan sobre un entero por par.
+    """
+    codigos_pais, paises = pd.factorize(df['COUNTRY_REGION'])
+    codigos_variable, variables = pd.factorize(df['Measure_code'])
+    codigos_respuesta, respuestas = pd.factorize(df['AIRA_SIMPLE'])
+
+    pais_valido = np.append(paises.isin(list(COUNTRY_NAMES)), False)
+    variable_valida = np.append(
+        pd.Series(variables, dtype='string').str.fullmatch(PATRON_VARIABLE).fillna(False).to_numpy(dtype=bool),
+        False
+    )
+    # Las respuestas vacías son válidas (sin respuesta)
+    respuesta_valida = np.append(respuestas.isin(list(RESPONSE_LABELS)), True)
+
+    # Los valores vacíos se factorizan como -1, que indexa el último elemento
+    par = codigos_pais.astype(np.int64) * (len(variables) + 1) + codigos_variable
+    return {
+        'pais': pais_valido[codigos_pais],
+        'variable': variable_valida[codigos_variable],
+        'respuesta': respuesta_valida[codigos_respuesta],
+        'duplicado': pd.Series(par).duplicated().to_numpy()
+    }
+
+
+def _ejemplos_invalidos(serie, validos):
+    """
+    Cuenta los valores inválidos más frecuentes de una columna.
+    """
+    conteos = serie[~validos].fillna('<vacío>').astype(str).value_counts()
+    return {valor: int(cantidad) for valor, cantidad in conteos.head(MAX_EJEMPLOS_VALIDACION).items()}
+
+
+def _informe_validacion(df, mascaras):
+    """
+    Construye el informe estructurado de validación a partir de las máscaras.
+    """
+    informe = {
+        'n_filas': len(df),
+        'columnas_faltantes': [],
+        'paises_desconocidos': _ejemplos_invalidos(df['COUNTRY_REGION'], mascaras['pais']),
+        'variables_invalidas': _ejemplos_invalidos(df['Measure_code'], mascaras['variable']),
+        'respuestas_invalidas': _ejemplos_invalidos(df['AIRA_SIMPLE'], mascaras['respuesta']),
+        'n_paises_desconocidos': int((~mascaras['pais']).sum()),
+        'n_variables_invalidas': int((~mascaras['variable']).sum()),
+        'n_respuestas_invalidas': int((~mascaras['respuesta']).sum()),
+        'n_duplicados': int(mascaras['duplicado'].sum()),
+        'ejemplos_duplicados': df[['COUNTRY_REGION', 'Measure_code']]
+                                 .iloc[np.flatnonzero(mascaras['duplicado'])[:MAX_EJEMPLOS_VALIDACION]]
+                                 .to_records(index=False).tolist(),
+        'errores': [],
+        'avisos': []
+    }
+
+    if informe['n_paises_desconocidos']:
+        informe['avisos'].append(
+            f"{informe['n_paises_desconocidos']} filas con países desconocidos se descartan: "
+            f"{', '.join(informe['paises_desconocidos'])}"
+        )
+    if informe['n_variables_invalidas']:
+        informe['avisos'].append(
+            f"{informe['n_variables_invalidas']} filas con códigos de variable inválidos se descartan: "
+            f"{', '.join(informe['variables_invalidas'])}"
+        )
+    if informe['n_respuestas_invalidas']:
+        informe['avisos'].append(
+            f"{informe['n_respuestas_invalidas']} respuestas desconocidas se tratan como sin respuesta: "
+            f"{', '.join(informe['respuestas_invalidas'])}"
+        )
+    if informe['n_duplicados']:
+        ejemplos = ', '.join(f"{pais}/{variable}" for pais, variable in informe['ejemplos_duplicados'])
+        informe['avisos'].append(
+            f"{informe['n_duplicados']} filas repiten un par (país, variable); se conserva la primera: {ejemplos}"
+        )
+    return informe
+
+
+@medir
+def validar_datos(df):
+    """
+    Valida el esquema y los valores del dataset AIRA en formato largo.
+
+    Comprueba las columnas requeridas, que los países estén en COUNTRY_NAMES,
+    que las variables tengan la forma AIRA_<n>, que las respuestas estén en
+    RESPONSE_LABELS (o vacías) y que no haya pares (país, variable) repetidos,
+    que harían fallar el pivot de preparar_datos_ml().
+
+    Args:
+        df (pd.DataFrame): DataFrame AIRA
+
+    Returns:
+        dict: Informe con conteos y ejemplos de cada problema, 'errores' (fatales)
+              y 'avisos' (se pueden corregir descartando o vaciando filas)
+    """
+    faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in df.columns]
+    if faltantes:
+        return {
+            'n_filas': len(df),
+            'columnas_faltantes': faltantes,
+            'errores': [f"Faltan las columnas {faltantes}."],
+            'avisos': []
+        }
+
+    informe = _informe_validacion(df, _mascaras_validacion(df))
+    if informe['n_filas'] == 0:
+        informe['errores'].append("El archivo no contiene filas.")
+    return informe
+
+
+@medir
+def depurar_datos(df):
+    """
+    Valida el dataset y corrige los problemas no fatales: descarta filas con país
+    o variable inválidos y pares repetidos, y vacía las respuestas desconocidas.
+
+    Args:
+        df (pd.DataFrame): DataFrame AIRA
+
+    Returns:
+        tuple: (DataFrame depurado, informe de validación). Si hay errores fatales
+               se devuelve el DataFrame sin modificar
+    """
+    faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in df.columns]
+    if faltantes:
+        return df, validar_datos(df)
+
+    mascaras = _mascaras_validacion(df)
+    informe = _informe_validacion(df, mascaras)
+
+    conservar = mascaras['pais'] & mascaras['variable'] & ~mascaras['duplicado']
+    if not conservar.all():
+        df = df[conservar].reset_index(drop=True)
+        mascaras['respuesta'] = mascaras['respuesta'][conservar]
+    if not mascaras['respuesta'].all():
+        df = df.copy()
+        df.loc[~mascaras['respuesta'], 'AIRA_SIMPLE'] = np.nan
+
+    if len(df) == 0:
+        informe['errores'].append("No queda ninguna fila válida.")
+    return df, informe
 
 
 def obtener_info_dataset(df):
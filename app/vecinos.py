@@ -0,0 +1,194 @@
+"""
+Países Similares (Vecinos Más Cercanos) para AIRA
+=================================================
+Índice k-NN sobre df_filled para responder "¿qué países se parecen más a X?".
+
+El índice se construye una sola vez: guarda la matriz de distancias
+euclídeas entre países y, para cada país, el resto de países ordenados
+de más a menos similar. Una consulta es un corte de esa fila ordenada,
+sin recorrer todos los países.
+
+Cuando cambian las respuestas de algunos países, actualizar_vecinos()
+recalcula solo sus filas y columnas de distancias y recoloca cada país
+cambiado en las listas ordenadas de los demás (inserción por conteo, sin
+volver a ordenar las filas).
+
+Uso:
+    indice = construir_indice_vecinos(df_filled)
+    tabla_vecinos(indice, 'ESP', n=5)
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import pairwise_distances
+
+from config import COUNTRY_NAMES
+from instrumentacion import medir
+from entorno import cache_recurso
+
+
+N_VECINOS = 5
+
+
+# ==================== CONSTRUCCIÓN DEL ÍNDICE ====================
+
+def _ordenar_filas(distancias, filas):
+    """
+    Para cada fila indicada, el resto de países ordenados por (distancia, posición).
+    """
+    n = distancias.shape[0]
+    orden = np.argsort(distancias[filas], axis=1, kind='stable')
+    # Quitar el propio país de su lista (aunque otro país esté a distancia 0)
+    sin_si_mismo = orden != np.asarray(filas)[:, None]
+    return orden[sin_si_mismo].reshape(len(filas), n - 1)
+
+
+@medir
+@cache_recurso
+def construir_indice_vecinos(df_filled):
+    """
+    Construye el índice de vecinos más cercanos.
+
+    Args:
+        df_filled (pd.DataFrame): Datos codificados sin valores faltantes (países x variables)
+
+    Returns:
+        dict: Índice con 'paises', 'posiciones' (código -> fila), 'X', 'distancias'
+              y 'orden' (fila i: resto de países de más a menos similar).
+              Con Streamlit se comparte entre sesiones: para actualizarlo, usar una copia
+    """
+    X = df_filled.to_numpy(dtype=float)
+    distancias = pairwise_distances(X)
+    paises = list(df_filled.index)
+
+    return {
+        'paises': paises,
+        'posiciones': {pais: i for i, pais in enumerate(paises)},
+        'variables': list(df_filled.columns),
+        'X': X,
+        'distancias': distancias,
+        'orden': _ordenar_filas(distancias, np.arange(len(paises)))
+    }
+
+
+def copiar_indice(indice):
+    """
+    Copia independiente del índice, para actualizarlo sin afectar a la versión cacheada.
+    """
+    return {clave: (valor.copy() if hasattr(valor, 'copy') else valor) for clave, valor in indice.items()}
+
+
+# ==================== CONSULTAS ====================
+
+def vecinos_mas_cercanos(indice, pais, n=N_VECINOS):
+    """
+    Devuelve los n países más similares a uno dado.
+
+    Args:
+        indice (dict): Índice de construir_indice_vecinos()
+        pais (str): Código ISO del país
+        n (int): Número de vecinos
+
+    Returns:
+        tuple: (posiciones, distancias) de los vecinos, de más a menos similar
+
+    Raises:
+        KeyError: Si el país no está en el índice
+    """
+    fila = indice['posiciones'][pais]
+    vecinos = indice['orden'][fila, :n]
+    return vecinos, indice['distancias'][fila, vecinos]
+
+
+def tabla_vecinos(indice, pais, n=N_VECINOS):
+    """
+    Tabla de los n países más similares, con la proporción de respuestas idénticas.
+
+    Args:
+        indice (dict): Índice de construir_indice_vecinos()
+        pais (str): Código ISO del país
+        n (int): Número de vecinos
+
+    Returns:
+        pd.DataFrame: Columnas 'COUNTRY_REGION', 'Pais', 'Distancia' y 'Coincidencia' (0-1)
+    """
+    vecinos, distancias = vecinos_mas_cercanos(indice, pais, n)
+    fila = indice['posiciones'][pais]
+    codigos = [indice['paises'][i] for i in vecinos]
+
+    return pd.DataFrame({
+        'COUNTRY_REGION': codigos,
+        'Pais': [COUNTRY_NAMES.get(c, c) for c in codigos],
+        'Distancia': distancias,
+        'Coincidencia': (indice['X'][vecinos] == indice['X'][fila]).mean(axis=1)
+    })
+
+
+# ==================== ACTUALIZACIÓN INCREMENTAL ====================
+
+@medir
+def actualizar_vecinos(indice, df_filas):
+    """
+    Actualiza en el sitio el índice con los nuevos datos de algunos países.
+
+    Solo se recalculan las distancias de los países cambiados (O(m·n·d)) y sus
+    filas ordenadas; en las filas de los demás países, cada país cambiado se
+    retira y se reinserta en su nueva posición contando cuántos vecinos quedan
+    por delante, sin volver a ordenar.
+
+    Args:
+        indice (dict): Índice de construir_indice_vecinos() (o de copiar_indice())
+        df_filas (pd.DataFrame): Nuevos datos codificados e imputados de los países
+                                 cambiados (mismas columnas que df_filled)
+
+    Returns:
+        dict: El mismo índice, actualizado
+
+    Raises:
+        KeyError: Si algún país no está en el índice
+    """
+    cambiadas = np.array([indice['posiciones'][p] for p in df_filas.index], dtype=np.int64)
+    if not len(cambiadas):
+        return indice
+
+    X = indice['X']
+    distancias = indice['distancias']
+    X[cambiadas] = df_filas[indice['variables']].to_numpy(dtype=float)
+
+    nuevas = pairwise_distances(X[cambiadas], X)
+    distancias[cambiadas] = nuevas
+    distancias[:, cambiadas] = nuevas.T
+    distancias[cambiadas, cambiadas] = 0.0
+
+    # Filas de los países cambiados: se ordenan de nuevo (m filas)
+    orden = indice['orden']
+    orden[cambiadas] = _ordenar_filas(distancias, cambiadas)
+
+    # Resto de filas: retirar los países cambiados e insertarlos de nuevo en su sitio,
+    # con el mismo desempate que el orden inicial (distancia, posición)
+    resto = np.setdiff1d(np.arange(len(X)), cambiadas)
+    if len(resto):
+        filas = orden[resto]
+        base = filas[~np.isin(filas, cambiadas)].reshape(len(resto), -1)
+        d_base = np.take_along_axis(distancias[resto], base, axis=1)
+
+        # Países cambiados ordenados dentro de cada fila
+        d_cambiadas = distancias[np.ix_(resto, cambiadas)]
+        orden_cambiadas = np.lexsort((np.broadcast_to(cambiadas, d_cambiadas.shape), d_cambiadas), axis=1)
+        insertar = cambiadas[orden_cambiadas]
+        d_insertar = np.take_along_axis(d_cambiadas, orden_cambiadas, axis=1)
+
+        # Posición final = puesto entre los cambiados + vecinos de la base que quedan por delante
+        por_delante = ((d_base[:, None, :] < d_insertar[:, :, None]) |
+                       ((d_base[:, None, :] == d_insertar[:, :, None]) &
+                        (base[:, None, :] < insertar[:, :, None]))).sum(axis=2)
+        posiciones = por_delante + np.arange(len(cambiadas))
+
+        nuevas_filas = np.empty_like(filas)
+        ocupadas = np.zeros(filas.shape, dtype=bool)
+        np.put_along_axis(nuevas_filas, posiciones, insertar, axis=1)
+        np.put_along_axis(ocupadas, posiciones, True, axis=1)
+        nuevas_filas[~ocupadas] = base.ravel()
+        orden[resto] = nuevas_filas
+
+    return indice
@@ -10,22 +10,29 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-import streamlit as st
-from config import COLOR_SCALE, COLOR_DISCRETE_MAP, PLOTLY_CONFIG, RESPONSE_LABELS
+from config import COLOR_SCALE, COLOR_DISCRETE_MAP, PLOTLY_CONFIG, RESPONSE_LABELS, CODIGOS_RESPUESTA
 from utils import obtener_color_respuesta
+from ranking import construir_ranking, top_n
+from jerarquico import altura_corte
+from instrumentacion import medir
+from entorno import obtener_tema
 
 
 # ==================== CONFIGURACIÓN DE TEMAS ====================
 
-def get_theme_colors():
+def get_theme_colors(tema=None):
     """
     Obtiene colores según el tema seleccionado por el usuario en la sidebar.
     
+    Args:
+        tema (str, optional): 'dark' o 'light'. Si es None se usa el tema del entorno
+    
     Returns:
         dict: Diccionario con colores según el tema elegido (oscuro/claro)
     """
-    # Obtener el tema seleccionado del session_state (por defecto oscuro)
-    tema = st.session_state.get('tema_graficos', 'dark')
+    # Obtener el tema del entorno (en Streamlit, el elegido en la sidebar)
+    if tema is None:
+        tema = obtener_tema()
     
     if tema == 'dark':
         # Colores para modo oscuro
@@ -59,6 +66,7 @@ def get_theme_colors():
 
 # ==================== MAPAS COROPLÉTICOS ====================
 
+@medir
 def crear_mapa_europa(df_filtrado, variable_aira):
     """
     Crea un mapa coroplético de Europa mostrando respuestas por país.
@@ -152,8 +160,154 @@ def crear_mapa_europa(df_filtrado, variable_aira):
     return fig
 
 
+@medir
+def crear_mapa_animado(paises, nombres, variables, titulos, codigos, tema=None, inicial=0):
+    """
+    Crea un mapa coroplético de Europa con un fotograma por variable.
+
+    Hay una sola traza con la geometría de todos los países; cada fotograma
+    solo cambia los valores (z) y las etiquetas de respuesta, de modo que
+    recorrer las variables con el control deslizante o el botón de
+    reproducción ocurre en el navegador, sin volver a crear la figura.
+
+    Args:
+        paises (list): Códigos ISO de los países (filas de codigos)
+        nombres (list): Nombre de cada país
+        variables (list): Códigos de las variables (columnas de codigos)
+        titulos (list): Título de cada variable
+        codigos (np.ndarray): Matriz int8 (países x variables) con los códigos del cubo
+        tema (str, optional): 'dark' o 'light'. Si es None se usa el tema del entorno
+        inicial (int): Posición en variables del fotograma que se muestra al abrir el mapa
+
+    Returns:
+        plotly.graph_objects.Figure: Figura del mapa con sus fotogramas
+    """
+    theme = get_theme_colors(tema)
+    n_codigos = len(CODIGOS_RESPUESTA)
+
+    # Escala discreta: el código i del cubo ocupa el tramo [i, i+1) / n_codigos
+    colorscale = []
+    for i, codigo in enumerate(CODIGOS_RESPUESTA):
+        colorscale += [[i / n_codigos, COLOR_DISCRETE_MAP[codigo]], [(i + 1) / n_codigos, COLOR_DISCRETE_MAP[codigo]]]
+
+    # Valores y etiquetas de todos los fotogramas (sin respuesta = NaN, el país no se colorea)
+    valores = np.where(codigos >= 0, codigos, np.nan)
+    etiquetas = np.array([RESPONSE_LABELS[c] for c in CODIGOS_RESPUESTA] + [''], dtype=object)[codigos]
+
+    def titulo_fotograma(j):
+        return f"{variables[j]}: {titulos[j]}"
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Choropleth(
+        locations=paises,
+        z=valores[:, inicial],
+        text=nombres,
+        customdata=etiquetas[:, inicial],
+        hovertemplate='<b>%{text}</b><br>Respuesta: %{customdata}<extra></extra>',
+        zmin=-0.5,
+        zmax=n_codigos - 0.5,
+        colorscale=colorscale,
+        showscale=False,
+        marker=dict(line=dict(color=theme['marker_line'], width=0.5)),
+        showlegend=False
+    ))
+
+    # Leyenda discreta (trazas vacías, no cambian entre fotogramas)
+    for codigo in ['YES', 'NO', 'UD', 'DNK', 'N/A']:
+        fig.add_trace(go.Scattergeo(
+            lon=[None],
+            lat=[None],
+            mode='markers',
+            marker=dict(size=12, symbol='square', color=COLOR_DISCRETE_MAP[codigo]),
+            name=RESPONSE_LABELS[codigo],
+            hoverinfo='skip',
+            showlegend=True
+        ))
+
+    # Un fotograma por variable: solo la traza 0 y solo sus valores
+    fig.frames = [
+        go.Frame(
+            name=variables[j],
+            data=[go.Choropleth(z=valores[:, j], customdata=etiquetas[:, j])],
+            traces=[0],
+            layout=go.Layout(title_text=titulo_fotograma(j))
+        )
+        for j in range(len(variables))
+    ]
+
+    paso = dict(frame=dict(duration=0, redraw=True), mode='immediate', transition=dict(duration=0))
+
+    fig.update_geos(
+        scope='europe',
+        showframe=False,
+        showcoastlines=True,
+        projection_type='natural earth',
+        bgcolor='rgba(0,0,0,0)',
+        showcountries=True,
+        countrycolor='lightgray',
+        fitbounds='locations',
+        visible=True
+    )
+
+    fig.update_layout(
+        title=dict(text=titulo_fotograma(inicial), font=dict(color=theme['font_color'], size=15)),
+        height=720,
+        margin=dict(l=0, r=0, t=50, b=0),
+        paper_bgcolor=theme['paper_bgcolor'],
+        font=dict(color=theme['font_color']),
+        legend=dict(
+            title="Respuesta",
+            orientation='v',
+            yanchor='top',
+            y=0.98,
+            xanchor='left',
+            x=0.01,
+            bgcolor=theme['map_legend_bgcolor'],
+            bordercolor=theme['legend_border'],
+            borderwidth=2,
+            font=dict(color=theme['map_legend_font'], size=12),
+            title_font=dict(color=theme['map_legend_font'], size=13)
+        ),
+        updatemenus=[dict(
+            type='buttons',
+            direction='left',
+            x=0.01,
+            y=0,
+            xanchor='left',
+            yanchor='top',
+            pad=dict(t=10, r=10),
+            showactive=False,
+            buttons=[
+                dict(label='▶ Reproducir', method='animate',
+                     args=[None, dict(paso, frame=dict(duration=1500, redraw=True), fromcurrent=True)]),
+                dict(label='⏸ Pausa', method='animate',
+                     args=[[None], dict(paso, frame=dict(duration=0, redraw=False))])
+            ]
+        )],
+        sliders=[dict(
+            active=inicial,
+            x=0.2,
+            y=0,
+            len=0.8,
+            xanchor='left',
+            yanchor='top',
+            pad=dict(t=10),
+            currentvalue=dict(prefix='Variable: ', font=dict(color=theme['font_color'])),
+            font=dict(color=theme['font_color']),
+            steps=[
+                dict(label=variable, method='animate', args=[[variable], paso])
+                for variable in variables
+            ]
+        )]
+    )
+
+    return fig
+
+
 # ==================== GRÁFICOS DE BARRAS ====================
 
+@medir
 def crear_grafico_distribucion(distribucion_df):
     """
     Crea un gráfico de barras horizontal mostrando distribución de respuestas.
@@ -200,6 +354,7 @@ def crear_grafico_distribucion(distribucion_df):
     return fig
 
 
+@medir
 def crear_grafico_barras_vertical(data_df, x_col, y_col, titulo, color_col=None):
     """
     Crea un gráfico de barras vertical genérico.
@@ -256,6 +411,7 @@ def crear_grafico_barras_vertical(data_df, x_col, y_col, titulo, color_col=None)
 
 # ==================== TABLAS INTERACTIVAS ====================
 
+@medir
 def crear_tabla_interactiva(df_pivot, titulo):
     """
     Crea una tabla interactiva con colores según las respuestas.
@@ -331,6 +487,7 @@ def crear_tabla_interactiva(df_pivot, titulo):
 
 # ==================== GRÁFICOS DE SCORES Y PERFILES ====================
 
+@medir
 def crear_grafico_radar_perfil(perfil, titulo, color='#3b82f6'):
     """
     Crea un gráfico radar (spider) mostrando el perfil de un cluster.
@@ -398,6 +555,7 @@ def crear_grafico_radar_perfil(perfil, titulo, color='#3b82f6'):
     return fig
 
 
+@medir
 def crear_grafico_comparacion_clusters(perfiles):
     """
     Crea un gráfico de barras agrupadas comparando scores de clusters.
@@ -473,6 +631,7 @@ def crear_grafico_comparacion_clusters(perfiles):
 
 # ==================== GRÁFICOS DE CLUSTERING ====================
 
+@medir
 def crear_grafico_metodo_codo(inertias, k_range):
     """
     Crea gráfico del método del codo para determinar K óptimo.
@@ -518,6 +677,7 @@ def crear_grafico_metodo_codo(inertias, k_range):
     return fig
 
 
+@medir
 def crear_grafico_silhouette(silhouette_scores, k_range):
     """
     Crea gráfico del coeficiente de silueta para diferentes valores de K.
@@ -575,6 +735,7 @@ def crear_grafico_silhouette(silhouette_scores, k_range):
     return fig
 
 
+@medir
 def crear_grafico_pca_2d(pca_coords, clusters, labels):
     """
     Crea un gráfico 2D de componentes principales con clusters coloreados.
@@ -652,6 +813,7 @@ def crear_grafico_pca_2d(pca_coords, clusters, labels):
     return fig
 
 
+@medir
 def crear_grafico_pca_3d(pca_coords, clusters, labels):
     """
     Crea un gráfico 3D de componentes principales con clusters coloreados.
@@ -750,6 +912,7 @@ def crear_grafico_pca_3d(pca_coords, clusters, labels):
 
 # ==================== HEATMAPS ====================
 
+@medir
 def crear_heatmap_respuestas(df_pivot):
     """
     Crea un heatmap mostrando respuestas por país y variable.
@@ -803,6 +966,7 @@ def crear_heatmap_respuestas(df_pivot):
 
 # ==================== GRÁFICOS DE MÉTRICAS ====================
 
+@medir
 def crear_grafico_top_paises(df_scores, area, n=10):
     """
     Crea un gráfico de barras con el top N de países en un área específica.
@@ -815,7 +979,8 @@ def crear_grafico_top_paises(df_scores, area, n=10):
     Returns:
         plotly.graph_objects.Figure: Figura del gráfico
     """
-    top_paises = df_scores.nlargest(n, area)[['Pais', area]].sort_values(area)
+    # El orden de todas las áreas sale del ranking cacheado (sin nlargest por área)
+    top_paises = top_n(construir_ranking(df_scores), area, n).iloc[::-1]
     
     fig = go.Figure()
     
@@ -851,3 +1016,162 @@ def crear_grafico_top_paises(df_scores, area, n=10):
     fig.update_yaxes(tickfont=dict(color='white'))
     
     return fig
+
+
+# ==================== ESTABILIDAD DE CLUSTERS ====================
+
+@medir
+def crear_heatmap_coasignacion(matriz, clusters, labels):
+    """
+    Crea un heatmap de la matriz de coasignación, con los países ordenados por cluster.
+    
+    Args:
+        matriz (np.ndarray | pd.DataFrame): Proporción de remuestreos en que cada par
+                                            de países comparte cluster (países x países)
+        clusters (np.ndarray): Asignación de clusters de referencia
+        labels (list): Etiquetas para cada país (nombres de países)
+        
+    Returns:
+        plotly.graph_objects.Figure: Figura del heatmap
+    """
+    # Obtener colores del tema actual
+    theme = get_theme_colors()
+    
+    # Ordenar por cluster para que los bloques estables aparezcan en la diagonal
+    orden = np.argsort(clusters, kind='stable')
+    valores = np.asarray(matriz)[np.ix_(orden, orden)]
+    nombres = [labels[i] for i in orden]
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=valores,
+        x=nombres,
+        y=nombres,
+        zmin=0,
+        zmax=1,
+        colorscale='Blues',
+        hovertemplate='%{y} - %{x}<br>Mismo cluster: %{z:.0%}<extra></extra>',
+        colorbar=dict(title='Coasignación', tickformat='.0%')
+    ))
+    
+    fig.update_layout(
+        title='Matriz de Coasignación entre Remuestreos',
+        title_font_size=16,
+        title_font_color=theme['font_color'],
+        height=750,
+        margin=dict(l=0, r=0, t=50, b=0),
+        paper_bgcolor=theme['paper_bgcolor'],
+        plot_bgcolor=theme['plot_bgcolor'],
+        font=dict(color=theme['font_color'])
+    )
+    
+    fig.update_xaxes(tickangle=-45, tickfont=dict(size=9, color=theme['font_color']))
+    fig.update_yaxes(autorange='reversed', tickfont=dict(size=9, color=theme['font_color']))
+    
+    return fig
+
+
+# ==================== DENDROGRAMA ====================
+
+@medir
+def crear_dendrograma(arbol, clusters, labels):
+    """
+    Crea el dendrograma de un clustering jerárquico, con las ramas coloreadas
+    por cluster y una línea en la altura de corte.
+    
+    Args:
+        arbol (dict): Árbol de jerarquico.construir_arbol() ('hijos', 'alturas', 'orden_hojas', 'n')
+        clusters (np.ndarray): Asignación de clusters del corte actual
+        labels (list): Etiquetas para cada hoja (nombres de países)
+        
+    Returns:
+        plotly.graph_objects.Figure: Figura del dendrograma
+    """
+    # Obtener colores del tema actual
+    theme = get_theme_colors()
+    
+    # Mismos colores por cluster que los gráficos PCA
+    colores_por_cluster = {
+        0: '#2196f3',  # Azul
+        1: '#10b981',  # Verde
+        2: '#f59e0b',  # Naranja
+        3: '#ef4444',  # Rojo
+        4: '#8b5cf6',  # Morado
+        5: '#06b6d4',  # Cyan
+        6: '#ec4899',  # Rosa
+    }
+    color_sin_cluster = '#9e9e9e'
+    
+    n = arbol['n']
+    hijos = arbol['hijos']
+    alturas = arbol['alturas']
+    orden = arbol['orden_hojas']
+    clusters = np.asarray(clusters)
+    
+    # Posición horizontal, altura y cluster de cada nodo (hojas 0..n-1, fusiones n..2n-2)
+    x = np.zeros(2 * n - 1)
+    y = np.zeros(2 * n - 1)
+    cluster_nodo = np.full(2 * n - 1, -1)
+    x[orden] = np.arange(n)
+    cluster_nodo[:n] = clusters
+    
+    # Un segmento en forma de U por fusión, agrupados por color en una sola traza
+    segmentos = {}
+    for i, (izquierdo, derecho) in enumerate(hijos):
+        nodo = n + i
+        x[nodo] = (x[izquierdo] + x[derecho]) / 2
+        y[nodo] = alturas[i]
+        if cluster_nodo[izquierdo] == cluster_nodo[derecho]:
+            cluster_nodo[nodo] = cluster_nodo[izquierdo]
+        
+        xs, ys = segmentos.setdefault(cluster_nodo[nodo], ([], []))
+        xs.extend([x[izquierdo], x[izquierdo], x[derecho], x[derecho], None])
+        ys.extend([y[izquierdo], y[nodo], y[nodo], y[derecho], None])
+    
+    fig = go.Figure()
+    
+    for cluster_id in sorted(segmentos):
+        xs, ys = segmentos[cluster_id]
+        fig.add_trace(go.Scatter(
+            x=xs,
+            y=ys,
+            mode='lines',
+            line=dict(width=1.5, color=colores_por_cluster.get(cluster_id, color_sin_cluster)),
+            name=f'Cluster {cluster_id}' if cluster_id >= 0 else 'Fusiones entre clusters',
+            hoverinfo='skip'
+        ))
+    
+    # Línea de corte entre la última fusión aplicada y la primera cortada
+    k = len(np.unique(clusters))
+    if 1 < k < n:
+        fig.add_hline(y=altura_corte(arbol, k), line_dash='dash', line_color=theme['font_color'], opacity=0.5,
+                      annotation_text=f'K = {k}', annotation_font_color=theme['font_color'])
+    
+    fig.update_layout(
+        title='Dendrograma del Clustering Jerárquico',
+        title_font_size=16,
+        title_font_color=theme['font_color'],
+        yaxis_title='Distancia de fusión',
+        height=550,
+        margin=dict(l=0, r=0, t=50, b=0),
+        paper_bgcolor=theme['paper_bgcolor'],
+        plot_bgcolor=theme['plot_bgcolor'],
+        font=dict(color=theme['font_color']),
+        legend=dict(
+            bgcolor=theme['legend_bgcolor'],
+            bordercolor=theme['legend_border'],
+            borderwidth=1,
+            font=dict(color=theme['font_color'])
+        )
+    )
+    
+    fig.update_xaxes(
+        tickmode='array',
+        tickvals=list(range(n)),
+        ticktext=[labels[i] for i in orden],
+        tickangle=-90,
+        tickfont=dict(size=9, color=theme['font_color']),
+        showgrid=False
+    )
+    fig.update_yaxes(gridcolor=theme['grid_color'], tickfont=dict(color=theme['font_color']), title_font=dict(color=theme['font_color']))
+    
+    return fig